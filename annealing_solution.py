@@ -0,0 +1,400 @@
+"""
+Simulated annealing over Steiner trees on the board grid.
+
+The state is a tree of path elements that connects all pins. Moves cut the
+tree and join the parts back together:
+- rerouting: a chain of path elements between two pins or branch points is
+  removed, and one of its ends is bridged to the nearest point of the other
+  part.
+- relocating: a Steiner point (a branch point that is not a pin) is moved one
+  step, the chains around it are removed, and the part of the new point is
+  bridged to the nearest part until all parts are joined again. Once that is
+  the largest part, the smallest one is bridged instead.
+Bridges are shortest routes with random ties, so a chain can move to another
+shortest route, or be replaced by a shorter one from another point of its
+part. A move changes only the path elements it removes and adds, which are
+logged so a rejected move is undone in the same time. Bridges join distinct
+parts, so the state is always a tree and no connectivity check of the whole
+board is needed. To tell the parts apart, they are searched all at once until
+only the largest is left, so a move costs the size of the smaller parts it cuts
+off (and of its bridges), not the size of the whole tree. That is the size of
+the move itself when a chain to a leaf is cut, but not in general.
+
+Moves that lengthen the tree by `delta` are accepted with probability
+exp(-delta / temperature), where the temperature falls geometrically from
+`schedule[0]` to `schedule[1]` over the moves or the time budget, whichever
+runs out first. Parallel chains send every tree shorter than those of all
+chains so far to the parent, which yields it right away.
+
+> python annealing_solution.py --time-budget 10 --chains 4
+"""
+from definitions import Point, Points, Paths, Tuple, List, Cases, DisjointSet
+from example_solution import connect_pins
+from local_search import to_graph, add_edge, remove_edge, improve
+from solution_cache import solution_cache
+from utils import lower_bound, spawn_seeds
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from timeit import default_timer
+from random import Random
+import multiprocessing as mp
+import argparse
+import math
+import os
+
+Edge = Tuple[Point, Point]
+
+# Set in the workers of a pool by `init_worker`: the event that stops all chains once one reaches the target,
+# the length of the best tree of any chain, and the queue that chains send their improvements on
+cancelled = None
+shared_best = None
+improvements = None
+
+
+def init_worker(cancel, best, queue) -> None:
+    global cancelled, shared_best, improvements
+    cancelled, shared_best, improvements = cancel, best, queue
+
+
+def edge_key(point1: Point, point2: Point) -> Edge:
+    return (point1, point2) if point1 < point2 else (point2, point1)
+
+
+class SteinerTree:
+    """
+  A tree of path elements as an adjacency graph (see `local_search`), with its
+  path elements also in a list, so a random one is drawn in O(1).
+
+  Parameters:
+  - paths (Paths): The path elements of a tree that connects `pins`.
+  - pins (Points): The pins.
+  - size (int): Size of the board, moves stay within it.
+
+  `add` and `remove` append what they did to `log`, if given, so `undo` can
+  reverse it.
+  """
+
+    def __init__(self, paths: Paths, pins: Points, size: int):
+        self.pins = set(pins)
+        self.size = size
+        self.graph = to_graph(paths)
+        self.edges = []
+        self.position = {}
+        for path in paths:
+            key = edge_key(*path)
+            if key not in self.position:
+                self.position[key] = len(self.edges)
+                self.edges.append(key)
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    def __contains__(self, point: Point) -> bool:
+        return point in self.graph
+
+    def add(self, point1: Point, point2: Point, log: list = None) -> None:
+        key = edge_key(point1, point2)
+        if key in self.position:
+            return
+        add_edge(self.graph, point1, point2)
+        self.position[key] = len(self.edges)
+        self.edges.append(key)
+        if log is not None:
+            log.append((True, key))
+
+    def remove(self, point1: Point, point2: Point, log: list = None) -> None:
+        key = edge_key(point1, point2)
+        remove_edge(self.graph, point1, point2)
+        # Move the last path element into the gap
+        i, last = self.position.pop(key), self.edges.pop()
+        if last != key:
+            self.edges[i] = last
+            self.position[last] = i
+        if log is not None:
+            log.append((False, key))
+
+    def undo(self, log: list) -> None:
+        for added, key in reversed(log):
+            if added:
+                self.remove(*key)
+            else:
+                self.add(*key)
+
+    def is_key(self, point: Point) -> bool:
+        return point in self.pins or len(self.graph[point]) != 2
+
+    def chain(self, edge: Edge) -> List[Point]:
+        """The points of the chain through `edge`, from one key point (pin or branch point) to the other."""
+        halves = []
+        for start, towards in (edge, edge[::-1]):
+            half = [start, towards]
+            while not self.is_key(half[-1]):
+                half.append(next(p for p in self.graph[half[-1]] if p != half[-2]))
+            halves.append(half)
+        return halves[1][::-1] + halves[0][2:]
+
+    def prune(self, points, log: list = None) -> None:
+        # Removes dead ends without a pin that start at `points`
+        to_visit = list(points)
+        while to_visit:
+            point = to_visit.pop()
+            if point in self.graph and point not in self.pins and len(self.graph[point]) == 1:
+                neighbour = next(iter(self.graph[point]))
+                self.remove(point, neighbour, log)
+                to_visit.append(neighbour)
+
+    def to_paths(self) -> Paths:
+        return list(self.edges)
+
+
+class Reconnection:
+    """
+  Joins the parts of a tree that a move has cut apart, given a point of every
+  part (`ends`). The parts are searched from all ends at once, one point at a
+  time each, until all but one are fully labelled. This costs at most the
+  number of parts times the size of the second largest part, and the largest
+  part, usually the bulk of the tree, is never visited. Bridges only start
+  from labelled parts, and only points they add are labelled after that.
+  """
+
+    def __init__(self, tree: SteinerTree, log: list, ends: Points):
+        self.tree = tree
+        self.log = log
+        self.labels = {}
+        self.members = {}  # The points of every part, None for the largest part
+        self.parts = DisjointSet()
+        graph = tree.graph
+        searches = []
+        for end in dict.fromkeys(ends):
+            self.labels[end] = end
+            self.members[end] = [end]
+            searches.append((end, [end]))
+        while len(searches) > 1:
+            for part, to_visit in searches:
+                if to_visit:
+                    for neighbour in graph.get(to_visit.pop(), ()):
+                        if neighbour not in self.labels:
+                            self.labels[neighbour] = part
+                            self.members[part].append(neighbour)
+                            to_visit.append(neighbour)
+            searches = [(part, to_visit) for part, to_visit in searches if to_visit]
+        for part, _ in searches:
+            self.members[part] = None
+        self.largest = searches[0][0] if searches else None
+
+    def part(self, point: Point):
+        if point in self.labels:
+            return self.parts.find(self.labels[point])
+        return self.parts.find(self.largest)  # Points of the tree that were not labelled
+
+    def join(self, start: Point, generator: Random) -> None:
+        """Bridges the part of `start`, or if that is the largest the smallest part, until one part is left."""
+        while len(self.members) > 1:
+            own = self.part(start)
+            if self.members[own] is None:
+                own = min((part for part, members in self.members.items() if members is not None),
+                          key=lambda part: len(self.members[part]))
+            self.bridge(own, generator)
+
+    def bridge(self, own, generator: Random) -> None:
+        """Joins the part `own` to the nearest other part, along a shortest route with random ties."""
+        members = self.members[own]
+        layer = list(members)
+        previous = dict.fromkeys(layer)
+        size = self.tree.size
+        while layer:
+            generator.shuffle(layer)
+            next_layer = []
+            for x, y in layer:
+                for point in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                    if point in previous or not (0 <= point[0] <= size and 0 <= point[1] <= size):
+                        continue
+                    previous[point] = x, y
+                    if point in self.tree or point in self.labels:
+                        other = self.part(point)
+                        while previous[point] is not None:
+                            self.tree.add(point, previous[point], self.log)
+                            point = previous[point]
+                            if point not in self.labels:
+                                self.labels[point] = own
+                                members.append(point)
+                        other_members = self.members.pop(other)
+                        del self.members[own]
+                        root = self.parts.union(own, other)
+                        self.members[root] = None if other_members is None else members + other_members
+                        return
+                    next_layer.append(point)
+            layer = next_layer
+
+
+def reroute(tree: SteinerTree, generator: Random, log: list) -> List[Point]:
+    # Replaces a random chain by a route between the parts it connected. Returns the points to prune from.
+    chain = tree.chain(tree.edges[generator.randrange(len(tree))])
+    for point1, point2 in zip(chain, chain[1:]):
+        tree.remove(point1, point2, log)
+    start, end = chain[0], chain[-1]
+    if generator.random() < .5:
+        start, end = end, start
+    # Also when `end` is a pin left without path elements, it is a part of its own
+    Reconnection(tree, log, [start, end]).join(start, generator)
+    return [start, end]
+
+
+def relocate(tree: SteinerTree, generator: Random, log: list) -> List[Point]:
+    # Moves the Steiner point at the end of a random chain one step. Returns the points to prune from.
+    chain = tree.chain(tree.edges[generator.randrange(len(tree))])
+    steiner = next((point for point in (chain[0], chain[-1]) if point not in tree.pins), None)
+    if steiner is None:
+        return reroute(tree, generator, log)
+    dx, dy = generator.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+    new = (min(tree.size, max(0, steiner[0] + dx)), min(tree.size, max(0, steiner[1] + dy)))
+    # All chains first, as removing one turns the Steiner point into a chain point
+    chains = [tree.chain((steiner, neighbour)) for neighbour in tree.graph[steiner]]
+    ends = []
+    for chain in chains:
+        ends.append(chain[-1] if chain[0] == steiner else chain[0])
+        for point1, point2 in zip(chain, chain[1:]):
+            tree.remove(point1, point2, log)
+    # The new point is a part of its own, unless it lies on one of the others.
+    # Every bridge starts from its part, as long as that is not the largest.
+    Reconnection(tree, log, ends if new in tree else ends + [new]).join(new, generator)
+    return ends + [new]
+
+
+def anneal(pins: Points, paths: Paths, target: int = 0, deadline: float = None, max_moves: int = 200_000,
+           schedule: Tuple[float, float] = (.6, .05), generator: Random = None, relocate_rate: float = .3):
+    """
+    Anneals the tree `paths`. Yields (paths, moves) for every shorter tree,
+    polished by `local_search.improve` until the `deadline`, and the best tree
+    once more at the end.
+    """
+    generator = Random() if generator is None else generator
+    tree = SteinerTree(paths, pins, max(max(point) for point in pins))
+    tree.prune(list(tree.graph))
+    best = improve(tree.to_paths(), pins, deadline)
+    yield best, 0
+    start, (t_start, t_end) = default_timer(), schedule
+    temperature, moves = t_start, 0
+    while moves < max_moves and len(best) > target:
+        moves += 1
+        if not moves % 256:
+            # Cool down with the moves made or the time spent, whichever is further
+            now = default_timer()
+            progress = moves / max_moves
+            if deadline is not None:
+                progress = max(progress, (now - start) / max(deadline - start, 1e-9))
+                if now >= deadline:
+                    break
+            if cancelled is not None and cancelled.is_set():
+                break
+            temperature = t_start * (t_end / t_start) ** min(progress, 1)
+        log, length = [], len(tree)
+        touched = (relocate if generator.random() < relocate_rate else reroute)(tree, generator, log)
+        tree.prune(touched, log)
+        delta = len(tree) - length
+        if delta > 0 and generator.random() >= math.exp(-delta / temperature):
+            tree.undo(log)
+        elif len(tree) < len(best):
+            best = improve(tree.to_paths(), pins, deadline)
+            yield best, moves
+    yield best, moves
+
+
+def run_chain(pins: Points, target: int, deadline: float, seed: int, max_moves: int,
+              schedule: Tuple[float, float], chain: int = 0) -> Tuple[Paths, int]:
+    # One annealing chain, started from a greedy tree of its own. Trees shorter than those of all chains so far
+    # are sent to the parent right away.
+    generator = Random(seed)
+    best, moves = None, 0
+    for best, moves in anneal(pins, connect_pins(pins, 3, generator=generator), target, deadline, max_moves,
+                              schedule, generator):
+        if shared_best is not None:
+            with shared_best.get_lock():
+                improved = len(best) < shared_best.value
+                if improved:
+                    shared_best.value = len(best)
+            if improved:
+                improvements.put((chain, best, moves))
+    if best is not None and len(best) <= target and cancelled is not None:
+        cancelled.set()
+    return best, moves
+
+
+def iter_paths(pins: Points, target: int = None, deadline: float = None, chains: int = 1, seed: int = None,
+               max_moves: int = 200_000, schedule: Tuple[float, float] = (.6, .05), use_cache: bool = False):
+    """
+    Anytime annealing: yields (paths, flops) for every shorter tree, until
+    `target` or the lower bound is reached, `max_moves` moves are made or the
+    `deadline` (a `timeit.default_timer` value) has passed. The `flops` are the
+    moves made. With more than one of `chains`, independent chains run in
+    parallel processes, each with its own seed derived from `seed`, and the
+    first to reach the target stops the others. Their improvements are yielded
+    as soon as they are found. With `use_cache`, the best
+    known tree in the solution cache is yielded first, and the result is
+    stored there.
+    """
+    pins = list(dict.fromkeys(pins))
+    target = max(0 if target is None else target, lower_bound(pins))
+    best, flops = solution_cache.get(pins) if use_cache else None, 0
+    if best is not None:
+        yield best, flops
+        if len(best) <= target:
+            return
+    if len(pins) < 2:
+        yield [], 0
+        return
+    seeds = spawn_seeds(seed, chains)
+    if chains == 1:
+        for paths, flops in anneal(pins, connect_pins(pins, 3, generator=Random(seeds[0])), target, deadline,
+                                   max_moves, schedule, Random(seeds[0])):
+            if best is None or len(paths) < len(best):
+                best = paths
+                yield best, flops
+    else:
+        shared, queue = mp.Value('i', len(best) if best is not None else 2 ** 31 - 1), mp.SimpleQueue()
+        moves = [0] * chains
+        with ProcessPoolExecutor(min(chains, os.cpu_count()), initializer=init_worker,
+                                 initargs=(mp.Event(), shared, queue)) as executor:
+            pending = {executor.submit(run_chain, pins, target, deadline, chain_seed, max_moves, schedule, chain):
+                       chain for chain, chain_seed in enumerate(seeds)}
+            while pending:
+                done, _ = wait(pending, timeout=.05, return_when=FIRST_COMPLETED)
+                results = [(pending.pop(future), *future.result()) for future in done]
+                # Improvements first, they were sent before the results of the chains that are done
+                sent = []
+                while not queue.empty():
+                    sent.append(queue.get())
+                for chain, paths, chain_moves in sent + results:
+                    moves[chain] = max(moves[chain], chain_moves)
+                    if best is None or len(paths) < len(best):
+                        best = paths
+                        yield best, sum(moves)
+        flops = sum(moves)
+    if use_cache:
+        solution_cache.put(pins, best)
+    yield best, flops
+
+
+def find_paths(pins: Points, target: int = None, deadline: float = None, chains: int = 1,
+               seed: int = None, use_cache: bool = False) -> Tuple[Paths, int]:
+    """
+    Simulated annealing, see `iter_paths`. The `flops` returned are the moves
+    of all chains together.
+    """
+    paths, flops = [], 0
+    for paths, flops in iter_paths(pins, target, deadline, chains, seed, use_cache=use_cache):
+        pass
+    return paths, flops
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Anneal the hardest cases.")
+    parser.add_argument("--time-budget", type=float, default=10, help="Seconds per case.")
+    parser.add_argument("--chains", type=int, default=1, help="Number of parallel chains.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the chains.")
+    args = parser.parse_args()
+    solution_cache.enabled = False
+    for case in sorted(Cases(schwierigkeit=['sehrschwer', 'extremschwer']), key=lambda c: c.id):
+        start = default_timer()
+        paths, flops = find_paths(case.pins, case.kanten, start + args.time_budget, args.chains, args.seed)
+        print(f'{case.name:<40}kanten {case.kanten:>3}  found {len(paths):>3}  moves {flops:>8}  '
+              f'{default_timer() - start:6.2f} s')
@@ -0,0 +1,344 @@
+from definitions import Points, Paths, Tuple, BoardState, board_elements
+import example_solution
+from solution_cache import solution_cache
+from utils import lower_bound
+from checkpoint import save_checkpoint, load_checkpoint, remove_checkpoint
+from timeit import default_timer
+from collections import OrderedDict
+from pathlib import Path
+from random import Random
+import numpy as np
+import secrets
+
+# Route tables larger than this are refused, and batches are made smaller to keep their arrays below it
+MAX_TABLE_BYTES = 256 * 2 ** 20
+# With a deadline, batches are sized to take about this many seconds, so the deadline is checked often enough
+BATCH_SECONDS = .25
+FIRST_BATCH = 64
+# The number of route tables kept in memory
+ROUTE_TABLES = 16
+_route_tables = OrderedDict()
+
+
+def table_shape(pins: Points) -> Tuple[int, int]:
+    # The number of points in the bounding box of the pins, and the longest distance within it
+    (x_min, x_max), (y_min, y_max) = [(min(c), max(c)) for c in zip(*pins)]
+    return (x_max - x_min + 1) * (y_max - y_min + 1), x_max - x_min + y_max - y_min
+
+
+def table_fits(pins: Points) -> bool:
+    """Whether the `route_table` of these pins stays below `MAX_TABLE_BYTES`."""
+    n_points, length = table_shape(pins)
+    return len(pins) * n_points * 2 * (2 * length + 1) * np.dtype(np.int32).itemsize <= MAX_TABLE_BYTES
+
+
+def fit_batch_size(pins: Points, batch_size: int) -> int:
+    """The largest batch up to `batch_size` whose (tree, pin, point) arrays stay below `MAX_TABLE_BYTES`."""
+    n_points, length = table_shape(pins)
+    tree_bytes = len(pins) * n_points * (1 + distance_dtype(length).itemsize)
+    return max(1, min(batch_size, MAX_TABLE_BYTES // tree_bytes))
+
+
+def timed_batch_size(batch: int, seconds: float, batch_size: int) -> int:
+    """The batch size, up to `batch_size`, that takes about `BATCH_SECONDS` when `batch` trees took `seconds`."""
+    return max(1, min(batch_size, int(BATCH_SECONDS * batch / max(seconds, 1e-9))))
+
+
+def distance_dtype(length: int) -> np.dtype:
+    # The smallest unsigned type whose largest value, the sentinel for unreachable, is above all distances
+    return np.dtype(np.uint8 if length < np.iinfo(np.uint8).max else np.uint16)
+
+
+def route_table(pins: Tuple, deadline: float = None) -> dict:
+    """
+    Per board lookup tables for the batched greedy search. Tree points can only
+    lie within the bounding box of the pins, so only those points are indexed.
+    The extra last edge and point index are padding that every tree "contains".
+    Distances are stored in the smallest unsigned type that holds them, with
+    its largest value as 'unreachable'. Raises a ValueError when the tables
+    would be larger than `MAX_TABLE_BYTES`, see `table_fits`. Returns None
+    when the `deadline` passes before the tables are built. The tables of the
+    last `ROUTE_TABLES` boards are kept.
+    """
+    if pins in _route_tables:
+        _route_tables.move_to_end(pins)
+        return _route_tables[pins]
+    if not table_fits(pins):
+        raise ValueError(f'The route table of these {len(pins)} pins is larger than {MAX_TABLE_BYTES} bytes')
+    board = BoardState.for_points(pins)
+    (x_min, x_max), (y_min, y_max) = [(min(c), max(c)) for c in zip(*pins)]
+    points = [(x, y) for y in range(y_min, y_max + 1) for x in range(x_min, x_max + 1)]
+    point_index = {point: i for i, point in enumerate(points)}
+    n_edges, n_points = 2 * board.size * board.width, len(points)
+
+    # The two L-shaped routes (horizontal or vertical first, as in `connect_two_points`) from every pin to
+    # every point, computed for all points of a pin at once. Step `t` of a route is on its horizontal leg
+    # while t < dx, and on its vertical leg while t < dx + dy.
+    length = x_max - x_min + y_max - y_min
+    dtype = distance_dtype(length)
+    route_edges = np.full((len(pins), n_points, 2, max(length, 1)), n_edges, dtype=np.int32)
+    route_points = np.full((len(pins), n_points, 2, length + 1), n_points, dtype=np.int32)
+    coords = np.array(points)
+    x, y = coords[:, :1], coords[:, 1:]
+    steps = np.arange(length + 1)
+    size, vertical = board.size, board.size * board.width
+
+    def index(px, py):
+        return (py - y_min) * (x_max - x_min + 1) + px - x_min
+
+    for i, (pin_x, pin_y) in enumerate(pins):
+        if deadline is not None and default_timer() >= deadline:
+            return None
+        dx, dy = np.abs(x - pin_x), np.abs(y - pin_y)
+        sx, sy = np.sign(x - pin_x), np.sign(y - pin_y)
+        t = steps[:max(length, 1)]
+        x_low, y_low = np.minimum(x, pin_x), np.minimum(y, pin_y)
+        for k, (row, column) in enumerate(((pin_y, x), (y, pin_x))):
+            horizontal = row * size + x_low + t
+            down = vertical + column * size + y_low + t - dx
+            route_edges[i, :, k] = np.where(t < dx, horizontal, np.where(t < dx + dy, down, n_edges))
+        # Points from the pin: along its row to the column of the point, then along that column
+        on_row = index(pin_x + sx * steps, pin_y)
+        on_column = index(x, pin_y + sy * (steps - dx))
+        route_points[i, :, 0] = np.where(steps <= dx, on_row, np.where(steps <= dx + dy, on_column, n_points))
+        # Points from the point: along its row to the column of the pin, then along that column
+        on_row = index(x - sx * steps, y)
+        on_column = index(pin_x, y - sy * (steps - dx))
+        route_points[i, :, 1] = np.where(steps <= dx, on_row, np.where(steps <= dx + dy, on_column, n_points))
+
+    pin_points = np.array([point_index[pin] for pin in pins])
+    distances = np.abs(np.array(pins)[:, None, :] - coords[None, :, :]).sum(axis=2).astype(dtype)
+    # Pin pairs sorted by distance, to start the trees
+    pin_distances = distances[:, pin_points]
+    pairs = [(i, j) for i in range(len(pins)) for j in range(len(pins)) if i != j]
+    pairs.sort(key=lambda pair: pin_distances[pair])
+    table = _route_tables[pins] = {
+        'size': board.size,
+        'n_edges': n_edges,
+        'n_points': n_points,
+        'route_edges': route_edges,
+        'route_points': route_points,
+        'pin_points': pin_points,
+        'distances': distances,
+        'unreachable': np.iinfo(dtype).max,  # All bits set, so OR-ing it in masks a distance
+        'pin_pairs': np.array(pairs),
+    }
+    if len(_route_tables) > ROUTE_TABLES:
+        _route_tables.popitem(last=False)
+    return table
+
+
+def connect_pins_batch(pins: Points, batch_size: int, rng: int, generator: np.random.Generator,
+                       deadline: float = None, limit: int = None) -> np.ndarray:
+    """
+    Runs `batch_size` independent randomized greedy constructions (as in
+    `example_solution.connect_pins`) in lock-step. Returns a boolean array of
+    shape (n_trees, n_edges) with the path elements of every tree, or None
+    when the `deadline` passes first. With a `limit`, constructions are
+    abandoned as soon as they have `limit` path elements, so only trees
+    shorter than it are returned.
+    """
+    table = route_table(tuple(pins), deadline)
+    if table is None:
+        return None
+    # Routes by pin and point in one index, as `take` with one index is much faster than fancy indexing
+    route_edges = table['route_edges'].reshape(-1, *table['route_edges'].shape[2:])
+    route_points = table['route_points'].reshape(-1, *table['route_points'].shape[2:])
+    unreachable = table['unreachable']
+    batch = np.arange(batch_size)
+    edges = np.zeros((batch_size, table['n_edges'] + 1), dtype=bool)
+    points = np.zeros((batch_size, table['n_points'] + 1), dtype=bool)
+    edges[:, -1] = points[:, -1] = True  # Padding
+    lengths = np.zeros(batch_size, dtype=int)
+    alive = np.ones(batch_size, dtype=bool)
+
+    # Every tree also lists its points in the order they were added, padded with the padding point, so
+    # candidate pairs only have to be looked for among the points of the tree instead of the whole table
+    tree_points = np.full((batch_size, table['n_points'] + 1), table['n_points'], dtype=np.intp)
+    n_tree_points = np.zeros(batch_size, dtype=np.intp)
+    # Flat views, indexing them with flat indices is about twice as fast as indexing with (row, column) pairs
+    flat_edges, flat_points, flat_tree_points = edges.reshape(-1), points.reshape(-1), tree_points.reshape(-1)
+
+    def place(rows, pin, point):
+        # Add the cheaper of the two L-shaped routes, ties are broken randomly
+        route = pin * table['n_points'] + point
+        options = route_edges.take(route, axis=0) + (rows * edges.shape[1])[:, None, None]
+        new = options.shape[2] - flat_edges.take(options).sum(axis=2)
+        orientation = (new + generator.random(new.shape) * .5).argmin(axis=1)
+        index = np.arange(len(rows))
+        flat_edges[options[index, orientation]] = True
+        route = route_points.take(route, axis=0)[index, orientation]
+        on_route = route + (rows * points.shape[1])[:, None]
+        # Append the points that are new to the tree to its list
+        is_new = ~flat_points.take(on_route)
+        position = n_tree_points[rows, None] + is_new.cumsum(axis=1, dtype=np.int32) - 1
+        flat_tree_points[(position + (rows * tree_points.shape[1])[:, None])[is_new]] = route[is_new]
+        n_tree_points[rows] += is_new.sum(axis=1)
+        flat_points[on_route] = True
+        lengths[rows] += new[index, orientation]
+        if limit is not None:
+            alive[rows] &= lengths[rows] < limit
+
+    # Start by connecting two pins that are among the closest pairs
+    pairs = table['pin_pairs'][generator.integers(0, min(rng + 1, len(table['pin_pairs'])), batch_size)]
+    place(batch, pairs[:, 0], table['pin_points'][pairs[:, 1]])
+
+    # Distances from every point to every pin, with the padding point unreachable from all
+    distances = np.vstack([table['distances'].T, np.full(len(pins), unreachable, dtype=table['distances'].dtype)])
+    # Connected pins are masked for all pins of a point at once, as the widest unsigned integer that divides a row
+    wide = next(np.dtype(f'u{n}') for n in (8, 4, 2, 1) if distances[0].nbytes % n == 0)
+    connected = points[:, table['pin_points']]
+    rows = np.nonzero(alive & ~connected.all(axis=1))[0]
+    while len(rows):
+        if deadline is not None and default_timer() >= deadline:
+            return None
+        # Distances from every point of the tree to every pin, unreachable for pins that are connected
+        points_in_tree = tree_points[rows, :n_tree_points[rows].max()]
+        candidates = distances.take(points_in_tree, axis=0)
+        pin_mask = np.where(connected[rows], unreachable, 0).astype(distances.dtype)
+        masked = candidates.view(wide)
+        masked |= pin_mask.view(wide)[:, None, :]
+        candidates = candidates.reshape(len(rows), -1)
+        # Select one of the `rng + 1` closest pairs. Every pin is at a distance from every tree point, so the
+        # number of pairs is known and the one to take can be drawn first. The closest pairs are then taken out
+        # one by one, and trees stop once they reach theirs. The first position of the minimum is the argmin,
+        # but a min and a comparison are about twice as fast.
+        n_valid = np.minimum(rng + 1, (~connected[rows]).sum(axis=1) * n_tree_points[rows])
+        pick = (generator.random(len(rows)) * n_valid).astype(int)
+        selected = np.empty(len(rows), dtype=np.intp)
+        pending = np.arange(len(rows))
+        for k in range(rng + 1):
+            closest = (candidates == candidates.min(axis=1)[:, None]).argmax(axis=1)
+            found = pick[pending] == k
+            selected[pending[found]] = closest[found]
+            if found.all():
+                break
+            pending, candidates, closest = pending[~found], candidates[~found], closest[~found]
+            candidates[np.arange(len(pending)), closest] = unreachable
+        index = np.arange(len(rows))
+        position, pin = np.divmod(selected, len(pins))
+        place(rows, pin, points_in_tree[index, position])
+        connected = points[:, table['pin_points']]
+        rows = np.nonzero(alive & ~connected.all(axis=1))[0]
+    return edges[alive, :-1]
+
+
+def iter_paths(pins: Points, target: int = None, deadline: float = None, batch_size: int = 4096,
+               seed: int = None, checkpoint: Path = None, checkpoint_interval: float = 60., use_cache: bool = False):
+    """
+    Anytime solver: yields (paths, flops) every time a batch of greedy
+    restarts contains a shorter tree, with flops the restarts done so far.
+    With `use_cache`, the search starts from the best known tree in the
+    solution cache, and stores its result there. It stops early when a tree
+    meets the proven lower bound. Runs with the same `seed` and no deadline
+    construct the same trees. With a `checkpoint` file, the search state is
+    saved every `checkpoint_interval` seconds and when the deadline passes,
+    and a search that finds a checkpoint for its pins continues from it.
+    Batches are made smaller when their arrays would not fit in
+    `MAX_TABLE_BYTES`, and boards whose route table does not fit are searched
+    with `example_solution.iter_paths` instead. With a `deadline`, batches
+    are sized to take about `BATCH_SECONDS`, and the deadline is also checked
+    while the route table is built and at every step of a batch.
+    """
+    pins = list(dict.fromkeys(pins))
+    if len(pins) < 2:
+        yield [], 0
+        return
+    if not table_fits(pins):
+        yield from example_solution.iter_paths(pins, target, deadline, seed=seed, checkpoint=checkpoint,
+                                               checkpoint_interval=checkpoint_interval, use_cache=use_cache)
+        return
+    batch_size = fit_batch_size(pins, batch_size)
+    target = max(0 if target is None else target, lower_bound(pins))
+    paths, total_flops = solution_cache.get(pins) if use_cache else None, 0
+    state = None if checkpoint is None else load_checkpoint(checkpoint, pins)
+    if state is not None:
+        seed = state['seed']
+    elif checkpoint is not None and seed is None:
+        seed = secrets.randbits(32)  # Saved in the checkpoint, so the run can be repeated
+    generator = np.random.default_rng(seed)
+    if state is not None:
+        # Continue the random stream where the checkpoint left it
+        generator.bit_generator.state = state['rng_state']
+        total_flops = state['flops']
+        if paths is None or (state['best'] is not None and len(state['best']) < len(paths)):
+            paths = state['best']
+    best_length = None if paths is None else len(paths)
+    if paths is not None:
+        yield paths, total_flops
+        if best_length <= target:
+            if checkpoint is not None:
+                remove_checkpoint(checkpoint)
+            return
+    size = BoardState.for_points(pins).size
+
+    def save(stage, stage_evals):
+        save_checkpoint(checkpoint, {
+            'pins': pins, 'seed': seed, 'best': paths, 'flops': total_flops + stage_evals,
+            'stage': stage, 'stage_evals': stage_evals, 'rng_state': generator.bit_generator.state,
+        })
+
+    interrupted = False
+    next_checkpoint = default_timer() + checkpoint_interval
+    # Without a deadline every batch has the same size, so runs with the same seed construct the same trees.
+    # With one, the first batch is small and later ones follow its speed.
+    batch = batch_size if deadline is None else min(batch_size, FIRST_BATCH)
+    for stage, (max_evals, rng) in enumerate((
+            (10_000_000, 3),
+            (10_000_000, 4),
+    )):
+        if state is not None and stage < state['stage']:
+            continue
+        done = state['stage_evals'] if state is not None and stage == state['stage'] else 0
+        total_flops -= done  # Counted again below
+        flops = done
+        while flops < max_evals:
+            start = default_timer()
+            edges = connect_pins_batch(pins, batch, rng, generator, deadline)
+            if edges is None:
+                interrupted = True
+                break
+            flops += batch
+            if deadline is not None:
+                # Keep batches short enough to check the deadline, judged by the speed of the last one
+                batch = timed_batch_size(batch, default_timer() - start, batch_size)
+            lengths = edges.sum(axis=1)
+            best = lengths.argmin()
+            if best_length is None or lengths[best] < best_length:
+                best_length = lengths[best]
+                elements = board_elements(size)
+                paths = [elements[i] for i in np.nonzero(edges[best])[0]]
+                yield paths, total_flops + flops
+            if best_length <= target:
+                break
+            if deadline is not None and default_timer() >= deadline:
+                interrupted = True
+                break
+            if checkpoint is not None and default_timer() >= next_checkpoint:
+                save(stage, flops)
+                next_checkpoint = default_timer() + checkpoint_interval
+        if interrupted and checkpoint is not None:
+            save(stage, flops)
+        total_flops += flops
+        if interrupted or best_length <= target:
+            break
+    if paths is None:
+        # Out of time before the first batch was done, so settle for a single greedy tree
+        paths, total_flops = example_solution.connect_pins(pins, 3, generator=Random(seed)), total_flops + 1
+        yield paths, total_flops
+    if checkpoint is not None and not interrupted:
+        remove_checkpoint(checkpoint)
+    if use_cache:
+        solution_cache.put(pins, paths)
+    yield paths, total_flops
+
+
+def find_paths(pins: Points, target: int = None, deadline: float = None, seed: int = None,
+               checkpoint: Path = None, use_cache: bool = False) -> Tuple[Paths, int]:
+    """
+    Batched random-restart greedy search, vectorized with NumPy.
+    """
+    for paths, flops in iter_paths(pins, target, deadline=deadline, seed=seed, checkpoint=checkpoint,
+                                   use_cache=use_cache):
+        pass
+    return paths, flops
@@ -0,0 +1,197 @@
+"""
+Benchmarks a solution module on the test cases with fixed seeds.
+
+> python bench.py example_solution --baseline solutions/example_solution/bench.json
+
+Writes per case rows and a summary per difficulty to a JSON file, and reports
+regressions against a previously stored benchmark.
+
+> python bench.py --restart-rate
+
+Compares the greedy restarts per second of `example_solution.connect_pins`
+with those of `batch_solution.connect_pins_batch` on the 12 pin extremschwer
+boards instead.
+"""
+from definitions import Cases, get_clusters, solutions_root, sorted_difficulties
+from utils import get_unique_filename, json_in, json_out
+from solution_cache import solution_cache
+from example_solution import connect_pins
+from batch_solution import connect_pins_batch
+from timeit import default_timer
+import numpy as np
+import tracemalloc
+import importlib
+import inspect
+import argparse
+import random
+
+
+def bench_case(path_finder, case, seed: int, trace_memory: bool = False, time_budget: float = None,
+               target: int = None, table_size: int = 0) -> dict:
+    # Solvers with a seed parameter get it, others use the global random state.
+    # They search for a tree of `target` path elements, by default `case.kanten`.
+    # Solvers with a transposition table use one of `table_size` trees, if set.
+    parameters = inspect.signature(path_finder).parameters
+    kwargs = {'seed': seed} if 'seed' in parameters else {}
+    if table_size and 'table_size' in parameters:
+        kwargs['table_size'] = table_size
+    random.seed(seed)
+    np.random.seed(seed)
+    if trace_memory:
+        # Count what the solver allocates, not what earlier cases left in caches
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    start = default_timer()
+    if time_budget is not None and 'deadline' in parameters:
+        kwargs['deadline'] = start + time_budget
+    paths, flops = path_finder(case.pins, case.kanten if target is None else target, **kwargs)
+    d_time = default_timer() - start
+    _, pin_clusters = get_clusters(paths, case.pins)
+    is_success = len(set(pin_clusters.values())) == 1
+    return {
+        'id': case.id,
+        'schwierigkeit': case.schwierigkeit,
+        'size': case.size,
+        'pins': len(case.pins),
+        'kanten': case.kanten,
+        'seed': seed,
+        'is_successful': is_success,
+        'reached_target': is_success and len(paths) <= case.kanten,
+        'paths_used': len(paths),
+        'flops': flops,
+        'time': d_time,
+        'peak_memory': tracemalloc.get_traced_memory()[1] - baseline if trace_memory else None,
+    }
+
+
+def restart_rate(case, seconds: float = 3., rng: int = 3, batch_size: int = 4096, seed: int = 0) -> dict:
+    """
+    Greedy restarts per second on the pins of `case`, one tree at a time with
+    `example_solution.connect_pins` and `batch_size` trees at a time with
+    `batch_solution.connect_pins_batch`. Both run on one core for about
+    `seconds`, after a first call that builds their tables, and are timed the
+    same way: the trees completed divided by the time they took.
+    """
+    generator, batch_generator = random.Random(seed), np.random.default_rng(seed)
+    rates = {}
+    for name, build, trees in (
+            ('connect_pins', lambda: connect_pins(case.pins, rng, generator=generator), 1),
+            ('connect_pins_batch', lambda: connect_pins_batch(case.pins, batch_size, rng, batch_generator), batch_size),
+    ):
+        build()
+        restarts, start = 0, default_timer()
+        while default_timer() - start < seconds:
+            build()
+            restarts += trees
+        rates[name] = restarts / (default_timer() - start)
+    rates['speedup'] = rates['connect_pins_batch'] / rates['connect_pins']
+    return {'id': case.id, 'pins': len(case.pins), **rates}
+
+
+def summarize(rows: list) -> dict:
+    summary = {}
+    for difficulty in sorted_difficulties:
+        group = [row for row in rows if row['schwierigkeit'] == difficulty]
+        if not group:
+            continue
+        reached = [row['time'] for row in group if row['reached_target']]
+        total_time = sum(row['time'] for row in group)
+        memory = [row['peak_memory'] for row in group if row['peak_memory'] is not None]
+        summary[difficulty] = {
+            'cases': len(group),
+            'success_rate': float(np.mean([row['reached_target'] for row in group])),
+            'median_time_to_target': float(np.median(reached)) if reached else None,
+            'p95_time_to_target': float(np.percentile(reached, 95)) if reached else None,
+            'restarts_per_second': sum(row['flops'] for row in group) / total_time if total_time else None,
+            'peak_memory': max(memory) if memory else None,
+        }
+    return summary
+
+
+def run_bench(_solution_name: str, seed: int = 0, n: int = None, trace_memory: bool = False,
+              table_size: int = 0) -> dict:
+    solution_module = importlib.import_module(_solution_name)
+    path_finder = getattr(solution_module, 'find_paths')
+    # Measure the search itself, not lookups of trees found in earlier runs
+    solution_cache.enabled = False
+    if trace_memory:
+        tracemalloc.start()
+    # Every case gets its own fixed seed, so results do not depend on the case order
+    rows = [bench_case(path_finder, case, seed + case.id, trace_memory, table_size=table_size)
+            for case in sorted(Cases(n), key=lambda c: c.id)]
+    if trace_memory:
+        tracemalloc.stop()
+    return {'solution': _solution_name, 'seed': seed, 'table_size': table_size, 'cases': rows,
+            'summary': summarize(rows)}
+
+
+def find_regressions(result: dict, baseline: dict, tolerance: float = .1) -> list:
+    regressions = []
+    for difficulty, new in result['summary'].items():
+        old = baseline['summary'].get(difficulty)
+        if old is None:
+            continue
+        if new['success_rate'] < old['success_rate']:
+            regressions.append(f"{difficulty}: success rate {old['success_rate']:.0%} -> {new['success_rate']:.0%}")
+        for key in ('median_time_to_target', 'p95_time_to_target', 'peak_memory'):
+            if new[key] is not None and old[key] is not None and new[key] > old[key] * (1 + tolerance):
+                regressions.append(f'{difficulty}: {key} {old[key]:.4g} -> {new[key]:.4g}')
+        key = 'restarts_per_second'
+        if new[key] is not None and old[key] is not None and new[key] * (1 + tolerance) < old[key]:
+            regressions.append(f'{difficulty}: {key} {old[key]:.4g} -> {new[key]:.4g}')
+    return regressions
+
+
+def print_summary(summary: dict) -> None:
+    def fmt(value, spec):
+        return '-' if value is None else format(value, spec)
+
+    print(f"{'difficulty':<14}{'cases':>6}{'success':>9}{'median s':>10}{'p95 s':>10}{'restarts/s':>12}{'peak MB':>9}")
+    for difficulty, row in summary.items():
+        memory = None if row['peak_memory'] is None else row['peak_memory'] / 2 ** 20
+        print(f"{difficulty:<14}{row['cases']:>6}{row['success_rate']:>9.0%}"
+              f"{fmt(row['median_time_to_target'], '.3f'):>10}{fmt(row['p95_time_to_target'], '.3f'):>10}"
+              f"{fmt(row['restarts_per_second'], '.0f'):>12}{fmt(memory, '.1f'):>9}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark a path finding solution.")
+    parser.add_argument("solution", nargs="?", default="your_solution",
+                        help="Module name where find_paths function is located. Default is 'your_solution'.")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed, case i is run with seed + i.")
+    parser.add_argument("--cases", type=int, default=None, help="Only benchmark the first n cases.")
+    parser.add_argument("--memory", action="store_true", help="Trace peak memory (slows down the solver).")
+    parser.add_argument("--table-size", type=int, default=0,
+                        help="Skip trees built before, remembering this many per search. Default is 0 (off).")
+    parser.add_argument("--out", default=None, help="JSON file to write. Default is solutions/<solution>/bench.json.")
+    parser.add_argument("--baseline", default=None, help="Benchmark JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=.1, help="Relative slowdown that counts as regression.")
+    parser.add_argument("--restart-rate", action="store_true",
+                        help="Only compare the restarts per second of connect_pins and connect_pins_batch.")
+    args = parser.parse_args()
+
+    if args.restart_rate:
+        print(f"{'case':>6}{'pins':>6}{'connect_pins':>14}{'batch':>10}{'speedup':>9}")
+        for case in Cases(schwierigkeit='extremschwer', pins=12):
+            row = restart_rate(case, seed=args.seed)
+            print(f"{row['id']:>6}{row['pins']:>6}{row['connect_pins']:>14.0f}{row['connect_pins_batch']:>10.0f}"
+                  f"{row['speedup']:>8.1f}x")
+        raise SystemExit
+
+    result = run_bench(args.solution, seed=args.seed, n=args.cases, trace_memory=args.memory,
+                       table_size=args.table_size)
+    print_summary(result['summary'])
+
+    if args.out is None:
+        (solutions_root / args.solution).mkdir(parents=True, exist_ok=True)
+        target = get_unique_filename(solutions_root / args.solution / 'bench.json')
+    else:
+        target = args.out
+    json_out(result, target)
+    print(f'\nWritten to {target}')
+
+    if args.baseline is not None:
+        regressions = find_regressions(result, json_in(args.baseline), args.tolerance)
+        print('\nRegressions:\n- ' + '\n- '.join(regressions) if regressions else '\nNo regressions.')
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,226 @@
+"""
+Branch-and-bound search that also reports a proven lower bound.
+
+Trees are grown from a pin by attaching the open pin nearest to the tree with
+every route along the Hanan grid lines (the rows and columns of the pins) that
+turns only where two of them cross and ends at the first tree point it meets.
+By Hanan's theorem some shortest tree lies on these lines, and each of its
+paths from the attached pin to the tree is one of the routes, so the branching
+misses no tree. Routes are generated lazily, shortest first, and a route or
+partial tree is pruned when its length plus a lower bound on the path elements
+still needed is no shorter than the best tree found. The search starts from
+the shorter of a greedy tree shortened by local search and the `mst_solution`
+tree. Running out of partial trees proves that the best tree is optimal, and
+the search stops early once the best tree meets `utils.lower_bound`.
+
+> python bnb_solution.py
+"""
+from definitions import Point, Points, Paths, Tuple, List, Dict, BoardState, Cases, iter_bits
+from example_solution import connect_pins
+from local_search import improve
+import mst_solution
+from utils import lower_bound, manhattan_distance
+from timeit import default_timer
+from random import Random
+
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def parts_bound(distances: List[List[int]]) -> int:
+    # Every part needs a route to its nearest part, and walking twice around a tree that connects
+    # k parts passes all of them, which takes at least k / (k - 1) times their minimum spanning tree
+    k = len(distances)
+    if k < 2:
+        return 0
+    nearest = max(min(d for j, d in enumerate(row) if j != i) for i, row in enumerate(distances))
+    cost, in_tree, mst = list(distances[0]), [True] + [False] * (k - 1), 0
+    for _ in range(k - 1):
+        j = min((c, j) for j, c in enumerate(cost) if not in_tree[j])[1]
+        in_tree[j] = True
+        mst += cost[j]
+        cost = [min(c, d) for c, d in zip(cost, distances[j])]
+    return max(nearest, -(-mst * k // (2 * (k - 1))))
+
+
+def box_growth(extent: Tuple[Point, Point], box: Tuple[Point, Point]) -> int:
+    # The tree has to grow from its extent to the bounding box of all pins
+    (x_min, y_min), (x_max, y_max) = box
+    (x0, y0), (x1, y1) = extent
+    return max(x0 - x_min, 0) + max(x_max - x1, 0) + max(y0 - y_min, 0) + max(y_max - y1, 0)
+
+
+def merge_extents(extent: Tuple[Point, Point], other: Tuple[Point, Point]) -> Tuple[Point, Point]:
+    (x0, y0), (x1, y1) = extent
+    (u0, v0), (u1, v1) = other
+    return (min(x0, u0), min(y0, v0)), (max(x1, u1), max(y1, v1))
+
+
+def attachments(tree: BoardState, extent: Tuple[Point, Point], pin: Point, others: Points, budget,
+                distances: Dict[Point, int], pin_distances: Dict, xs: set, ys: set, box: Tuple[Point, Point]):
+    """
+    Yields the routes from `pin` to `tree` along the Hanan grid lines `xs` and `ys`,
+    as lists of points, that can still be part of a tree within `budget()` more path
+    elements. Routes that head for the tree are tried first. `distances` holds the
+    distance from each point on the lines to the tree, and the `others` are the pins
+    that remain open after `pin`. Yields None every 4096 steps, so the caller can
+    check its deadline while few routes are found.
+    """
+    (x_min, y_min), (x_max, y_max) = box
+    # Distances between the parts: the tree, the route and the other pins
+    base = [[0, 0] + [distances[q] for q in others], [0, 0] + [0] * len(others)] + \
+           [[distances[p], 0] + [pin_distances[p, q] for q in others] for p in others]
+    route, on_route = [pin], {pin}
+    steps = 0
+
+    def walk(point, direction, to_tree, to_others, route_extent):
+        nonlocal steps
+        steps += 1
+        if not steps % 4096:
+            yield None
+        x, y = point
+        candidates = []
+        for step in STEPS:
+            if direction is not None:
+                if step == (-direction[0], -direction[1]):
+                    continue
+                if step != direction and (x not in xs or y not in ys):
+                    continue  # Routes turn only where grid lines cross
+            nxt = x + step[0], y + step[1]
+            if not (x_min <= nxt[0] <= x_max and y_min <= nxt[1] <= y_max) or nxt in on_route:
+                continue
+            if step[0] and nxt[1] not in ys or step[1] and nxt[0] not in xs:
+                continue
+            candidates.append((distances[nxt], step, nxt))
+        for to_next, step, nxt in sorted(candidates):
+            rest = budget() - len(route)
+            if rest < 0:
+                return
+            if nxt in tree:
+                yield route + [nxt]
+                continue
+            new_to_tree = min(to_tree, to_next)
+            if new_to_tree > rest:
+                continue
+            new_extent = merge_extents(route_extent, (nxt, nxt))
+            if box_growth(merge_extents(extent, new_extent), box) > rest:
+                continue
+            new_to_others = [min(d, manhattan_distance(nxt, q)) for d, q in zip(to_others, others)]
+            matrix = [row[:] for row in base]
+            matrix[0][1] = matrix[1][0] = new_to_tree
+            for i, d in enumerate(new_to_others):
+                matrix[1][2 + i] = matrix[2 + i][1] = d
+            if parts_bound(matrix) > rest:
+                continue
+            route.append(nxt)
+            on_route.add(nxt)
+            yield from walk(nxt, step, new_to_tree, new_to_others, new_extent)
+            route.pop()
+            on_route.discard(nxt)
+
+    yield from walk(pin, None, distances[pin], [pin_distances[pin, q] for q in others], (pin, pin))
+
+
+def branch_and_bound(pins: Points, incumbent: Paths = None, target: int = None, deadline: float = None,
+                     max_nodes: int = 1_000_000, seed: int = None) -> Tuple[Paths, int, int]:
+    """
+    Searches for a shorter tree than `incumbent` by branch-and-bound.
+
+    Parameters:
+    - pins (Points): The pins to connect.
+    - incumbent (Paths): A valid tree to start from. Default is the shorter of a greedy
+      and a Steinerized MST tree.
+    - target (int): Stop once a tree of at most this length is found.
+    - deadline (float): A `timeit.default_timer` value after which the search stops.
+    - max_nodes (int): Maximum number of partial trees to expand.
+    - seed (int): Seed of the greedy tree.
+
+    Returns:
+    - Paths: The best tree found.
+    - int: A proven lower bound on the length of any tree connecting the pins. This is
+      the length of the best tree when the search ran out of partial trees.
+    - int: The number of partial trees expanded.
+    """
+    pins = list(dict.fromkeys(pins))
+    bound = lower_bound(pins)
+    if len(pins) < 2:
+        return [], bound, 0
+    if incumbent is None:
+        greedy = improve(connect_pins(pins, generator=Random(seed)), pins)
+        incumbent = min(greedy, mst_solution.find_paths(pins)[0], key=len)
+    best, best_length = incumbent, len(incumbent)
+    stop_length = max(bound, 0 if target is None else target)
+    xs, ys = {x for x, _ in pins}, {y for _, y in pins}
+    box = (min(xs), min(ys)), (max(xs), max(ys))
+    (x_min, y_min), (x_max, y_max) = box
+    lines = [(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1) if x in xs or y in ys]
+    pin_distances = {(p, q): manhattan_distance(p, q) for p in pins for q in pins}
+
+    def expand(tree: BoardState, open_pins: Points):
+        # The routes that attach the open pin nearest to the tree, or None when the tree can be pruned
+        width = tree.width
+        tree_points = [(i % width, i // width) for i in iter_bits(tree.points)]
+        extent = (min(x for x, _ in tree_points), min(y for _, y in tree_points)), \
+                 (max(x for x, _ in tree_points), max(y for _, y in tree_points))
+        distances = {p: min(abs(p[0] - x) + abs(p[1] - y) for x, y in tree_points) for p in lines}
+        budget = best_length - 1 - len(tree)
+        parts = [[0] + [distances[q] for q in open_pins]] + \
+                [[distances[p]] + [pin_distances[p, q] for q in open_pins] for p in open_pins]
+        if max(parts_bound(parts), box_growth(extent, box)) > budget:
+            return None
+        pin = min(open_pins, key=distances.get)
+        others = [p for p in open_pins if p != pin]
+        return attachments(tree, extent, pin, others, lambda: best_length - 1 - len(tree),
+                           distances, pin_distances, xs, ys, box)
+
+    root = BoardState.for_points(pins)
+    root.points |= 1 << root.point_index(pins[0])
+    to_visit = [(root, tuple(pins[1:]), expand(root, pins[1:]))]
+    if to_visit[0][2] is None:
+        to_visit.clear()
+    seen = {root.edges}
+    nodes = 0
+    while to_visit and best_length > stop_length and nodes < max_nodes:
+        if deadline is not None and default_timer() >= deadline:
+            break
+        tree, open_pins, routes = to_visit[-1]
+        route = next(routes, False)
+        if route is False:
+            to_visit.pop()
+            continue
+        if route is None:
+            continue
+        nodes += 1
+        child = tree.copy()
+        child.add_paths(zip(route, route[1:]))
+        if child.edges in seen:
+            continue
+        seen.add(child.edges)
+        remaining = tuple(p for p in open_pins if p not in child)
+        if not remaining:
+            if len(child) < best_length:
+                best, best_length = child.to_paths(), len(child)
+            continue
+        routes = expand(child, remaining)
+        if routes is not None:
+            to_visit.append((child, remaining, routes))
+    if not to_visit:
+        # Every tree on the Hanan grid lines was found or pruned
+        bound = max(bound, best_length)
+    return best, bound, nodes
+
+
+def find_paths(pins: Points, target: int = None, deadline: float = None, seed: int = None) -> Tuple[Paths, int]:
+    """
+    Branch-and-bound search from a polished greedy tree. The `flops` returned
+    are the number of partial trees expanded.
+    """
+    paths, _, nodes = branch_and_bound(pins, target=target, deadline=deadline, seed=seed)
+    return paths, nodes
+
+
+if __name__ == '__main__':
+    for case in sorted(Cases(), key=lambda c: c.id):
+        start = default_timer()
+        paths, bound, nodes = branch_and_bound(case.pins, deadline=start + 5)
+        print(f'{case.name:<40}kanten {case.kanten:>3}  found {len(paths):>3}  lower bound {bound:>3}  '
+              f'nodes {nodes:>8}  {default_timer() - start:6.2f} s')
@@ -0,0 +1,50 @@
+"""
+Checkpoints of long searches, so an interrupted search continues where it
+stopped instead of starting over.
+
+A checkpoint is a JSON file with the pins, the seed and the best tree, plus
+whatever a solver needs to continue: the stage of its schedule, the
+evaluations done and the state of its random generator. It is written to a
+temporary file first and then moved in place, so a search that is killed
+while writing leaves the previous checkpoint intact.
+
+Within a run, `Case.solve` gives every solver with a `checkpoint` parameter
+a file in `solutions/<solver>/checkpoints/<run id>`, which is removed once the
+search is done. Checkpoints are only continued from when the run is resumed
+(`python test.py --resume <run id>`), so a new run never picks up the seed,
+evaluations or time of an earlier one.
+"""
+from definitions import Points, solutions_root
+from utils import json_in, json_out
+from pathlib import Path
+import os
+
+
+def checkpoint_dir(solver: str, run_id: str) -> Path:
+    """The directory with the checkpoints of the cases of a run."""
+    return solutions_root / solver / 'checkpoints' / run_id
+
+
+def save_checkpoint(path: Path, state: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(f'.{os.getpid()}.tmp')
+    json_out(state, temporary)
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path: Path, pins: Points) -> dict:
+    """Returns the checkpoint at `path`, or None if there is none for these pins."""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    state = json_in(path)
+    # Solvers may save the pins with or without duplicates
+    if set(map(tuple, state['pins'])) != set(pins):
+        return None
+    state['best'] = [(tuple(p[0]), tuple(p[1])) for p in state['best']] if state['best'] else None
+    return state
+
+
+def remove_checkpoint(path: Path) -> None:
+    Path(path).unlink(missing_ok=True)
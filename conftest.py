@@ -0,0 +1 @@
+# Makes the modules in the project root importable by the tests in tests/
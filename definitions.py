@@ -1,7 +1,13 @@
 from typing import List, Tuple, Dict
+from functools import lru_cache
 from pathlib import Path
 from typing import Callable
+from collections.abc import Sequence
 from timeit import default_timer
+import numpy as np
+import argparse
+import inspect
+import secrets
 import json
 
 # Object types
@@ -32,6 +38,107 @@ class Colors:
 colors = Colors()
 
 
+# Number of set bits in an integer bitmask
+popcount = getattr(int, 'bit_count', lambda mask: bin(mask).count('1'))
+
+
+def iter_bits(mask: int):
+    """Yields the indices of the set bits in `mask`, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@lru_cache(maxsize=None)
+def board_elements(size: int) -> Tuple[PathElement, ...]:
+    """All path elements of a board, ordered by their index in a BoardState."""
+    width = size + 1
+    horizontal = [((x, y), (x + 1, y)) for y in range(width) for x in range(size)]
+    vertical = [((x, y), (x, y + 1)) for x in range(width) for y in range(size)]
+    return tuple(horizontal + vertical)
+
+
+class BoardState:
+    """
+  Compact representation of the paths placed on a board. Path elements and the
+  points they cover are stored as the bits of two integers, so adding, testing
+  and merging are single integer operations instead of list traversals.
+
+  Parameters:
+  - size (int): Size of the board (number of tiles in each row/column).
+  - paths (Paths): Path elements to place on the board. Default is empty.
+
+  Notes:
+  Points are indexed row by row. Horizontal path elements are indexed row by
+  row, followed by the vertical path elements column by column.
+  Use `to_paths` to convert back to the public Paths format.
+  """
+
+    def __init__(self, size: int = 10, paths: Paths = ()):
+        self.size = size
+        self.width = size + 1
+        self.edges = 0
+        self.points = 0
+        self.add_paths(paths)
+
+    @classmethod
+    def for_points(cls, points: Points, paths: Paths = ()) -> 'BoardState':
+        """Creates the smallest board that holds all `points`."""
+        return cls(max(max(point) for point in points), paths)
+
+    def point_index(self, point: Point) -> int:
+        x, y = point
+        return y * self.width + x
+
+    def edge_index(self, path: PathElement) -> int:
+        (x1, y1), (x2, y2) = path
+        if y1 == y2:
+            return y1 * self.size + min(x1, x2)
+        return self.size * self.width + x1 * self.size + min(y1, y2)
+
+    def add(self, path: PathElement) -> None:
+        point1, point2 = path
+        self.edges |= 1 << self.edge_index(path)
+        self.points |= 1 << self.point_index(point1) | 1 << self.point_index(point2)
+
+    def add_paths(self, paths: Paths) -> None:
+        for path in paths:
+            self.add(path)
+
+    def copy(self) -> 'BoardState':
+        state = BoardState(self.size)
+        state.edges, state.points = self.edges, self.points
+        return state
+
+    def union(self, other: 'BoardState') -> 'BoardState':
+        state = self.copy()
+        state.edges |= other.edges
+        state.points |= other.points
+        return state
+
+    __or__ = union
+
+    def __contains__(self, item) -> bool:
+        # Path elements are pairs of points, points are pairs of integers
+        if isinstance(item[0], tuple):
+            return bool(self.edges >> self.edge_index(item) & 1)
+        return bool(self.points >> self.point_index(item) & 1)
+
+    def __len__(self) -> int:
+        return popcount(self.edges)
+
+    def __iter__(self):
+        elements = board_elements(self.size)
+        return (elements[i] for i in iter_bits(self.edges))
+
+    def to_paths(self) -> Paths:
+        return list(self)
+
+    def to_points(self) -> Points:
+        return [(i % self.width, i // self.width) for i in iter_bits(self.points)]
+
+
 
 
 
@@ -41,7 +148,8 @@ def get_clusters(paths: Paths, pins: Points = []) -> Tuple[Dict, Dict]:
   with points as keys and the cluster label as the value. Pins are optional.
 
   Parameters:
-  - paths (Paths): List of paths, where each path is a tuple of points (PathElement).
+  - paths (Paths): List of paths, where each path is a tuple of points (PathElement),
+    or a BoardState.
   - pins (Points): List of pins, where each pin is a point (Point). Default is an empty list.
 
   Returns:
@@ -54,35 +162,22 @@ def get_clusters(paths: Paths, pins: Points = []) -> Tuple[Dict, Dict]:
   also be used for visualization purposes.
   """
     # Validate input data
-    if not isinstance(paths[0][0], tuple):
+    first = next(iter(paths), None)
+    if first is not None and not isinstance(first[0], tuple):
         raise ValueError(f'Invalid path data: {paths}, did you accidentally provide pin data inst')
 
-    # Populate connections based on paths between pins
-    point_owners = {}
-    for i, points in enumerate(paths):
-        for point in points:
-            if point not in point_owners:
-                point_owners[point] = [i]
-            else:
-                point_owners[point].append(i)
+    # Merge the end points of every path element into common clusters
+    clusters = DisjointSet()
+    for point1, point2 in paths:
+        clusters.union(point1, point2)
 
-    label = 0
+    # Number the clusters in order of first appearance
+    labels = {}
     path_clusters = {}
-    while True:
-        # Check if there are unvisited starting points
-        starts = [path[0] for path in paths if path[0] not in path_clusters]
-        if not any(starts):
-            break
-        # Perform a depth-first search (DFS) starting from the first pin
-        to_visit = [starts[0]]
-        while any(to_visit):
-            point = to_visit.pop()
-            path_clusters[point] = label
-            for point_owner in point_owners[point]:
-                for point in paths[point_owner]:
-                    if point not in path_clusters:
-                        to_visit.append(point)
-        label += 1
+    for path in paths:
+        for point in path:
+            path_clusters[point] = labels.setdefault(clusters.find(point), len(labels))
+    label = len(labels)
     pin_clusters = {}
     for pin in pins:
         if pin not in path_clusters:
@@ -93,15 +188,218 @@ def get_clusters(paths: Paths, pins: Points = []) -> Tuple[Dict, Dict]:
     return path_clusters, pin_clusters
 
 
-class Cases(list):
-    def __init__(self, n: int = None):
-        for case_path in cases_dir.glob('*.json'):
+class DisjointSet:
+    """
+  Union-find over hashable items, with path compression and union by size.
+  Items are added implicitly the first time they are looked up.
+  """
+
+    def __init__(self):
+        self.parent = {}
+        self.sizes = {}
+
+    def find(self, item):
+        parent = self.parent
+        if item not in parent:
+            parent[item] = item
+            self.sizes[item] = 1
+            return item
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        # Path compression: point everything on the way directly to the root
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, item1, item2):
+        """Merges the clusters of both items and returns the root of the merged cluster."""
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 == root2:
+            return root1
+        if self.sizes[root1] < self.sizes[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.sizes[root1] += self.sizes.pop(root2)
+        return root1
+
+
+class PinClusters(DisjointSet):
+    """
+  Incremental connectivity check. Path elements are added one at a time and
+  `is_connected` tells whether all pins are in the same cluster, in amortized
+  O(α(n)) per path element.
+
+  Parameters:
+  - pins (Points): List of pins, where each pin is a point (Point).
+
+  Example:
+  > clusters = PinClusters([(0, 0), (0, 2)])
+  > clusters.add(((0, 0), (0, 1)))  # Returns False
+  > clusters.add(((0, 1), (0, 2)))  # Returns True
+  """
+
+    def __init__(self, pins: Points):
+        super().__init__()
+        self.pin_roots = {self.find(pin) for pin in pins}
+
+    @property
+    def is_connected(self) -> bool:
+        return len(self.pin_roots) <= 1
+
+    def add(self, path: PathElement) -> bool:
+        root1, root2 = self.find(path[0]), self.find(path[1])
+        if root1 != root2:
+            root = self.union(root1, root2)
+            if root1 in self.pin_roots or root2 in self.pin_roots:
+                self.pin_roots -= {root1, root2}
+                self.pin_roots.add(root)
+        return self.is_connected
+
+    def add_paths(self, paths: Paths) -> bool:
+        for path in paths:
+            self.add(path)
+        return self.is_connected
+
+
+class Cases(Sequence):
+    """
+  A lazy view of a set of cases, which are only loaded when accessed.
+
+  Parameters:
+  - n (int): Keep only the first `n` cases.
+  - source (Path): A directory of case JSON files, or a case set packed with `pack_cases`. Default is cases/.
+  - schwierigkeit, size, pins: Keep only cases with these properties, either a value or a collection of values
+    (e.g. `pins=range(10, 20)`). `pins` is the number of pins.
+
+  > cases = Cases(schwierigkeit=['schwer', 'sehrschwer'], size=10)
+  > case = cases[0]  # Loads this case only
+
+  The properties to filter on come from the file names of JSON cases (or
+  from the file itself, if its name is not made by `utils.zip_name`), and
+  from the header of a packed case set, whose pins are memory mapped.
+  """
+
+    def __init__(self, n: int = None, source: Path = cases_dir, **filters):
+        source = Path(source)
+        if source.is_dir():
+            self._pins = None
+            self._index = [_json_index(case_path) for case_path in sorted(source.glob('*.json'))]
+        else:
+            self._index, self._pins = _load_packed(source)
+        self.source = source
+        self._index = self._filtered(self._index, filters)[:n]
+
+    @staticmethod
+    def _filtered(index: list, filters: dict) -> list:
+        for key, allowed in filters.items():
+            if allowed is None:
+                continue
+            if key not in ('schwierigkeit', 'size', 'pins'):
+                raise TypeError(f'Cases can not be filtered on {key!r}')
+            if isinstance(allowed, (str, int)):
+                allowed = (allowed,)
+            index = [entry for entry in index if entry[key] in allowed]
+        return index
+
+    def filter(self, schwierigkeit=None, size=None, pins=None) -> 'Cases':
+        """A view of the cases with these properties, see `Cases`."""
+        return self._view(self._filtered(self._index, {'schwierigkeit': schwierigkeit, 'size': size, 'pins': pins}))
+
+    def _view(self, index: list) -> 'Cases':
+        view = object.__new__(Cases)
+        view.source, view._pins, view._index = self.source, self._pins, index
+        return view
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self._view(self._index[item])
+        entry = self._index[item]
+        if self._pins is None:
             try:
-                self.append(Case.from_json(case_path))
+                return Case.from_json(entry['file'])
             except json.decoder.JSONDecodeError:
-                raise ValueError(f'Invalid JSON in {case_path}')
-            if n is not None and len(self) >= n:
-                return
+                raise ValueError(f"Invalid JSON in {entry['file']}")
+        start, stop = entry['offset'], entry['offset'] + entry['pins']
+        pins = [tuple(pin) for pin in self._pins[start:stop].tolist()]
+        return Case(self.source.with_name(entry['file']), pins=pins, paths=_sanitize_paths(entry.get('paths', [])),
+                    **entry['case'])
+
+    def info(self) -> List[dict]:
+        """The properties of every case in the view, without loading them."""
+        return [{'file': Path(entry['file']).name, 'schwierigkeit': entry['schwierigkeit'], 'size': entry['size'],
+                 'pins': entry['pins']} for entry in self._index]
+
+
+# Packed case sets start with this, followed by the length and JSON of the header, and the pins as (x, y) pairs
+# of uint8, or of uint16 for boards larger than 255
+PACKED_MAGIC = b'DOUROCASES1\n'
+
+
+def _json_index(case_path: Path) -> dict:
+    from utils import unzip_name  # utils imports this module
+    name = case_path.stem.removesuffix('_case')
+    try:
+        info = unzip_name(name)
+        named = {part.split('-')[0] for part in name.split('_')} >= {'schwierigkeit', 'size', 'pins'}
+    except ValueError:
+        named = False
+    if not named:
+        # Not named with `zip_name`, so the properties are read from the file itself
+        try:
+            with open(case_path) as file:
+                case = json.load(file)
+        except json.decoder.JSONDecodeError:
+            raise ValueError(f'Invalid JSON in {case_path}')
+        info = {'schwierigkeit': case.get('schwierigkeit', sorted_difficulties[0]), 'size': case.get('size', 10),
+                'pins': len(case.get('pins', []))}
+    return {'file': case_path, 'schwierigkeit': info['schwierigkeit'], 'size': info['size'], 'pins': info['pins']}
+
+
+def _sanitize_paths(paths: list) -> Paths:
+    return [(tuple(p[0]), tuple(p[1])) for p in paths]
+
+
+def pack_cases(cases, target: Path) -> Path:
+    """
+    Writes `cases` (any iterable of Case objects) to a single packed case set,
+    which `Cases(source=target)` reads back. Properties of the cases are kept
+    in a JSON header, and their pins in one uint8 (or for boards larger than
+    255, uint16) array.
+    """
+    header, pins = [], []
+    for case in cases:
+        properties = {k: v for k, v in case.__dict__.items() if isinstance(v, (str, int)) and k != 'file'}
+        entry = {'file': Path(case.file).name, 'schwierigkeit': properties.get('schwierigkeit', sorted_difficulties[0]),
+                 'size': properties.get('size', 10), 'pins': len(case.pins), 'offset': len(pins), 'case': properties}
+        if case.paths:
+            entry['paths'] = case.paths
+        header.append(entry)
+        pins.extend(case.pins)
+    dtype = np.uint8 if max(map(max, pins), default=0) <= np.iinfo(np.uint8).max else np.uint16
+    pins = np.asarray(pins, dtype=dtype).reshape(-1, 2)
+    encoded = json.dumps({'dtype': np.dtype(dtype).str, 'cases': header}, separators=(',', ':')).encode()
+    target = Path(target)
+    with open(target, 'wb') as file:
+        file.write(PACKED_MAGIC + len(encoded).to_bytes(8, 'little') + encoded)
+        file.write(pins.tobytes())
+    return target
+
+
+def _load_packed(source: Path):
+    with open(source, 'rb') as file:
+        if file.read(len(PACKED_MAGIC)) != PACKED_MAGIC:
+            raise ValueError(f'{source} is not a packed case set')
+        length = int.from_bytes(file.read(8), 'little')
+        header = json.loads(file.read(length))
+    dtype, header = np.dtype(header['dtype']), header['cases']
+    offset = len(PACKED_MAGIC) + 8 + length
+    n_pins = sum(entry['pins'] for entry in header)
+    pins = np.memmap(source, dtype, 'r', offset, (n_pins, 2)) if n_pins else np.zeros((0, 2), dtype)
+    return header, pins
 
 
 class Case:
@@ -114,7 +412,6 @@ class Case:
         # Apply additional key-value pairs as attributes
         for key, value in kwargs.items():
             setattr(self, key, value)
-            setattr(self, key, value)
 
     @classmethod
     def from_json(cls, case_path):
@@ -126,17 +423,70 @@ class Case:
         if 'pins' in case:
             case['pins'] = [tuple(c) for c in case['pins']]
         if 'paths' in case:
-            case['paths'] = [(tuple(p[0]), tuple(p[1])) for p in case['paths']]
+            case['paths'] = _sanitize_paths(case['paths'])
 
         # Extract other attributes and pass them to the constructor
+        case.pop('file', None)
         return cls(case_path, **case)
 
-    def solve(self, method: Callable) -> Tuple[bool, int, int, float]:
+    def solve(self, method: Callable, time_budget: float = None, seed: int = None, use_cache: bool = False,
+              run_id: str = None, resume: bool = False, table_size: int = 0) -> Tuple[bool, int, int, float, int]:
+        """
+        Runs a solver on this case and saves the solution if it improves on the stored one.
+
+        `method` is either a `find_paths` function returning (paths, flops), or
+        an anytime generator function yielding (paths, flops) for every
+        improvement, of which the last is the result. The time and length of
+        every improvement are recorded in `improvements`. With a `time_budget`
+        (seconds), solvers that accept a `deadline` are asked to stop in time.
+        Solvers that accept a `seed` get one, which is returned and saved with
+        the solution so the run can be repeated. Without `seed`, a fresh one is drawn.
+        Within a run (`run_id`), solvers that accept a `checkpoint` get a file
+        of that run to save their progress to. Only with `resume` do they
+        continue from it (with its seed), otherwise a stale checkpoint is removed.
+        Solvers that accept `use_cache` only start from the best known tree in
+        the solution cache, and store theirs there, when `use_cache` is set.
+        `cache_hit` tells whether the result is that tree rather than one the
+        solver found, in which case it is not saved as a solution of the solver.
+        Solvers that accept a `table_size` skip trees they built before, using
+        a transposition table of that many trees, when it is set.
+        """
+        self.seed = secrets.randbits(32) if seed is None else seed
+        parameters = inspect.signature(method).parameters
+        kwargs = {}
+        if run_id is not None and 'checkpoint' in parameters:
+            from checkpoint import checkpoint_dir  # checkpoint imports this module
+            kwargs['checkpoint'] = checkpoint_dir(method.__module__, run_id) / self.file.name
+            if not resume:
+                kwargs['checkpoint'].unlink(missing_ok=True)
+            elif kwargs['checkpoint'].is_file():
+                with open(kwargs['checkpoint']) as file:
+                    self.seed = json.load(file)['seed']
         start = default_timer()
-        paths, flops = method(self.pins, self.kanten)
+        if time_budget is not None and 'deadline' in parameters:
+            kwargs['deadline'] = start + time_budget
+        if 'seed' in parameters:
+            kwargs['seed'] = self.seed
+        if table_size and 'table_size' in parameters:
+            kwargs['table_size'] = table_size
+        cached = None
+        if use_cache and 'use_cache' in parameters:
+            from solution_cache import solution_cache  # solution_cache imports this module
+            kwargs['use_cache'] = True
+            cached = solution_cache.get(self.pins)  # On the board the solvers use, see `SolutionCache.get`
+        self.improvements = []
+        if inspect.isgeneratorfunction(method):
+            paths, flops = [], 0
+            for paths, flops in method(self.pins, self.kanten, **kwargs):
+                if not self.improvements or len(paths) < self.improvements[-1][1]:
+                    self.improvements.append((default_timer() - start, len(paths), flops))
+        else:
+            paths, flops = method(self.pins, self.kanten, **kwargs)
+            self.improvements.append((default_timer() - start, len(paths), flops))
         stop = default_timer()
 
         d_time = stop - start
+        self.cache_hit = cached is not None and len(paths) >= len(cached)
 
         # Score the solution
         path_clusters, pin_clusters = get_clusters(paths, self.pins)
@@ -144,13 +494,13 @@ class Case:
         # Check if all pins are in the same clusters
         is_success = len(set(pin_clusters.values())) == 1
 
-        if is_success:
+        if is_success and not self.cache_hit:
             # Check existing score
             method_name = method.__module__
             solutions_file = solutions_root / method_name / self.file.name
 
             if solutions_file.is_file():
-                is_better = len(paths) < len(Case(solutions_file).paths)
+                is_better = len(paths) < len(Case.from_json(solutions_file).paths)
             else:
                 is_better = True
 
@@ -163,4 +513,12 @@ class Case:
                 json_data = json.dumps(data, indent=4, sort_keys=True)
                 with open(solutions_file, 'w') as file:
                     file.write(json_data)
-        return is_success, len(paths), flops, d_time
+        return is_success, len(paths), flops, d_time, self.seed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pack a directory of case JSON files into a single case set.")
+    parser.add_argument("target", help="Packed case set to write, e.g. cases.pack.")
+    parser.add_argument("--source", default=cases_dir, help="Directory of case JSON files. Default is cases/.")
+    args = parser.parse_args()
+    print(f"{len(Cases(source=args.source))} cases packed into {pack_cases(Cases(source=args.source), args.target)}")
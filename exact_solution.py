@@ -0,0 +1,86 @@
+from definitions import Points, Paths, Tuple
+from example_solution import connect_two_points
+from utils import sort_paths
+from functools import lru_cache
+import numpy as np
+
+
+def hanan_grid(pins: Points) -> Tuple[Points, np.ndarray]:
+    # Hanan's theorem: some optimal tree only bends at crossings of the pins' x and y coordinates
+    xs, ys = sorted({x for x, _ in pins}), sorted({y for _, y in pins})
+    nodes = [(x, y) for x in xs for y in ys]
+    coords = np.array(nodes)
+    # Without obstacles the shortest path between two grid nodes is their Manhattan distance
+    distances = np.abs(coords[:, None, :] - coords[None, :, :]).sum(axis=2)
+    return nodes, distances
+
+
+@lru_cache(maxsize=None)
+def bit_patterns(n_bits: int) -> np.ndarray:
+    # Row i holds the binary digits of i, for every i except the all-ones pattern
+    counter = np.arange((1 << n_bits) - 1)
+    return (counter[:, None] >> np.arange(n_bits)) & 1
+
+
+def submasks(mask: int) -> np.ndarray:
+    # All proper submasks of `mask` that contain its lowest bit, so each split is listed once
+    bits = [1 << i for i in range(mask.bit_length()) if mask >> i & 1]
+    return bits[0] | bit_patterns(len(bits) - 1).dot(bits[1:])
+
+
+def steiner_tree(pins: Points) -> Tuple[Paths, int]:
+    """
+    Dreyfus-Wagner dynamic programming over subsets of pins on the Hanan grid.
+    `cost[S, v]` holds the length of the shortest tree connecting pin subset S
+    and grid node v. The last pin is used as root, so only subsets of the
+    other pins are enumerated.
+    """
+    nodes, distances = hanan_grid(pins)
+    n = len(nodes)
+    terminals = [nodes.index(pin) for pin in pins]
+    root, terminals = terminals[-1], terminals[:-1]
+    full = (1 << len(terminals)) - 1
+
+    cost = np.zeros((full + 1, n), dtype=np.int16)
+    merged = np.zeros((full + 1, n), dtype=np.int16)  # Cost of the best split of S at each node
+    flops = 0
+    for i, terminal in enumerate(terminals):
+        cost[1 << i] = distances[terminal]
+
+    for mask in range(1, full + 1):
+        if not mask & (mask - 1):
+            continue
+        # Merge two subtrees at a common node...
+        subs = submasks(mask)
+        splits = cost[subs] + cost[mask ^ subs]
+        merged[mask] = splits.min(axis=0)
+        # ...and extend the merged tree with a shortest path to every other node
+        extended = merged[mask][:, None] + distances
+        cost[mask] = extended.min(axis=0)
+        flops += splits.size + extended.size
+
+    # Walk back through the table, redoing only the minimizations along the optimal tree
+    paths = set()
+    to_visit = [(full, root)]
+    while to_visit:
+        mask, node = to_visit.pop()
+        if mask & (mask - 1):
+            branch = int((merged[mask] + distances[:, node]).argmin())
+            subs = submasks(mask)
+            sub = int(subs[(cost[subs, branch] + cost[mask ^ subs, branch]).argmin()])
+            to_visit.extend(((sub, branch), (mask ^ sub, branch)))
+        else:
+            branch = terminals[mask.bit_length() - 1]
+        paths.update(sort_paths(connect_two_points(nodes[branch], nodes[node])))
+    return list(paths), flops
+
+
+def find_paths(pins: Points, target: int = None) -> Tuple[Paths, int]:
+    """
+    Computes a minimal rectilinear Steiner tree exactly. The `flops` returned
+    are the number of dynamic programming states evaluated.
+    """
+    pins = list(dict.fromkeys(pins))
+    if len(pins) < 2:
+        return [], 1
+    return steiner_tree(pins)
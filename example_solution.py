@@ -1,78 +1,387 @@
-from definitions import Points, Point, Paths, Tuple
-from tqdm import tqdm
-from random import randint, choice
-from utils import flatten, manhattan_distance
+from definitions import Points, Point, Paths, Tuple, List, BoardState, iter_bits, popcount
+from functools import lru_cache
+from array import array
+from instrumentation import Probe, TqdmSink
+from collections import Counter, OrderedDict
+from timeit import default_timer
+from random import Random
+from utils import manhattan_distance, lower_bound, spawn_seeds
+from local_search import improve
+from solution_cache import solution_cache
+from checkpoint import save_checkpoint, load_checkpoint, remove_checkpoint
+from transposition import TranspositionTable, EMPTY_TREE, zobrist_keys, zobrist_update
+from pathlib import Path
+import secrets
+import random
+import heapq
 
 
 def connect_two_points(point1: Point, point2: Point) -> Paths:
     (x1, y1), (x2, y2) = point1, point2
-    # Horizontal (x) and and vertical (y) distance traveled
-    diff_x, diff_y = x2 - x1, y2 - y1
-    # Steps are all points covered by the path, so len(steps) = len(path) + 1
-    steps = [(x1 + int(x * diff_x / abs(diff_x)), y1) for x in range(abs(diff_x) + 1)] if diff_x else []
-    steps.extend([(x2, y1 + int(y * diff_y / abs(diff_y))) for y in range(abs(diff_y) + 1)] if diff_y else [])
-    # zip all steps to create start and end points for paths
-    paths = [s for s in zip(steps[:-1], steps[1:]) if s[0] != s[1]]
+    # Direction of the horizontal (x) and vertical (y) steps
+    step_x, step_y = (1 if x2 > x1 else -1), (1 if y2 > y1 else -1)
+    # First horizontally from point1, then vertically to point2
+    paths = [((x, y1), (x + step_x, y1)) for x in range(x1, x2, step_x)]
+    paths.extend(((x2, y), (x2, y + step_y)) for y in range(y1, y2, step_y))
     return paths
 
 
-def find_closest_points(points1, points2, rng=1):
-    # Lists points by distance, randomly selects a point from the top `rng`
-    p_comb = flatten([[(p1, p2) for p2 in points2 if p2 != p1] for p1 in points1])
-    distances = {p: manhattan_distance(*p) for p in p_comb}
-    dist_sorted_points = dict(sorted(distances.items(), key=lambda item: item[1]))
-    random_closest = list(dist_sorted_points)[randint(0, rng)]
-    return random_closest
+# Route tables stop growing at about this size, by dropping their oldest routes
+MAX_ROUTE_TABLE_BYTES = 16 * 2 ** 20
 
 
-def connect_pins(pins: Points, rng=0) -> Paths:
-    # The goal is to build up a list of paths that connect all pins
-    paths = []
+class RouteTable(OrderedDict):
+    """
+    Bitmasks of the two L-shaped routes between two points of a board, as
+    (path elements, points) in the indexing of a BoardState. The horizontal
+    first route comes first. The table is filled lazily: routes are computed
+    on first use, after that a lookup is a single dictionary access. The
+    masks grow with the board, so a table holds at most `capacity` routes,
+    as many as fit in `MAX_ROUTE_TABLE_BYTES`, and drops the oldest once it
+    is full. On the boards of the cases every route fits. `route_table` keeps
+    the tables of the last few board sizes.
+
+    > routes = route_table(10)
+    > (edges, points), (edges_vertical_first, points_vertical_first) = routes[(0, 0), (2, 3)]
+    """
+
+    def __init__(self, size: int):
+        super().__init__()
+        self.board = BoardState(size)
+        # Four masks of at most a bit per path element or point, plus the tuples and key that hold them
+        mask_bytes = (2 * size * (size + 1) + (size + 1) ** 2) // 8
+        self.capacity = max(1, MAX_ROUTE_TABLE_BYTES // (2 * mask_bytes + 256))
+
+    def __missing__(self, key: Tuple[Point, Point]):
+        point1, point2 = key
+        masks = []
+        for route in (connect_two_points(point1, point2), connect_two_points(point2, point1)):
+            route_state = BoardState(self.board.size, route)
+            route_state.points |= 1 << self.board.point_index(point1)
+            masks.append((route_state.edges, route_state.points))
+        self[key] = masks = tuple(masks)
+        if len(self) > self.capacity:
+            self.popitem(last=False)
+        return masks
+
+
+@lru_cache(maxsize=8)
+def route_table(size: int) -> RouteTable:
+    return RouteTable(size)
+
+
+@lru_cache(maxsize=64)
+def distance_table(pins: Tuple[Point, ...], size: int) -> Tuple[List[array], List[Tuple[Point, Point]]]:
+    # Per board tables shared by all restarts: the distance from each pin to each board point,
+    # and all pin pairs sorted by distance
+    width = size + 1
+    board_points = [(i % width, i // width) for i in range(width ** 2)]
+    distances = [array('H', [abs(px - x) + abs(py - y) for x, y in board_points]) for px, py in pins]
+    pin_pairs = sorted(((p1, p2) for p1 in pins for p2 in pins if p2 != p1), key=lambda p: manhattan_distance(*p))
+    return distances, pin_pairs
+
+
+class CandidateIndex:
+    """
+    Keeps the (unconnected pin, tree point) pairs of a growing tree ordered by
+    distance. Distances come from a per board table, and every pair enters the
+    heap once, when its tree point is added, so picking one of the closest
+    pairs costs O(rng log n) instead of a full sort per step.
+    """
+
+    def __init__(self, pins: Points, tree: BoardState):
+        self.tree = tree
+        self.pins = list(pins)
+        self.open = set(range(len(self.pins)))
+        self.distances, self.pin_pairs = distance_table(tuple(self.pins), tree.size)
+        self.heap = []
+        self.known = 0  # Tree points whose pairs have been pushed
+
+    def update(self) -> None:
+        # Drop pins covered by the tree and add pairs for the new tree points
+        self.open = {i for i in self.open if self.pins[i] not in self.tree}
+        new = self.tree.points & ~self.known
+        self.known |= new
+        for point in iter_bits(new):
+            for i in self.open:
+                heapq.heappush(self.heap, (self.distances[i][point], i, point))
+
+    def candidates(self, rng: int = 1) -> List[Tuple[Point, Point]]:
+        """The `rng + 1` closest (pin, tree point) pairs, closest first."""
+        # Without a tree, pins are connected to each other
+        if not self.known:
+            return self.pin_pairs[:rng + 1]
+        # Pop the `rng + 1` closest pairs that are still open and put them back
+        closest = []
+        while self.heap and len(closest) <= rng:
+            item = heapq.heappop(self.heap)
+            if item[1] in self.open:
+                closest.append(item)
+        for item in closest:
+            heapq.heappush(self.heap, item)
+        width = self.tree.width
+        return [(self.pins[i], (point % width, point // width)) for _, i, point in closest]
+
+    def closest(self, rng: int = 1, generator: Random = random) -> Tuple[Point, Point]:
+        candidates = self.candidates(rng)
+        return candidates[generator.randint(0, len(candidates) - 1)]
+
+
+def connect_pins(pins: Points, rng=0, limit: int = None, generator: Random = random, timers: Counter = None,
+                 table: TranspositionTable = None) -> Paths:
+    # The goal is to build up a tree of paths that connect all pins.
+    # With `timers`, the seconds spent in each step are added to it (see `instrumentation.Probe`).
+    # With a `table`, only trees that are not explored yet are built, and None is returned when there are none.
+    # Without two distinct pins there is nothing to connect
+    if len(set(pins)) < 2:
+        return []
+    timed = timers is not None
+    tree = BoardState.for_points(pins)
+    index = CandidateIndex(pins, tree)
+    routes = route_table(tree.size)
+    if table is not None:
+        return _connect_unexplored(pins, rng, limit, generator, table, tree, index, routes, timers)
     # Paths are started at pins...
-    while any(pins):
-        # ...and connected to any point in our paths.
-        all_points = pins if not (any(paths)) else list(set(flatten(paths)))
-        # The points we connect are the closest together
-        points = find_closest_points(pins, all_points, rng=rng)[::choice([-1, 1])]
+    while index.open:
+        # Trees only grow, so give up once this one can no longer beat `limit` path elements
+        if limit is not None and len(tree) >= limit:
+            return None
+        if timed:
+            lap = default_timer()
+        # ...and connected to any point in our tree. The points we connect are the closest together
+        points = index.closest(rng, generator)[::generator.choice([-1, 1])]
+        if timed:
+            now = default_timer()
+            timers['closest_points'] += now - lap
+            lap = now
         # Our connection can be horizontal first or vertical first
-        conns = connect_two_points(*points), connect_two_points(*points[::-1])
+        conns = routes[points]
+        if timed:
+            now = default_timer()
+            timers['route_lookup'] += now - lap
+            lap = now
         # Find the connection that costs the least new paths
-        paths.extend(min((set(conn) - set(paths) for conn in conns), key=len))
+        edges, route_points = min(conns, key=lambda conn: popcount(conn[0] & ~tree.edges))
+        tree.edges |= edges
+        tree.points |= route_points
         # Update which points are not yet connected
-        pins = [p for p in pins if p not in flatten(paths)]
-    return paths
+        index.update()
+        if timed:
+            timers['tree_updates'] += default_timer() - lap
+    return tree.to_paths()
+
+
+def _connect_unexplored(pins, rng, limit, generator, table, tree, index, routes, timers=None) -> Paths:
+    # Like `connect_pins`, but only steps to trees that are not in `table`. A tree from which all steps lead
+    # to explored trees is explored itself. Timed in the sections of `connect_pins`, plus the table lookups.
+    timed = timers is not None
+    keys = zobrist_keys(tree.size)
+    tree_hash = EMPTY_TREE
+    while index.open:
+        if limit is not None and len(tree) >= limit:
+            table.add(tree_hash)
+            return None
+        if timed:
+            lap = default_timer()
+        # Try the step `connect_pins` would take, and only look at all steps when that one is explored
+        candidates = index.candidates(rng)
+        points = candidates[generator.randint(0, len(candidates) - 1)][::generator.choice([-1, 1])]
+        if timed:
+            now = default_timer()
+            timers['closest_points'] += now - lap
+            lap = now
+        edges, route_points = min(routes[points], key=lambda conn: popcount(conn[0] & ~tree.edges))
+        if timed:
+            now = default_timer()
+            timers['route_lookup'] += now - lap
+            lap = now
+        step = zobrist_update(tree_hash, edges & ~tree.edges, keys)
+        if step in table:
+            steps = {}
+            for pair in candidates:
+                for points in (pair, pair[::-1]):
+                    edges, route_points = min(routes[points], key=lambda conn: popcount(conn[0] & ~tree.edges))
+                    steps.setdefault(zobrist_update(tree_hash, edges & ~tree.edges, keys), (edges, route_points))
+            unexplored = [step for step in steps if step not in table]
+            if not unexplored:
+                table.add(tree_hash)
+                return None
+            step = unexplored[generator.randint(0, len(unexplored) - 1)]
+            edges, route_points = steps[step]
+        if timed:
+            now = default_timer()
+            timers['transposition'] += now - lap
+            lap = now
+        tree_hash = step
+        tree.edges |= edges
+        tree.points |= route_points
+        index.update()
+        if timed:
+            timers['tree_updates'] += default_timer() - lap
+    table.add(tree_hash)
+    return tree.to_paths()
 
 
-def run_search(pins, target=0, max_evals=100, rng=1):
+def iter_search(pins, target=0, max_evals=100, rng=1, deadline=None, polish=False, seed=None, probe=None,
+                generator=None, on_checkpoint=None, checkpoint_interval=60., table_size=0, table=None):
+    # Yields every solution that improves on the best one found so far,
+    # and the best solution once more with the final number of evaluations.
+    # With `polish`, every greedy tree is shortened by local search first.
+    # Runs with the same `seed` construct the same trees, or pass a `generator` to continue its stream.
+    # Progress goes to `probe`, by default a progress bar.
+    # Every `checkpoint_interval` seconds, `on_checkpoint` is called with the evaluations done.
+    # With a `table_size`, restarts skip trees that were built before, using a transposition table of that
+    # many trees (see `transposition`), and the search ends early when no new trees are left. Or pass a `table`
+    # to continue with it. The probe then counts the distinct trees built and the restarts that found no new tree.
+    # The table slows down every restart, so it only pays off when restarts often repeat a tree (small `rng`).
+    generator = Random(seed) if generator is None else generator
+    if table is None and table_size:
+        table = TranspositionTable(table_size)
+    own_probe = probe is None
+    if own_probe:
+        probe = Probe([TqdmSink(max_evals)])
+    best_result, flops = None, 0
+    next_checkpoint = default_timer() + checkpoint_interval
+    try:
+        for flops in range(1, max_evals + 1):
+            timers = probe.sample()
+            paths = connect_pins(pins, rng, None if table is None else table.limit, generator=generator,
+                                 timers=timers, table=table)
+            if paths is None:
+                probe.tick()
+                probe.counters['explored_restarts'] += 1
+                if EMPTY_TREE in table:
+                    break  # Every tree has been built
+            else:
+                if table is not None:
+                    probe.counters['distinct_trees'] += 1
+                if polish:
+                    lap = default_timer()
+                    paths = improve(paths, pins)
+                    if timers is not None:
+                        timers['local_search'] += default_timer() - lap
+                probe.tick()
+                if best_result is None or len(paths) < len(best_result):
+                    best_result = paths
+                    if table is not None and not polish:
+                        table.limit = len(paths)  # Trees that can not be shorter are explored
+                    probe.improvement(len(paths))
+                    yield best_result, flops
+                    if len(paths) <= target:
+                        return
+            if on_checkpoint is not None and default_timer() >= next_checkpoint:
+                on_checkpoint(flops)
+                next_checkpoint = default_timer() + checkpoint_interval
+            if deadline is not None and default_timer() >= deadline:
+                break
+        yield best_result, flops
+    finally:
+        if own_probe:
+            probe.close()
+
+
+def run_search(pins, target=0, max_evals=100, rng=1, deadline=None, polish=False, seed=None, probe=None,
+               table_size=0):
     # Return the best solution that we've been able to find
-    best_result = None
-    for flops in tqdm(range(max_evals)):
-        paths = connect_pins(pins, rng)
-        if len(paths) <= target:
-            best_result = paths
-            break
-        if best_result is None:
-            best_result = paths
-        elif len(paths) < len(best_result):
-            best_result = paths
+    best_result, flops = None, 0
+    for best_result, flops in iter_search(pins, target, max_evals=max_evals, rng=rng, deadline=deadline,
+                                          polish=polish, seed=seed, probe=probe, table_size=table_size):
+        pass
     return best_result, flops
 
 
-def find_paths(pins: Points, target: int = None) -> Tuple[Paths, int]:
+def iter_paths(pins: Points, target: int = None, deadline: float = None, polish: bool = False, seed: int = None,
+               probe: Probe = None, checkpoint: Path = None, checkpoint_interval: float = 60., use_cache: bool = False,
+               table_size: int = 0):
     """
-    This function contains your solution. It returns the paths to be tested.
+    Anytime version of `find_paths`: yields (paths, flops) every time a
+    shorter tree is found, until `target` is reached, the evaluation budgets
+    are spent or the `deadline` (a `timeit.default_timer` value) has passed.
+    With `use_cache`, the search starts from the best known tree in the
+    solution cache, and stores its result there. It stops early when a tree
+    meets the proven lower bound, as it is optimal.
+    With `polish`, greedy trees are shortened by `local_search.improve`.
+    Every stage of the schedule gets its own random stream derived from `seed`.
+    Progress of all stages goes to `probe`, if given.
+    With a `checkpoint` file, the search state is saved every
+    `checkpoint_interval` seconds and when the deadline passes, and a search
+    that finds a checkpoint for its pins continues from it.
+    With a `table_size`, the restarts of every stage skip trees built before
+    in that stage, see `iter_search`. The table is not checkpointed, so a
+    resumed stage starts with an empty one.
     """
-    total_flops = 1
-    for max_evals, rng in (
-            (10_000_000, 3),
-            (10_000_000, 4),
-            # (10_000, 4),
-            # (100_000, 5),
-            # (1000_000, 6),
-            # (10_000_000, 7),
-    ):
-        paths, flops = run_search(pins, target, max_evals=max_evals, rng=rng)
+    # No tree is shorter than the lower bound, so there is no point in searching beyond it
+    target = max(0 if target is None else target, lower_bound(pins))
+    best_result, total_flops = solution_cache.get(pins) if use_cache else None, 0
+    state = None if checkpoint is None else load_checkpoint(checkpoint, pins)
+    if state is not None:
+        seed, total_flops = state['seed'], state['flops']
+        if best_result is None or (state['best'] is not None and len(state['best']) < len(best_result)):
+            best_result = state['best']
+    elif checkpoint is not None and seed is None:
+        seed = secrets.randbits(32)  # Saved in the checkpoint, to continue the same streams
+    if best_result is not None:
+        yield best_result, total_flops
+        if len(best_result) <= target:
+            if checkpoint is not None:
+                remove_checkpoint(checkpoint)
+            return
+    schedule = (
+        (10_000_000, 3),
+        (10_000_000, 4),
+        # (10_000, 4),
+        # (100_000, 5),
+        # (1000_000, 6),
+        # (10_000_000, 7),
+    )
+    interrupted = False
+    for stage, ((max_evals, rng), stage_seed) in enumerate(zip(schedule, spawn_seeds(seed, len(schedule)))):
+        if state is not None and stage < state['stage']:
+            continue
+        generator, done = Random(stage_seed), 0
+        table = TranspositionTable(table_size) if table_size else None
+        if state is not None and stage == state['stage']:
+            # Continue the random stream where the checkpoint left it
+            version, internal, gauss = state['rng_state']
+            generator.setstate((version, tuple(internal), gauss))
+            done = state['stage_evals']
+        stage_flops = total_flops
+
+        def save(flops):
+            save_checkpoint(checkpoint, {
+                'pins': pins, 'seed': seed, 'best': best_result, 'flops': stage_flops + flops,
+                'stage': stage, 'stage_evals': done + flops, 'rng_state': generator.getstate(),
+            })
+
+        for paths, flops in iter_search(pins, target, max_evals=max_evals - done, rng=rng, deadline=deadline,
+                                        polish=polish, probe=probe, generator=generator, table=table,
+                                        on_checkpoint=None if checkpoint is None else save,
+                                        checkpoint_interval=checkpoint_interval):
+            if paths is not None and (best_result is None or len(paths) < len(best_result)):
+                best_result = paths
+                yield best_result, total_flops + flops
         total_flops += flops
-        if len(paths) <= target:
+        if best_result is not None and len(best_result) <= target:
             break
+        if deadline is not None and default_timer() >= deadline:
+            interrupted = True
+            if checkpoint is not None:
+                save(flops)
+            break
+    if checkpoint is not None and not interrupted:
+        remove_checkpoint(checkpoint)
+    if use_cache:
+        solution_cache.put(pins, best_result)
+    yield best_result, total_flops
+
+
+def find_paths(pins: Points, target: int = None, deadline: float = None, polish: bool = False,
+               seed: int = None, probe: Probe = None, checkpoint: Path = None,
+               use_cache: bool = False, table_size: int = 0) -> Tuple[Paths, int]:
+    """
+    This function contains your solution. It returns the paths to be tested.
+    """
+    for paths, flops in iter_paths(pins, target, deadline=deadline, polish=polish, seed=seed, probe=probe,
+                                   checkpoint=checkpoint, use_cache=use_cache, table_size=table_size):
+        pass
     return paths, flops
@@ -0,0 +1,99 @@
+"""
+Generates synthetic cases on boards larger than those of the booklet, to
+measure how solvers scale.
+
+Pins are either spread uniformly over the board ('random') or drawn around a
+few centres ('clustered'). Cases are written in the schema of the cases in
+cases/, named with `zip_name`. Their difficulty is 'unbekannt', and their
+`kanten` is the length of the rectilinear minimum spanning tree of the pins,
+which any decent Steiner tree beats.
+
+> python generate_cases.py --sizes 32 64 128 256 --pins 20 50 100 200 500
+> python generate_cases.py --pack cases_synthetic.pack  # Also write a packed case set
+
+The same seed generates the same cases.
+"""
+from definitions import Points, Case, project_root, sorted_difficulties, pack_cases
+from utils import rectilinear_mst, manhattan_distance, spawn_seeds, zip_name, json_out
+from pathlib import Path
+from random import Random
+import argparse
+
+synthetic_cases_dir = project_root / 'cases_synthetic'
+
+
+def random_pins(size: int, n_pins: int, generator: Random) -> Points:
+    width = size + 1
+    return [(i % width, i // width) for i in generator.sample(range(width ** 2), n_pins)]
+
+
+def clustered_pins(size: int, n_pins: int, generator: Random, clusters: int = None) -> Points:
+    # About 20 pins per cluster, spread so the clusters together cover part of the board
+    clusters = max(1, n_pins // 20) if clusters is None else clusters
+    centres = [(generator.uniform(0, size), generator.uniform(0, size)) for _ in range(clusters)]
+    spread = size / (4 * clusters ** .5)
+    pins = {}
+    while len(pins) < n_pins:
+        x, y = generator.choice(centres)
+        pin = tuple(min(size, max(0, round(generator.gauss(mean, spread)))) for mean in (x, y))
+        pins[pin] = None
+    return list(pins)
+
+
+generators = {'random': random_pins, 'clustered': clustered_pins}
+
+
+def make_case(case_id: int, size: int, n_pins: int, kind: str = 'random', seed: int = None) -> dict:
+    """A case in the schema of the JSON files in cases/."""
+    if n_pins > (size + 1) ** 2:
+        raise ValueError(f'A board of size {size} has no room for {n_pins} pins')
+    pins = generators[kind](size, n_pins, Random(seed))
+    return {
+        'id': case_id,
+        'kanten': sum(manhattan_distance(*edge) for edge in rectilinear_mst(pins)),
+        'name': f'{kind}{case_id}',
+        'pins': pins,
+        'schwierigkeit': sorted_difficulties[0],
+        'size': size,
+        'version': 1,
+    }
+
+
+def generate_cases(sizes, pin_counts, kinds=('random', 'clustered'), repeats: int = 1, seed: int = 0,
+                   target: Path = synthetic_cases_dir) -> list:
+    """
+    Writes a case for every combination of board size, pin count, kind and
+    repeat to `target`, skipping boards too small for their pins.
+    Returns the written case files.
+    """
+    combinations = [(size, n_pins, kind) for size in sizes for n_pins in pin_counts for kind in kinds
+                    for _ in range(repeats) if n_pins <= (size + 1) ** 2]
+    target = Path(target)
+    target.mkdir(parents=True, exist_ok=True)
+    files = []
+    for case_id, ((size, n_pins, kind), case_seed) in enumerate(zip(combinations,
+                                                                    spawn_seeds(seed, len(combinations)))):
+        case = make_case(case_id, size, n_pins, kind, case_seed)
+        info = {key: case[key] for key in ('schwierigkeit', 'size', 'kanten', 'name', 'version')}
+        info['pins'] = n_pins
+        files.append(target / f'{zip_name(info)}_case.json')
+        json_out(case, files[-1])
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic cases on large boards.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[32, 64, 128, 256], help="Board sizes.")
+    parser.add_argument("--pins", type=int, nargs="+", default=[20, 50, 100, 200, 500], help="Pin counts.")
+    parser.add_argument("--kinds", nargs="+", default=list(generators), choices=list(generators),
+                        help="How pins are spread over the board.")
+    parser.add_argument("--repeats", type=int, default=1, help="Cases per size, pin count and kind.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the case set.")
+    parser.add_argument("--out", default=synthetic_cases_dir, help="Directory to write the cases to.")
+    parser.add_argument("--pack", default=None, help="Also write the cases to this packed case set.")
+    args = parser.parse_args()
+
+    files = generate_cases(args.sizes, args.pins, args.kinds, args.repeats, args.seed, args.out)
+    print(f'{len(files)} cases written to {args.out}')
+    if args.pack is not None:
+        print(f'Packed into {pack_cases((Case.from_json(file) for file in files), args.pack)}')
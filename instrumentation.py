@@ -0,0 +1,141 @@
+"""
+Low overhead instrumentation of the search loop.
+
+A `Probe` counts restarts and records every improvement. Where the time of a
+restart goes is only measured for one in `sample_rate` restarts, and scaled
+up in the reports. Reports are sent to sinks at most once per `interval`
+seconds, so the hot loop stays as fast as without instrumentation.
+
+> probe = Probe([JsonlSink('trace.jsonl'), TqdmSink(max_evals)])
+> run_search(pins, target, max_evals, probe=probe)
+> probe.close()
+
+> python instrumentation.py --case 0 --evals 20000  # Where does the time of a restart go?
+> python instrumentation.py --case 0 --rng 1 --table-size 100000  # How many restarts build a new tree?
+"""
+from collections import Counter
+from timeit import default_timer
+from tqdm import tqdm
+import argparse
+import json
+
+
+class JsonlSink:
+    """Appends every report as one line of JSON to `path`."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def __call__(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class TqdmSink:
+    """Shows the restarts as a progress bar, with the best length so far."""
+
+    def __init__(self, total: int = None, desc: str = None):
+        self.bar = tqdm(total=total, desc=desc)
+
+    def __call__(self, record: dict) -> None:
+        self.bar.update(record['restarts'] - self.bar.n)
+        if record['best_length'] is not None:
+            self.bar.set_postfix(best=record['best_length'], refresh=False)
+
+    def close(self) -> None:
+        self.bar.close()
+
+
+class Probe:
+    """
+  Counters and sampled timers for a solver run.
+
+  Parameters:
+  - sinks (list): Callables that receive each report as a dict, optionally with a `close` method.
+  - interval (float): Minimum number of seconds between reports.
+  - sample_rate (int): Time one in this many restarts.
+
+  Solvers call `tick` once per restart, `improvement` for every shorter tree,
+  and pass the dict returned by `sample` to the code they time (None when
+  this restart is not sampled).
+  """
+
+    def __init__(self, sinks: list = (), interval: float = 1., sample_rate: int = 64):
+        self.sinks = list(sinks)
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.counters = Counter()
+        self.timers = Counter()  # Seconds measured in the sampled restarts
+        self.improvements = []  # (elapsed, restarts, length)
+        self.start = self.last_report = default_timer()
+        self.until_sample = sample_rate
+
+    def tick(self, n: int = 1) -> None:
+        self.counters['restarts'] += n
+        now = default_timer()
+        if now - self.last_report >= self.interval:
+            self.report(now)
+
+    def sample(self) -> Counter:
+        self.until_sample -= 1
+        if self.until_sample:
+            return None
+        self.until_sample = self.sample_rate
+        self.counters['samples'] += 1
+        return self.timers
+
+    def improvement(self, length: int) -> None:
+        self.improvements.append((default_timer() - self.start, self.counters['restarts'], length))
+
+    def snapshot(self, now: float = None) -> dict:
+        now = default_timer() if now is None else now
+        # Sampled times are scaled up to estimates over all restarts
+        scale = self.counters['restarts'] / self.counters['samples'] if self.counters['samples'] else 0
+        return {
+            'elapsed': now - self.start,
+            'restarts': self.counters['restarts'],
+            'best_length': self.improvements[-1][2] if self.improvements else None,
+            'improvements': len(self.improvements),
+            'time': {name: seconds * scale for name, seconds in self.timers.items()},
+            **{name: value for name, value in self.counters.items() if name not in ('restarts', 'samples')},
+        }
+
+    def report(self, now: float = None) -> None:
+        record = self.snapshot(now)
+        self.last_report = default_timer() if now is None else now
+        for sink in self.sinks:
+            sink(record)
+
+    def close(self) -> None:
+        self.report()
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+
+if __name__ == '__main__':
+    from definitions import Cases
+    from example_solution import run_search
+
+    parser = argparse.ArgumentParser(description="Profile the greedy restarts on one case.")
+    parser.add_argument("--case", type=int, default=0, help="Case ID.")
+    parser.add_argument("--evals", type=int, default=20_000, help="Number of restarts.")
+    parser.add_argument("--rng", type=int, default=3, help="Number of alternatives to the closest pair.")
+    parser.add_argument("--table-size", type=int, default=0,
+                        help="Skip trees built before, remembering this many. Default is 0 (off).")
+    parser.add_argument("--trace", default=None, help="JSON lines file to append the reports to.")
+    args = parser.parse_args()
+
+    case = next(case for case in Cases() if case.id == args.case)
+    probe = Probe([TqdmSink(args.evals)] + ([JsonlSink(args.trace)] if args.trace else []))
+    run_search(case.pins, 0, max_evals=args.evals, rng=args.rng, probe=probe, table_size=args.table_size)
+    probe.close()
+    record = probe.snapshot()
+    print(f"\n{record['restarts']} restarts in {record['elapsed']:.2f} s, best {record['best_length']}")
+    if 'distinct_trees' in record:
+        print(f"{record['distinct_trees']} distinct trees, {record.get('explored_restarts', 0)} restarts found no new tree")
+    for name, seconds in sorted(record['time'].items(), key=lambda item: -item[1]):
+        print(f"- {name:<20}{seconds:8.3f} s  {seconds / record['elapsed']:6.1%}")
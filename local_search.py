@@ -0,0 +1,209 @@
+"""
+Local search that shortens a valid tree with small moves until none improves it.
+
+> python local_search.py solutions/example_solution/<case file>.json
+
+Moves, each evaluated by its change in path elements before it is applied:
+- pruning: path elements that lead to a dead end without a pin are removed.
+- corner flips: an L-shaped corner is mirrored when the mirrored corner
+  overlaps paths that are already placed.
+- rerouting: a chain of path elements between two pins or branch points is
+  removed and the two parts of the tree are reconnected along the shortest
+  route. As the route may attach anywhere, this also slides Steiner points.
+"""
+from definitions import Point, Points, Paths, Dict, List, DisjointSet
+from utils import load_file, json_out, sort_paths
+from collections import deque
+from timeit import default_timer
+from typing import Set
+import argparse
+
+Graph = Dict[Point, Set[Point]]
+
+
+def to_graph(paths: Paths) -> Graph:
+    graph = {}
+    for point1, point2 in paths:
+        graph.setdefault(point1, set()).add(point2)
+        graph.setdefault(point2, set()).add(point1)
+    return graph
+
+
+def to_paths(graph: Graph) -> Paths:
+    return sort_paths({tuple(sorted((point1, point2))) for point1 in graph for point2 in graph[point1]})
+
+
+def remove_edge(graph: Graph, point1: Point, point2: Point) -> None:
+    for a, b in ((point1, point2), (point2, point1)):
+        graph[a].discard(b)
+        if not graph[a]:
+            del graph[a]
+
+
+def add_edge(graph: Graph, point1: Point, point2: Point) -> None:
+    graph.setdefault(point1, set()).add(point2)
+    graph.setdefault(point2, set()).add(point1)
+
+
+def prune_leaves(graph: Graph, pins: Set[Point]) -> int:
+    # Removes dead ends that do not lead to a pin, returns the number of removed path elements
+    removed = 0
+    leaves = [point for point, neighbours in graph.items() if len(neighbours) == 1 and point not in pins]
+    while leaves:
+        leaf = leaves.pop()
+        if leaf not in graph or leaf in pins or len(graph[leaf]) != 1:
+            continue
+        neighbour = next(iter(graph[leaf]))
+        remove_edge(graph, leaf, neighbour)
+        removed += 1
+        leaves.append(neighbour)
+    return removed
+
+
+def break_cycles(graph: Graph) -> int:
+    # Removes path elements that close a cycle, returns the number of removed path elements
+    clusters, removed = DisjointSet(), 0
+    for point1, point2 in [(point1, point2) for point1 in graph for point2 in graph[point1] if point1 < point2]:
+        if clusters.find(point1) == clusters.find(point2):
+            remove_edge(graph, point1, point2)
+            removed += 1
+        else:
+            clusters.union(point1, point2)
+    return removed
+
+
+def flip_corners(graph: Graph, pins: Set[Point]) -> int:
+    # Mirrors corners whose mirrored position reuses placed path elements, returns the gain
+    gain = 0
+    for corner in list(graph):
+        neighbours = graph.get(corner)
+        if corner in pins or neighbours is None or len(neighbours) != 2:
+            continue
+        a, b = neighbours
+        if a[0] == b[0] or a[1] == b[1]:
+            continue  # Straight, not a corner
+        mirrored = (a[0] + b[0] - corner[0], a[1] + b[1] - corner[1])
+        new = sum(mirrored not in graph.get(point, ()) for point in (a, b))
+        if new < 2:
+            remove_edge(graph, a, corner)
+            remove_edge(graph, corner, b)
+            add_edge(graph, a, mirrored)
+            add_edge(graph, mirrored, b)
+            gain += 2 - new
+    return gain
+
+
+def key_paths(graph: Graph, pins: Set[Point]) -> List[List[Point]]:
+    # Chains of points between key points (pins and points that are not on a straight through-route)
+    is_key = {point: point in pins or len(neighbours) != 2 for point, neighbours in graph.items()}
+    chains, seen = [], set()
+    for start in (point for point in graph if is_key[point]):
+        for point in graph[start]:
+            chain = [start, point]
+            while not is_key[chain[-1]]:
+                chain.append(next(p for p in graph[chain[-1]] if p != chain[-2]))
+            edge = frozenset(chain[:2])
+            if edge not in seen:
+                seen.add(frozenset(chain[-2:]))
+                chains.append(chain)
+    return chains
+
+
+def component(graph: Graph, start: Point) -> Set[Point]:
+    seen, to_visit = {start}, [start]
+    while to_visit:
+        for point in graph[to_visit.pop()]:
+            if point not in seen:
+                seen.add(point)
+                to_visit.append(point)
+    return seen
+
+
+def shortest_route(sources: Set[Point], targets: Set[Point], bounds) -> List[Point]:
+    # Breadth first search over the board from one part of the tree to the other
+    (x_min, y_min), (x_max, y_max) = bounds
+    previous = {point: None for point in sources}
+    to_visit = deque(sources)
+    while to_visit:
+        point = to_visit.popleft()
+        if point in targets:
+            route = [point]
+            while previous[route[-1]] is not None:
+                route.append(previous[route[-1]])
+            return route
+        x, y = point
+        for step in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if step not in previous and x_min <= step[0] <= x_max and y_min <= step[1] <= y_max:
+                previous[step] = point
+                to_visit.append(step)
+    raise ValueError('Could not reconnect the tree')
+
+
+def reroute_key_paths(graph: Graph, pins: Set[Point], bounds, deadline: float = None) -> int:
+    # Replaces chains by shorter reconnections of the remaining tree, returns the gain
+    gain = 0
+    for chain in key_paths(graph, pins):
+        if deadline is not None and default_timer() >= deadline:
+            break
+        if any(point1 not in graph.get(point2, ()) for point1, point2 in zip(chain[:-1], chain[1:])) or \
+                any(len(graph[point]) != 2 for point in chain[1:-1]):
+            continue  # Changed by an earlier move
+        for point1, point2 in zip(chain[:-1], chain[1:]):
+            remove_edge(graph, point1, point2)
+        start, end = chain[0], chain[-1]
+        if not all(point in pins or point in graph for point in (start, end)):
+            route = []  # The chain was a dead end without a pin
+        else:
+            part = component(graph, start) if start in graph else {start}
+            rest = component(graph, end) if end in graph else {end}
+            route = [] if end in part else shortest_route(part, rest, bounds)
+        removed, added = len(chain) - 1, max(len(route) - 1, 0)
+        if added < removed:
+            for point1, point2 in zip(route[:-1], route[1:]):
+                add_edge(graph, point1, point2)
+            gain += removed - added
+        else:
+            for point1, point2 in zip(chain[:-1], chain[1:]):
+                add_edge(graph, point1, point2)
+    return gain
+
+
+def improve(paths: Paths, pins: Points, deadline: float = None) -> Paths:
+    """
+    Applies local moves to a tree connecting `pins` until no move shortens it.
+
+    Parameters:
+    - paths (Paths): A valid tree, for example from `connect_pins` or a saved solution.
+    - pins (Points): The pins the tree connects.
+    - deadline (float): A `timeit.default_timer` value after which no more
+      moves are made. Cycles left by then are cut and dead ends pruned.
+
+    Returns:
+    - Paths: A tree connecting the same pins, with at most as many path elements.
+    """
+    if not paths:
+        return paths
+    pins = set(pins)
+    graph = to_graph(paths)
+    xs, ys = [x for x, _ in graph], [y for _, y in graph]
+    bounds = (min(xs), min(ys)), (max(xs), max(ys))
+    while prune_leaves(graph, pins) + flip_corners(graph, pins) + reroute_key_paths(graph, pins, bounds, deadline):
+        pass
+    if deadline is not None and default_timer() >= deadline:
+        # Rerouting may have stopped before it removed all cycles
+        break_cycles(graph)
+        prune_leaves(graph, pins)
+    return to_paths(graph)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Shorten a saved solution with local search.")
+    parser.add_argument("filepath", help="Solution JSON file containing pins and paths.")
+    parser.add_argument("--write", action="store_true", help="Overwrite the file if the tree was shortened.")
+    args = parser.parse_args()
+    solution = load_file(args.filepath)
+    paths = improve(solution['paths'], solution['pins'])
+    print(f"{len(solution['paths'])} -> {len(paths)} path elements")
+    if args.write and len(paths) < len(solution['paths']):
+        solution['paths'] = paths
+        json_out(solution, args.filepath)
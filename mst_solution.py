@@ -0,0 +1,144 @@
+"""
+Deterministic Steiner tree heuristic: the batched 1-Steiner algorithm of Kahng
+and Robins on top of a rectilinear minimum spanning tree.
+
+Steiner points are taken from the Hanan grid of the pins. Every round, the
+candidates are ranked by how much they shorten the MST, and are added in that
+order as long as they still shorten it. Steiner points that end up with at
+most two neighbours never help and are removed again. The final MST edges are
+embedded as L-shaped routes, choosing for each edge the orientation that
+overlaps the other routes the most.
+
+> python mst_solution.py
+"""
+from definitions import Point, Points, Paths, Tuple, List, Cases, DisjointSet
+from example_solution import connect_two_points
+from local_search import improve
+from utils import rectilinear_mst, manhattan_distance, sort_paths
+from collections import Counter
+from timeit import default_timer
+
+Edges = List[Tuple[Point, Point]]
+
+
+def mst_length(edges: Edges) -> int:
+    return sum(manhattan_distance(*edge) for edge in edges)
+
+
+def add_point(edges: Edges, points: Points, point: Point) -> Edges:
+    # The MST of the points plus one more only uses edges of the old MST or edges to the new point
+    candidates = sorted(edges + [(other, point) for other in points], key=lambda edge: manhattan_distance(*edge))
+    clusters, tree = DisjointSet(), []
+    for point1, point2 in candidates:
+        if clusters.find(point1) != clusters.find(point2):
+            clusters.union(point1, point2)
+            tree.append((point1, point2))
+    return tree
+
+
+def remove_redundant(pins: Points, steiner_points: Points) -> Tuple[Points, Edges]:
+    # Steiner points with one or two neighbours can be skipped at no cost
+    while True:
+        edges = rectilinear_mst(list(pins) + steiner_points)
+        degree = Counter(point for edge in edges for point in edge)
+        kept = [point for point in steiner_points if degree[point] > 2]
+        if len(kept) == len(steiner_points):
+            return steiner_points, edges
+        steiner_points = kept
+
+
+def passed(deadline: float) -> bool:
+    return deadline is not None and default_timer() >= deadline
+
+
+def steiner_points(pins: Points, deadline: float = None) -> Tuple[Points, Edges, int]:
+    """
+    Batched 1-Steiner heuristic. Once the `deadline` (a `timeit.default_timer`
+    value) has passed, the Steiner points added so far are returned.
+
+    Returns:
+    - Points: The Steiner points added to the pins.
+    - Edges: The rectilinear MST over the pins and Steiner points.
+    - int: The number of candidate evaluations.
+    """
+    pins = list(dict.fromkeys(pins))
+    pin_set = set(pins)
+    hanan = [(x, y) for x in sorted({x for x, _ in pins}) for y in sorted({y for _, y in pins})
+             if (x, y) not in pin_set]
+    added, edges = [], rectilinear_mst(pins)
+    evaluations = 0
+    while not passed(deadline):
+        points = pins + added
+        length = mst_length(edges)
+        gains = []
+        for candidate in hanan:
+            # A round evaluates every candidate, which takes long on large boards
+            if passed(deadline):
+                return added, edges, evaluations + len(gains)
+            if candidate not in added:
+                gains.append((length - mst_length(add_point(edges, points, candidate)), candidate))
+        evaluations += len(gains)
+        gains.sort(key=lambda gain: -gain[0])
+        n_added = 0
+        for gain, candidate in gains:
+            if gain <= 0 or passed(deadline):
+                break
+            # Earlier additions in this round may have taken over the gain of this candidate
+            new_edges = add_point(edges, pins + added, candidate)
+            evaluations += 1
+            if mst_length(new_edges) < mst_length(edges):
+                added.append(candidate)
+                edges = new_edges
+                n_added += 1
+        if not n_added:
+            break
+        added, edges = remove_redundant(pins, added)
+    return added, edges, evaluations
+
+
+def embed(edges: Edges) -> Paths:
+    """
+    Turns MST edges into path elements. Every edge is routed along one of its
+    two L-shapes, and edges are rerouted until no edge can share more path
+    elements with the others by switching to its other L-shape.
+    """
+    # The horizontal-first and the vertical-first route of every edge
+    options = [(sort_paths(connect_two_points(point1, point2)), sort_paths(connect_two_points(point2, point1)))
+               for point1, point2 in edges]
+    choice = [0] * len(edges)
+    counts = Counter(path for route, _ in options for path in route)
+    changed = True
+    while changed:
+        changed = False
+        for i, routes in enumerate(options):
+            current, alternative = routes[choice[i]], routes[1 - choice[i]]
+            counts.subtract(current)
+            # Compare the path elements each route adds on top of those used by the other routes
+            if sum(counts[path] == 0 for path in alternative) < sum(counts[path] == 0 for path in current):
+                choice[i] = 1 - choice[i]
+                current = alternative
+                changed = True
+            counts.update(current)
+    return sort_paths([path for path, count in counts.items() if count > 0])
+
+
+def find_paths(pins: Points, target: int = None, deadline: float = None) -> Tuple[Paths, int]:
+    """
+    Steinerized rectilinear MST, shortened by local search. Both stop once
+    the `deadline` has passed. The `flops` returned are the number of Steiner
+    point candidates evaluated.
+    """
+    pins = list(dict.fromkeys(pins))
+    if len(pins) < 2:
+        return [], 0
+    _, edges, evaluations = steiner_points(pins, deadline)
+    # Overlapping routes can close cycles, local search removes those
+    return improve(embed(edges), pins, deadline), evaluations
+
+
+if __name__ == '__main__':
+    for case in sorted(Cases(), key=lambda c: c.id):
+        start = default_timer()
+        paths, flops = find_paths(case.pins)
+        print(f'{case.name:<40}kanten {case.kanten:>3}  found {len(paths):>3}  '
+              f'{1000 * (default_timer() - start):6.1f} ms')
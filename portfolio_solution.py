@@ -0,0 +1,166 @@
+"""
+Portfolio solver: races several search strategies in a process pool.
+
+Every worker runs one strategy, a solver module with its own settings and
+seed. The length of the best tree found by any worker is kept in shared
+memory, so greedy constructions are abandoned as soon as they can no longer
+beat it. When a worker reaches the target, all workers are cancelled.
+
+> python portfolio_solution.py --workers 8 --time-budget 60
+"""
+from definitions import Points, Paths, Tuple, Cases, BoardState, board_elements
+from example_solution import connect_pins
+from batch_solution import connect_pins_batch, table_fits, fit_batch_size, timed_batch_size, FIRST_BATCH
+from local_search import improve
+from solution_cache import solution_cache
+from utils import lower_bound, spawn_seeds
+from random import Random
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from timeit import default_timer
+import multiprocessing as mp
+import numpy as np
+import mst_solution
+import argparse
+import os
+
+# Strategies as (solver module, settings), workers take them in turn
+PORTFOLIO = (
+    ('example_solution', {'rng': 3}),
+    ('batch_solution', {'rng': 3}),
+    ('example_solution', {'rng': 4}),
+    ('example_solution', {'rng': 3, 'polish': True}),
+    ('batch_solution', {'rng': 4}),
+    ('example_solution', {'rng': 5}),
+    ('example_solution', {'rng': 7}),
+    ('batch_solution', {'rng': 5}),
+)
+
+# Shared between the workers of a pool, set by `init_worker`
+shared_best = None
+cancelled = None
+
+
+def init_worker(best, cancel) -> None:
+    global shared_best, cancelled
+    shared_best, cancelled = best, cancel
+
+
+def publish(length: int, target: int) -> None:
+    # Lower the shared incumbent, and cancel everyone once the target is reached
+    with shared_best.get_lock():
+        if length < shared_best.value:
+            shared_best.value = length
+    if length <= target:
+        cancelled.set()
+
+
+def should_stop(deadline: float) -> bool:
+    return cancelled.is_set() or (deadline is not None and default_timer() >= deadline)
+
+
+def run_greedy(pins: Points, target: int, deadline: float, seed: int, rng: int = 3, polish: bool = False,
+               max_evals: int = 10_000_000) -> Tuple[Paths, int]:
+    generator = Random(seed)
+    best, evals = None, 0
+    while evals < max_evals and not should_stop(deadline):
+        evals += 1
+        paths = connect_pins(pins, rng, limit=shared_best.value, generator=generator)
+        if paths is None:
+            continue
+        if polish:
+            paths = improve(paths, pins, deadline)
+        if len(paths) < shared_best.value and (best is None or len(paths) < len(best)):
+            best = paths
+            publish(len(best), target)
+    return best, evals
+
+
+def run_batch(pins: Points, target: int, deadline: float, seed: int, rng: int = 3, batch_size: int = 4096,
+              max_evals: int = 10_000_000) -> Tuple[Paths, int]:
+    if not table_fits(pins):
+        # Too large a board for the batched tables, restart one tree at a time instead
+        return run_greedy(pins, target, deadline, seed, rng, max_evals=max_evals)
+    batch_size = fit_batch_size(pins, batch_size)
+    batch = batch_size if deadline is None else min(batch_size, FIRST_BATCH)
+    generator = np.random.default_rng(seed)
+    size = BoardState.for_points(pins).size
+    best, evals = None, 0
+    while evals < max_evals and not should_stop(deadline):
+        start = default_timer()
+        # Constructions that reach the shared incumbent are abandoned, only shorter trees come back
+        edges = connect_pins_batch(pins, batch, rng, generator, deadline, limit=shared_best.value)
+        if edges is None:
+            break
+        evals += batch
+        if deadline is not None:
+            batch = timed_batch_size(batch, default_timer() - start, batch_size)
+        if not len(edges):
+            continue
+        lengths = edges.sum(axis=1)
+        i = lengths.argmin()
+        if lengths[i] < shared_best.value:
+            elements = board_elements(size)
+            best = [elements[j] for j in np.nonzero(edges[i])[0]]
+            publish(len(best), target)
+    return best, evals
+
+
+RUNNERS = {'example_solution': run_greedy, 'batch_solution': run_batch}
+
+
+def run_strategy(strategy: Tuple[str, dict], pins: Points, target: int, deadline: float,
+                 seed: int) -> Tuple[Paths, int]:
+    module, settings = strategy
+    return RUNNERS[module](pins, target, deadline, seed, **settings)
+
+
+def find_paths(pins: Points, target: int = None, deadline: float = None, workers: int = None,
+               seed: int = None, use_cache: bool = False) -> Tuple[Paths, int]:
+    """
+    Runs the strategies of `PORTFOLIO` concurrently, one per worker, starting
+    from the `mst_solution` tree, or the best known tree in the solution cache
+    with `use_cache` if that is shorter, where the result is then stored.
+    Without a `deadline`, every worker runs until the target is reached or
+    its evaluation budget is spent, as the other solvers do.
+    The `flops` returned are the evaluations of all workers together.
+    """
+    pins = list(dict.fromkeys(pins))
+    target = max(0 if target is None else target, lower_bound(pins))
+    best, flops = mst_solution.find_paths(pins)
+    cached = solution_cache.get(pins) if use_cache else None
+    if cached is not None and len(cached) < len(best):
+        best = cached
+    if len(best) <= target:
+        return best, flops
+
+    workers = os.cpu_count() if workers is None else workers
+    # Every worker gets its own random stream
+    seeds = spawn_seeds(seed, workers)
+    best_length, cancel = mp.Value('i', len(best)), mp.Event()
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(best_length, cancel)) as executor:
+        pending = {executor.submit(run_strategy, PORTFOLIO[i % len(PORTFOLIO)], pins, target, deadline, seeds[i])
+                   for i in range(workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                paths, evals = future.result()
+                flops += evals
+                if paths is not None and len(paths) < len(best):
+                    best = paths
+            if len(best) <= target:
+                cancel.set()
+    if use_cache:
+        solution_cache.put(pins, best)
+    return best, flops
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Race the portfolio of strategies on every case.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes. Default is all cores.")
+    parser.add_argument("--time-budget", type=float, default=60, help="Seconds per case.")
+    args = parser.parse_args()
+    for case in sorted(Cases(), key=lambda c: c.id):
+        start = default_timer()
+        paths, flops = find_paths(case.pins, case.kanten, start + args.time_budget, args.workers)
+        print(f'{case.name:<40}kanten {case.kanten:>3}  found {len(paths):>3}  evaluations {flops:>9}  '
+              f'{default_timer() - start:6.2f} s')
@@ -0,0 +1,110 @@
+"""
+Append-only log of solver runs, one JSON object per line.
+
+Every run starts with a 'run' record (solver, seed, time budget), followed by
+a 'case' record as soon as each case is solved, flushed to disk right away.
+A crashed or interrupted run keeps all cases solved so far, and can be
+resumed with `python test.py --resume <run id>`.
+
+> python run_log.py  # Lists the runs
+> python run_log.py <run id>  # Shows the results of a run
+"""
+from definitions import solutions_root
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import argparse
+import json
+import os
+import uuid
+
+RESULT_COLUMNS = ['name', 'schwierigkeit', 'size', 'kanten', 'pins', 'is_successful', 'paths_used', 'flops', 'time',
+                  'seed', 'cache_hit']
+
+
+class RunLog:
+    """
+  Parameters:
+  - path (Path): The JSON lines file. Default is solutions/runs.jsonl.
+  """
+
+    def __init__(self, path: Path = solutions_root / 'runs.jsonl'):
+        self.path = Path(path)
+
+    def append(self, record: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a+b') as file:
+            # Start on a new line if a crash cut off the last record
+            end = file.seek(0, os.SEEK_END)
+            if end:
+                file.seek(end - 1)
+                if file.read(1) != b'\n':
+                    file.write(b'\n')
+            file.write(json.dumps(record).encode() + b'\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def records(self, kind: str = None, run_id: str = None):
+        if not self.path.is_file():
+            return
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    continue  # A line cut off by a crash
+                if (kind is None or record['type'] == kind) and (run_id is None or record['run_id'] == run_id):
+                    yield record
+
+    def start_run(self, solution: str, seed: int, **settings) -> str:
+        """Adds a run record and returns the id of the new run, which is unique even for runs started together."""
+        run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{solution}-{uuid.uuid4().hex[:8]}"
+        self.append({'type': 'run', 'run_id': run_id, 'solution': solution, 'seed': seed,
+                     'started': datetime.now().isoformat(timespec='seconds'), **settings})
+        return run_id
+
+    def add_case(self, run_id: str, row: dict) -> None:
+        self.append({'type': 'case', 'run_id': run_id, **row})
+
+    def run(self, run_id: str) -> dict:
+        for record in self.records('run', run_id):
+            return record
+        raise KeyError(f'No run {run_id} in {self.path}')
+
+    def runs(self) -> pd.DataFrame:
+        runs = pd.DataFrame(self.records('run'))
+        if runs.empty:
+            return runs
+        cases = pd.DataFrame(self.records('case'), columns=['run_id', 'ID'])
+        runs['cases'] = runs.run_id.map(cases.groupby('run_id').ID.nunique()).fillna(0).astype(int)
+        return runs.drop(columns='type').set_index('run_id')
+
+    def completed(self, run_id: str) -> set:
+        """IDs of the cases solved in a run."""
+        return {record['ID'] for record in self.records('case', run_id)}
+
+    def results(self, run_id: str) -> pd.DataFrame:
+        """The results of a run, one row per case, as `test.gen_result` used to write to CSV."""
+        rows = {record['ID']: record for record in self.records('case', run_id)}  # The last row of a case wins
+        return pd.DataFrame([rows[i] for i in sorted(rows)], columns=['ID'] + RESULT_COLUMNS).set_index('ID')
+
+    def convergence(self, run_id: str) -> pd.DataFrame:
+        """Every improvement of every case of a run, see `utils.plot_convergence`."""
+        rows = [(record['ID'], record['kanten'], *improvement)
+                for record in self.records('case', run_id) for improvement in record.get('improvements', [])]
+        return pd.DataFrame(rows, columns=['ID', 'kanten', 'elapsed', 'paths_used', 'flops'])
+
+
+run_log = RunLog()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Show the logged solver runs.")
+    parser.add_argument("run_id", nargs="?", default=None, help="Run to show the results of. Default lists all runs.")
+    parser.add_argument("--log", default=None, help="Run log file. Default is solutions/runs.jsonl.")
+    args = parser.parse_args()
+    log = run_log if args.log is None else RunLog(args.log)
+    if args.run_id is None:
+        print(log.runs().to_string())
+    else:
+        print(log.results(args.run_id).to_string())
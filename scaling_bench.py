@@ -0,0 +1,111 @@
+"""
+Measures how solvers, and the building blocks they share, scale with the
+board size and the number of pins, on the synthetic cases of
+`generate_cases.py`.
+
+> python generate_cases.py
+> python scaling_bench.py mst_solution example_solution --time-budget 10 --memory
+
+Besides every solver, a single greedy tree (`connect_pins`) and the
+clustering of its paths (`get_clusters`) are timed per case. The `kanten` of
+synthetic cases is only the MST length, which the first greedy tree already
+beats, so solvers are asked for a tree of length 0 instead. Anytime solvers
+then search until the time budget (or until they have proven a tree
+optimal), and for those the length reached matters more than the time.
+Rows are written to solutions/scaling/<date>.csv and plotted.
+"""
+from definitions import Cases, get_clusters, solutions_root
+from example_solution import connect_pins
+from solution_cache import solution_cache
+from generate_cases import synthetic_cases_dir
+from bench import bench_case
+from datetime import datetime
+from pathlib import Path
+from timeit import default_timer
+from random import Random
+import matplotlib.pyplot as plt
+import pandas as pd
+import tracemalloc
+import importlib
+import argparse
+
+
+def time_call(function, *args, trace_memory: bool = False) -> tuple:
+    if trace_memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    start = default_timer()
+    result = function(*args)
+    d_time = default_timer() - start
+    return result, d_time, tracemalloc.get_traced_memory()[1] - baseline if trace_memory else None
+
+
+def component_rows(case, seed: int, trace_memory: bool = False) -> list:
+    paths, d_time, memory = time_call(connect_pins, case.pins, 0, None, Random(seed), trace_memory=trace_memory)
+    rows = [{'solver': 'connect_pins', 'paths_used': len(paths), 'time': d_time, 'peak_memory': memory}]
+    _, d_time, memory = time_call(get_clusters, paths, case.pins, trace_memory=trace_memory)
+    rows.append({'solver': 'get_clusters', 'paths_used': None, 'time': d_time, 'peak_memory': memory})
+    return [{'id': case.id, 'name': case.name, 'size': case.size, 'pins': len(case.pins), 'kanten': case.kanten,
+             **row} for row in rows]
+
+
+def run_scaling(solutions: list, source: Path = synthetic_cases_dir, time_budget: float = 10., seed: int = 0,
+                trace_memory: bool = False) -> pd.DataFrame:
+    path_finders = {name: importlib.import_module(name).find_paths for name in solutions}
+    # Measure the search itself, not lookups of trees found in earlier runs
+    solution_cache.enabled = False
+    if trace_memory:
+        tracemalloc.start()
+    rows = []
+    for case in sorted(Cases(source=source), key=lambda c: (c.size, len(c.pins), c.id)):
+        rows.extend(component_rows(case, seed + case.id, trace_memory))
+        for name, path_finder in path_finders.items():
+            row = bench_case(path_finder, case, seed + case.id, trace_memory, time_budget, target=0)
+            rows.append({'solver': name, 'name': case.name, **row})
+            print(f"{name:<20}{case.name:<16}size {case.size:>4}  pins {row['pins']:>4}  "
+                  f"kanten {case.kanten:>6}  found {row['paths_used']:>6}  {row['time']:8.2f} s")
+    if trace_memory:
+        tracemalloc.stop()
+    rows = pd.DataFrame(rows)
+    rows['relative_length'] = rows.paths_used / rows.kanten
+    return rows
+
+
+def plot_scaling(rows: pd.DataFrame):
+    """Median time, peak memory and length per solver, versus board size and versus pin count."""
+    metrics = [metric for metric in ('time', 'peak_memory', 'relative_length') if rows[metric].notna().any()]
+    fig, axes = plt.subplots(len(metrics), 2, figsize=(10, 3.5 * len(metrics)), squeeze=False)
+    for ax_row, metric in zip(axes, metrics):
+        for ax, x in zip(ax_row, ('size', 'pins')):
+            for solver, group in rows.groupby('solver', sort=False):
+                medians = group.groupby(x)[metric].median()
+                ax.plot(medians.index, medians.values, marker='o', label=solver)
+            ax.set_xscale('log', base=2)
+            if metric != 'relative_length':
+                ax.set_yscale('log')
+            ax.set_xlabel('board size' if x == 'size' else 'pins')
+            ax.set_ylabel({'time': 'seconds', 'peak_memory': 'peak bytes', 'relative_length': 'paths / kanten'}[metric])
+            ax.grid(True, which='both', alpha=.3)
+    axes[0][0].legend()
+    fig.tight_layout()
+    return fig
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark how solutions scale with board size and pin count.")
+    parser.add_argument("solutions", nargs="*", default=['mst_solution', 'example_solution'],
+                        help="Modules with a find_paths function. Default is mst_solution and example_solution.")
+    parser.add_argument("--source", default=synthetic_cases_dir,
+                        help="Directory or packed case set of the cases. Default is cases_synthetic/.")
+    parser.add_argument("--time-budget", type=float, default=10., help="Seconds per case for anytime solutions.")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed, case i is run with seed + i.")
+    parser.add_argument("--memory", action="store_true", help="Trace peak memory (slows down the solvers).")
+    args = parser.parse_args()
+
+    result = run_scaling(args.solutions, args.source, args.time_budget, args.seed, args.memory)
+    target = solutions_root / 'scaling' / f'{datetime.now():%Y%m%d-%H%M%S}.csv'
+    target.parent.mkdir(parents=True, exist_ok=True)
+    result.to_csv(target, index=False)
+    print(f'\nWritten to {target}')
+    plot_scaling(result).savefig(target.with_suffix('.png'))
+    plt.show()
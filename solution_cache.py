@@ -0,0 +1,162 @@
+"""
+Cache of the best known tree per board, shared by all solvers.
+
+Boards are keyed by a canonical form of their pins, so boards that are
+rotations, reflections or translations of each other share one entry. Entries
+live on disk in `solutions/cache`, with the most recently used ones in memory.
+Solvers only start from a cached tree, and store the tree they finish with,
+when called with `use_cache`, so their results stay their own and plain runs
+(and benchmarks) leave the cache as it was.
+
+> from solution_cache import solution_cache
+> solution_cache.get(pins)  # Returns the best known paths, or None
+"""
+from definitions import Point, Points, Paths, Tuple, solutions_root, get_clusters
+from collections import OrderedDict
+from itertools import chain
+from utils import json_in, json_out, validate_paths
+from pathlib import Path
+import hashlib
+import os
+
+# The 8 symmetries of a square board as matrices ((a, b), (c, d)): (x, y) -> (a x + b y, c x + d y)
+SYMMETRIES = [
+    ((1, 0), (0, 1)), ((0, -1), (1, 0)), ((-1, 0), (0, -1)), ((0, 1), (-1, 0)),  # Rotations
+    ((-1, 0), (0, 1)), ((1, 0), (0, -1)), ((0, 1), (1, 0)), ((0, -1), (-1, 0)),  # Reflections
+]
+
+Frame = Tuple[int, Point]  # Symmetry index and translation into the canonical frame
+
+
+def transform(point: Point, symmetry: int) -> Point:
+    (a, b), (c, d) = SYMMETRIES[symmetry]
+    x, y = point
+    return a * x + b * y, c * x + d * y
+
+
+def inverse_transform(point: Point, symmetry: int) -> Point:
+    # The matrices are orthogonal, so the inverse is the transpose
+    (a, b), (c, d) = SYMMETRIES[symmetry]
+    x, y = point
+    return a * x + c * y, b * x + d * y
+
+
+def canonical_form(pins: Points) -> Tuple[str, Frame]:
+    """
+    Finds the symmetry and translation that map `pins` to their canonical form:
+    the lexicographically smallest sorted pin list with minimum x and y of 0.
+
+    Returns:
+    - str: The canonical pins as key, for example '0,0;0,3;2,1'.
+    - Frame: The symmetry index and the translation, see `to_canonical`.
+    """
+    candidates = []
+    for symmetry in range(len(SYMMETRIES)):
+        points = [transform(pin, symmetry) for pin in set(pins)]
+        offset = min(x for x, _ in points), min(y for _, y in points)
+        candidates.append((sorted((x - offset[0], y - offset[1]) for x, y in points), (symmetry, offset)))
+    points, frame = min(candidates)
+    return ';'.join(f'{x},{y}' for x, y in points), frame
+
+
+def to_canonical(paths: Paths, frame: Frame) -> Paths:
+    symmetry, (dx, dy) = frame
+    return [tuple((x - dx, y - dy) for x, y in (transform(p, symmetry) for p in path)) for path in paths]
+
+
+def from_canonical(paths: Paths, frame: Frame) -> Paths:
+    symmetry, (dx, dy) = frame
+    return [tuple(inverse_transform((x + dx, y + dy), symmetry) for x, y in path) for path in paths]
+
+
+class SolutionCache:
+    """
+  Best known tree per canonical board, stored as one JSON file per board with
+  an in-memory LRU tier in front of it.
+
+  Parameters:
+  - directory (Path): Where the entries are stored. Default is solutions/cache.
+  - capacity (int): Number of entries kept in memory.
+
+  Set `enabled` to False to make every lookup miss and every store a no-op.
+  """
+
+    def __init__(self, directory: Path = solutions_root / 'cache', capacity: int = 256):
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.memory = OrderedDict()
+        self.enabled = True
+
+    def _file(self, key: str) -> Path:
+        return self.directory / f'{hashlib.sha1(key.encode()).hexdigest()[:16]}.json'
+
+    def _load(self, key: str) -> Paths:
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        file = self._file(key)
+        paths = None
+        if file.is_file():
+            entry = json_in(file)
+            if entry['key'] == key:
+                paths = [(tuple(p[0]), tuple(p[1])) for p in entry['paths']]
+                self._remember(key, paths)
+        return paths
+
+    def _remember(self, key: str, paths: Paths) -> None:
+        self.memory[key] = paths
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def get(self, pins: Points, size: int = None) -> Paths:
+        """
+        Returns the best known paths for `pins`, or None if the board is
+        unknown or its tree does not fit on a board of `size`. By default that
+        is the smallest board that holds the pins, the board the solvers build
+        their trees on.
+        """
+        if not self.enabled or len(set(pins)) < 2:
+            return None
+        key, frame = canonical_form(pins)
+        paths = self._load(key)
+        if paths is None:
+            return None
+        paths = from_canonical(paths, frame)
+        # The tree was stored for a symmetric board, and may run past the edge of this one
+        upper = max(max(pin) for pin in pins) if size is None else size
+        if any(not 0 <= value <= upper for path in paths for point in path for value in point):
+            return None
+        return paths
+
+    def put(self, pins: Points, paths: Paths) -> bool:
+        """
+        Stores `paths` if they are a valid tree connecting all `pins` and
+        shorter than the best known tree. Returns whether they were stored.
+        """
+        if not self.enabled or len(set(pins)) < 2 or not paths:
+            return False
+        # Every symmetric board is served this tree, so never store one that does not solve the board
+        try:
+            validate_paths(paths, size=max(value for point in chain(pins, *paths) for value in point))
+        except (TypeError, ValueError):
+            return False
+        _, pin_clusters = get_clusters(paths, pins)
+        if len(set(pin_clusters.values())) != 1:
+            return False
+        key, frame = canonical_form(pins)
+        best = self._load(key)
+        if best is not None and len(best) <= len(paths):
+            return False
+        paths = to_canonical(paths, frame)
+        self._remember(key, paths)
+        # Write to a temporary file first, so parallel workers never read a partial entry
+        self.directory.mkdir(parents=True, exist_ok=True)
+        file = self._file(key)
+        temporary = file.with_suffix(f'.{os.getpid()}.tmp')
+        json_out({'key': key, 'paths': paths}, temporary)
+        os.replace(temporary, file)
+        return True
+
+
+solution_cache = SolutionCache()
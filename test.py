@@ -1,39 +1,136 @@
-from definitions import Cases, solutions_root
-from utils import format_time, get_unique_filename
+from definitions import Case, Cases, solutions_root
+from utils import format_time, spawn_seeds
+from run_log import RunLog, run_log
+from checkpoint import checkpoint_dir
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import argparse
 import importlib
+import secrets
+import shutil
 
 
-def gen_result(_solution_name: str) -> pd.DataFrame:
+def solve_case(case: Case, path_finder, time_budget: float = None, seed: int = None, use_cache: bool = False,
+               run_id: str = None, resume: bool = False, table_size: int = 0) -> tuple:
+    # Also returns the improvements, as changes to `case` in a worker process do not reach the parent
+    result = case.solve(path_finder, time_budget, seed, use_cache, run_id, resume, table_size)
+    return result, case.improvements, case.cache_hit
+
+
+def case_row(case: Case, result: tuple, improvements: list, cache_hit: bool = False) -> dict:
+    is_success, paths_used, flops, d_time, seed = result
+    return {
+        'ID': case.id, 'name': case.name, 'schwierigkeit': case.schwierigkeit, 'size': case.size,
+        'kanten': case.kanten, 'pins': len(case.pins), 'is_successful': bool(is_success),
+        'paths_used': int(paths_used), 'flops': int(flops), 'time': d_time, 'seed': seed, 'cache_hit': cache_hit,
+        'improvements': [(elapsed, int(length), int(evals)) for elapsed, length, evals in improvements],
+    }
+
+
+def gen_result(_solution_name: str, workers: int = 1, time_budget: float = None, seed: int = None,
+               trace: bool = False, resume: str = None, log: RunLog = run_log,
+               use_cache: bool = False, table_size: int = 0) -> pd.DataFrame:
+    """
+    Solves all cases and appends each result to the run log as soon as it is
+    known. With `resume`, the run with that id is continued: its seed, time
+    budget, `use_cache` and `table_size` are reused, cases it already solved
+    are skipped and solvers continue from the checkpoints of the run.
+    Only with `use_cache` do solvers start from the best known trees in the
+    solution cache, which are shared by all solvers, and add theirs. Cases whose result is the
+    cached tree are marked `cache_hit`, and not saved as solutions.
+    With a `table_size`, solvers that support it skip trees they built
+    before, see `transposition`.
+    Returns the results of the run, with the run id in `attrs['run_id']`.
+    """
     solution_module = importlib.import_module(_solution_name)
-    target = solutions_root / solution_module.__name__ / 'test.csv'
-    path_finder = getattr(solution_module, 'find_paths')
+    # Prefer the anytime version of a solution, so improvements are recorded during the search
+    path_finder = getattr(solution_module, 'iter_paths', None) or getattr(solution_module, 'find_paths')
+
+    if resume is None:
+        # Draw the seed here, so it is logged and a resumed run solves the remaining cases the same way
+        seed = secrets.randbits(32) if seed is None else seed
+        run_id = log.start_run(solution_module.__name__, seed, time_budget=time_budget, workers=workers,
+                               use_cache=use_cache, table_size=table_size)
+    else:
+        run = log.run(resume)
+        if run['solution'] != solution_module.__name__:
+            raise ValueError(f"Run {resume} was made with {run['solution']}, not {solution_module.__name__}")
+        run_id, seed, time_budget, use_cache = resume, run['seed'], run['time_budget'], run.get('use_cache', False)
+        table_size = run.get('table_size', 0)
 
-    # Define a data frame where we will store our results to
-    case_attrs = ['name', 'schwierigkeit', 'size', 'kanten']
-    score = pd.DataFrame(columns=case_attrs + ['pins', 'is_successful', 'paths_used', 'flops', 'time'])
-    score.index.name = 'ID'
+    cases = list(Cases())
+    # Every case gets its own random stream, so results do not depend on the case order or worker
+    case_seeds = dict(zip(sorted(case.id for case in cases), spawn_seeds(seed, len(cases))))
+    completed = log.completed(run_id)
+    cases = [case for case in cases if case.id not in completed]
+    if workers > 1:
+        # Cases are independent, so each one is solved (and timed) in its own worker process
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(solve_case, case, path_finder, time_budget, case_seeds[case.id], use_cache,
+                                       run_id, resume is not None, table_size): case
+                       for case in cases}
+            for future in as_completed(futures):
+                log.add_case(run_id, case_row(futures[future], *future.result()))
+    else:
+        for case in cases:
+            log.add_case(run_id, case_row(case, *solve_case(case, path_finder, time_budget, case_seeds[case.id],
+                                                            use_cache, run_id, resume is not None,
+                                                            table_size)))
+    # Every case is logged, so a resume would not continue any of the checkpoints left by searches cut off
+    # by the time budget. Only runs that are interrupted keep theirs.
+    run_checkpoints = checkpoint_dir(solution_module.__name__, run_id)
+    shutil.rmtree(run_checkpoints, ignore_errors=True)
+    try:
+        run_checkpoints.parent.rmdir()  # Only once no other run has checkpoints left
+    except OSError:
+        pass
 
-    for case in Cases():
-        score.loc[case.id] = [getattr(case, c) for c in case_attrs] + [len(case.pins)] + list(case.solve(path_finder))
-    score.to_csv(get_unique_filename(target))
+    if trace:
+        # Every improvement of every case, see `utils.plot_convergence`
+        target = solutions_root / solution_module.__name__ / f'{run_id} convergence.csv'
+        target.parent.mkdir(parents=True, exist_ok=True)
+        log.convergence(run_id).sort_values(['ID', 'elapsed']).to_csv(target, index=False)
+    score = log.results(run_id)
+    score.attrs['run_id'] = run_id
     return score
 
 
 if __name__ == '__main__':
-    solution_name = 'example_solution'
-    while True:
-        gen_result(solution_name)
     parser = argparse.ArgumentParser(description="Run the path finding solution.")
     parser.add_argument("solution", nargs="?", default="your_solution",
                         help="Module name where find_paths function is located. Default is 'your_solution'.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes to solve cases in parallel. Default is 1 (serial).")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Seconds a solution may spend per case before returning its best tree so far.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed to repeat a run, the seed of each case is in the results. Default is random.")
+    parser.add_argument("--trace", action="store_true",
+                        help="Also write the time, evaluations and length of every improvement to a CSV file.")
+    parser.add_argument("--resume", default=None,
+                        help="Id of an interrupted run to continue, see `python run_log.py`.")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Start from the best known trees of any solver. Cases solved from the cache are marked.")
+    parser.add_argument("--table-size", type=int, default=0,
+                        help="Skip trees built before, remembering this many per search. Default is 0 (off).")
+    parser.add_argument("--forever", action="store_true",
+                        help="Keep solving all cases until interrupted, instead of once.")
     args = parser.parse_args()
-    score = gen_result(args.solution)
+
+    if args.forever:
+        # Every round is a new run that can only improve the saved solutions. Only the first round uses
+        # `--seed` (or `--resume`), later rounds draw their own seed so they do not repeat it.
+        while True:
+            gen_result(args.solution, workers=args.workers, time_budget=args.time_budget, seed=args.seed,
+                       trace=args.trace, resume=args.resume, use_cache=args.use_cache, table_size=args.table_size)
+            args.resume, args.seed = None, None
+    score = gen_result(args.solution, workers=args.workers, time_budget=args.time_budget, seed=args.seed,
+                       trace=args.trace, resume=args.resume, use_cache=args.use_cache, table_size=args.table_size)
 
     # Display the score
-    print('\n\n', score,
+    print('\n\n', score, f"\n\nRun {score.attrs['run_id']}",
           f'\n\nTotal score:\n'
           f'- {int(score.is_successful.sum())}/{len(score)} successes\n'
+          f'- {int(score.cache_hit.fillna(False).sum())} results from the solution cache\n'
           f'- {score.kanten.sum() - score.paths_used.sum()} paths\n'
           f'- {format_time(score.time.sum())} run time')
@@ -0,0 +1,49 @@
+from annealing_solution import SteinerTree, anneal, find_paths, relocate, reroute
+from definitions import Cases, get_clusters
+from example_solution import connect_pins
+from pathlib import Path
+from random import Random
+from timeit import default_timer
+from utils import validate_paths
+import pytest
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+case = cases.filter(schwierigkeit='extremschwer')[0]
+
+
+def is_tree(paths, pins):
+    _, pin_clusters = get_clusters(paths, pins)
+    points = {point for path in paths for point in path}
+    return len(set(pin_clusters.values())) == 1 and len(paths) == len(points) - 1
+
+
+@pytest.mark.parametrize('move', [reroute, relocate])
+def test_moves_keep_a_tree(move):
+    generator = Random(0)
+    tree = SteinerTree(connect_pins(case.pins, 3, generator=generator), case.pins, case.size)
+    for _ in range(300):
+        before = set(tree.edges)
+        log = []
+        tree.prune(move(tree, generator, log), log)
+        validate_paths(tree.to_paths(), size=case.size, allow_duplicates=False)
+        assert is_tree(tree.to_paths(), case.pins)
+        assert len(tree.graph) == len(tree) + 1
+        if generator.random() < .5:
+            tree.undo(log)
+            assert set(tree.edges) == before
+
+
+def test_anneal_improves():
+    lengths = [len(paths) for paths, _ in anneal(case.pins, connect_pins(case.pins, 3, generator=Random(0)),
+                                                 max_moves=2000, generator=Random(0))]
+    assert lengths[:-1] == sorted(set(lengths), reverse=True)
+    assert case.kanten <= lengths[-1] == min(lengths)
+
+
+@pytest.mark.parametrize('chains', [1, 2])
+def test_find_paths(chains):
+    start = default_timer()
+    paths, moves = find_paths(case.pins, case.kanten, start + 1, chains=chains, seed=0)
+    assert is_tree(paths, case.pins)
+    assert len(paths) >= case.kanten and moves > 0
+    assert default_timer() - start < 5
@@ -0,0 +1,53 @@
+from batch_solution import connect_pins_batch, find_paths
+from definitions import BoardState, Cases, board_elements, get_clusters
+from pathlib import Path
+from utils import validate_paths
+import numpy as np
+import pytest
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+
+
+def to_paths(pins, edges):
+    elements = board_elements(BoardState.for_points(pins).size)
+    return [elements[i] for i in np.nonzero(edges)[0]]
+
+
+@pytest.mark.parametrize('case', cases[::5], ids=lambda case: case.name)
+@pytest.mark.parametrize('rng', [0, 3])
+def test_batch_trees_connect_all_pins(case, rng):
+    edges = connect_pins_batch(case.pins, 64, rng, np.random.default_rng(0))
+    assert edges.shape == (64, len(board_elements(BoardState.for_points(case.pins).size)))
+    for tree in edges:
+        paths = to_paths(case.pins, tree)
+        validate_paths(paths, size=case.size, allow_duplicates=False)
+        _, pin_clusters = get_clusters(paths, case.pins)
+        assert len(set(pin_clusters.values())) == 1
+        assert len(paths) >= case.kanten
+
+
+def test_batch_is_reproducible():
+    pins = cases[0].pins
+    first = connect_pins_batch(pins, 32, 3, np.random.default_rng(7))
+    assert np.array_equal(first, connect_pins_batch(pins, 32, 3, np.random.default_rng(7)))
+
+
+def test_batch_limit():
+    pins = cases[-1].pins
+    limit = int(connect_pins_batch(pins, 64, 3, np.random.default_rng(0)).sum(axis=1).max())
+    edges = connect_pins_batch(pins, 64, 3, np.random.default_rng(0), limit=limit)
+    assert 0 < len(edges) < 64
+    assert (edges.sum(axis=1) < limit).all()
+
+
+@pytest.mark.parametrize('pins', [[], [(3, 4)], [(3, 4), (3, 4)]])
+def test_find_paths_without_two_pins(pins):
+    assert find_paths(pins) == ([], 0)
+
+
+def test_find_paths_reaches_target():
+    case = cases[0]
+    paths, flops = find_paths(case.pins, case.kanten + 2, seed=0)
+    _, pin_clusters = get_clusters(paths, case.pins)
+    assert len(set(pin_clusters.values())) == 1
+    assert len(paths) <= case.kanten + 2 and flops > 0
@@ -0,0 +1,51 @@
+from bench import bench_case, find_regressions, summarize
+from definitions import Cases
+from exact_solution import find_paths
+from pathlib import Path
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+
+
+def row(schwierigkeit='leicht', reached_target=True, time=1., flops=100, peak_memory=None):
+    return {'schwierigkeit': schwierigkeit, 'reached_target': reached_target, 'time': time, 'flops': flops,
+            'peak_memory': peak_memory}
+
+
+def test_bench_case():
+    case = cases[0]
+    result = bench_case(find_paths, case, seed=0)
+    assert result['is_successful'] and result['reached_target']
+    assert result['paths_used'] == case.kanten
+    assert result['peak_memory'] is None
+
+
+def test_bench_case_table_size():
+    def solver(pins, target, table_size=0):
+        used.append(table_size)
+        return find_paths(pins)
+
+    used = []
+    bench_case(solver, cases[0], seed=0, table_size=100_000)
+    bench_case(solver, cases[0], seed=0)
+    assert used == [100_000, 0]
+
+
+def test_summarize():
+    summary = summarize([row(time=1.), row(time=3.), row(reached_target=False, time=4.), row('schwer')])
+    assert list(summary) == ['leicht', 'schwer']
+    assert summary['leicht']['cases'] == 3
+    assert summary['leicht']['success_rate'] == 2 / 3
+    assert summary['leicht']['median_time_to_target'] == 2.
+    assert summary['leicht']['restarts_per_second'] == 300 / 8
+
+
+def test_find_regressions():
+    baseline = {'summary': summarize([row(time=1.), row(time=1.)])}
+    assert find_regressions({'summary': summarize([row(time=1.05), row(time=1.05)])}, baseline) == []
+    slower = find_regressions({'summary': summarize([row(time=2.), row(time=2.)])}, baseline)
+    assert any('median_time_to_target' in regression for regression in slower)
+    assert any('restarts_per_second' in regression for regression in slower)
+    failing = find_regressions({'summary': summarize([row(time=1.), row(reached_target=False)])}, baseline)
+    assert any('success rate' in regression for regression in failing)
+    # Difficulties missing from the baseline are new, not regressions
+    assert find_regressions({'summary': summarize([row('schwer', time=9.)])}, baseline) == []
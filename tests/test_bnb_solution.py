@@ -0,0 +1,40 @@
+from bnb_solution import branch_and_bound, parts_bound
+from definitions import Cases, get_clusters
+from example_solution import connect_pins
+from pathlib import Path
+from random import Random
+from utils import lower_bound
+import pytest
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+
+
+def is_tree(paths, pins):
+    _, pin_clusters = get_clusters(paths, pins)
+    return len(set(pin_clusters.values())) == 1
+
+
+@pytest.mark.parametrize('case', cases, ids=lambda case: case.name)
+def test_bounds_hold(case):
+    assert lower_bound(case.pins) <= case.kanten
+    paths, bound, nodes = branch_and_bound(case.pins, max_nodes=200, seed=0)
+    assert is_tree(paths, case.pins)
+    assert bound <= case.kanten <= len(paths)
+    assert nodes <= 200
+
+
+@pytest.mark.parametrize('case', cases.filter(schwierigkeit=['sehrleicht', 'leicht']), ids=lambda case: case.name)
+def test_proves_optimum(case):
+    # Starting from a plain greedy tree, the search proves the shortest tree on small boards
+    incumbent = connect_pins(case.pins, rng=2, generator=Random(0))
+    paths, bound, _ = branch_and_bound(case.pins, incumbent=incumbent)
+    assert is_tree(paths, case.pins)
+    assert len(paths) == bound == case.kanten
+
+
+def test_parts_bound():
+    assert parts_bound([[0]]) == 0
+    # Two parts need a route between them
+    assert parts_bound([[0, 5], [5, 0]]) == 5
+    # Three parts on a line of 4 apart need at least their spanning tree of 8 times 3/4
+    assert parts_bound([[0, 4, 8], [4, 0, 4], [8, 4, 0]]) == 6
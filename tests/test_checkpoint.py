@@ -0,0 +1,53 @@
+from checkpoint import load_checkpoint, remove_checkpoint, save_checkpoint
+from definitions import Cases
+from instrumentation import Probe
+from pathlib import Path
+from timeit import default_timer
+import batch_solution
+import example_solution
+import pytest
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+case = cases.filter(schwierigkeit='extremschwer')[0]
+state = {'pins': [(0, 0), (2, 1)], 'seed': 7, 'best': [((0, 0), (1, 0)), ((1, 0), (2, 0)), ((2, 0), (2, 1))],
+         'flops': 10, 'stage': 0, 'stage_evals': 10, 'rng_state': None}
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'run' / 'board_case.json'
+    save_checkpoint(path, state)
+    loaded = load_checkpoint(path, [(0, 0), (2, 1)])
+    assert loaded['best'] == state['best'] and loaded['seed'] == 7 and loaded['flops'] == 10
+    assert list(path.parent.iterdir()) == [path]  # No temporary files are left
+    remove_checkpoint(path)
+    assert load_checkpoint(path, [(0, 0), (2, 1)]) is None
+    remove_checkpoint(path)
+
+
+def test_other_pins(tmp_path):
+    path = tmp_path / 'board_case.json'
+    save_checkpoint(path, state)
+    assert load_checkpoint(path, [(0, 0), (2, 2)]) is None
+    # Duplicate pins do not make a different board
+    assert load_checkpoint(path, [(0, 0), (2, 1), (0, 0)])['seed'] == 7
+    save_checkpoint(path, {**state, 'pins': [(0, 0), (2, 1), (2, 1)]})
+    assert load_checkpoint(path, [(2, 1), (0, 0)])['seed'] == 7
+
+
+@pytest.mark.parametrize('solver, kwargs', [(example_solution, {'probe': Probe()}), (batch_solution, {})],
+                         ids=['example_solution', 'batch_solution'])
+def test_resume(tmp_path, solver, kwargs):
+    path = tmp_path / 'board_case.json'
+    pins = case.pins + case.pins[:1]
+    # Interrupted searches save their progress...
+    solver.find_paths(pins, 0, default_timer() + .3, seed=1, checkpoint=path, **kwargs)
+    first = load_checkpoint(path, case.pins)
+    assert first['seed'] == 1 and first['flops'] > 0 and first['best'] is not None
+    # ...and a resumed search continues from it, with its seed, even when given another
+    paths, flops = solver.find_paths(pins, 0, default_timer() + .3, seed=2, checkpoint=path, **kwargs)
+    second = load_checkpoint(path, case.pins)
+    assert second['seed'] == 1 and second['flops'] > first['flops']
+    assert len(paths) <= len(first['best'])
+    # A search that reaches its target removes the checkpoint
+    assert len(solver.find_paths(pins, len(paths), seed=2, checkpoint=path, **kwargs)[0]) == len(paths)
+    assert not path.exists()
@@ -0,0 +1,172 @@
+from definitions import BoardState, Case, Cases, DisjointSet, PinClusters, board_elements, get_clusters, pack_cases
+from pathlib import Path
+from timeit import default_timer
+import definitions
+import pytest
+
+cases_dir = Path(__file__).parents[1] / 'cases'
+
+paths = [((0, 0), (1, 0)), ((1, 0), (1, 1)), ((1, 1), (2, 1))]
+
+
+def test_board_state_round_trip():
+    state = BoardState(3, paths)
+    assert len(state) == 3
+    assert sorted(state.to_paths()) == sorted(paths)
+    assert sorted(state.to_points()) == [(0, 0), (1, 0), (1, 1), (2, 1)]
+
+
+def test_board_state_indices():
+    # Every path element of a board has its own bit, in the order of `board_elements`
+    state = BoardState(4)
+    elements = board_elements(4)
+    assert len(elements) == 2 * 4 * 5
+    assert [state.edge_index(element) for element in elements] == list(range(len(elements)))
+    # The direction of a path element does not matter
+    assert state.edge_index(((1, 1), (0, 1))) == state.edge_index(((0, 1), (1, 1)))
+    assert state.edge_index(((2, 3), (2, 2))) == state.edge_index(((2, 2), (2, 3)))
+
+
+def test_board_state_contains():
+    state = BoardState(3, paths)
+    assert ((1, 1), (1, 0)) in state
+    assert ((0, 0), (0, 1)) not in state
+    assert (2, 1) in state
+    assert (2, 2) not in state
+
+
+def test_board_state_union_and_copy():
+    state = BoardState(3, paths[:1])
+    other = BoardState(3, paths[1:])
+    merged = state | other
+    assert sorted(merged) == sorted(paths)
+    assert len(state) == 1
+    copy = state.copy()
+    copy.add(paths[1])
+    assert len(copy) == 2 and len(state) == 1
+
+
+def test_board_state_for_points():
+    state = BoardState.for_points([(0, 0), (5, 2)])
+    assert state.size == 5
+
+
+@pytest.mark.parametrize('size', [1, 7, 10])
+def test_board_state_full_board(size):
+    state = BoardState(size, board_elements(size))
+    assert len(state) == 2 * size * (size + 1)
+    assert len(state.to_points()) == (size + 1) ** 2
+
+
+def test_disjoint_set():
+    clusters = DisjointSet()
+    assert clusters.find('a') == 'a'
+    clusters.union('a', 'b')
+    clusters.union('c', 'd')
+    assert clusters.find('a') == clusters.find('b') != clusters.find('c')
+    root = clusters.union('b', 'd')
+    assert {clusters.find(item) for item in 'abcd'} == {root}
+    assert clusters.sizes[root] == 4
+
+
+def test_pin_clusters():
+    pins = [(0, 0), (2, 1), (0, 2)]
+    clusters = PinClusters(pins)
+    assert not clusters.is_connected
+    # Path elements away from the pins do not connect them
+    assert not clusters.add(((3, 3), (3, 2)))
+    assert [clusters.add(path) for path in paths] == [False, False, False]
+    assert not clusters.add(((0, 0), (0, 1)))
+    assert clusters.add(((0, 1), (0, 2)))
+    # Adding more keeps them connected
+    assert clusters.add(((2, 1), (2, 2)))
+    assert PinClusters([(4, 4), (4, 4)]).is_connected
+
+
+def test_pin_clusters_agree_with_get_clusters():
+    elements = list(board_elements(4))
+    pins = [(0, 0), (4, 4), (2, 3), (4, 0)]
+    clusters = PinClusters(pins)
+    for i, path in enumerate(elements[::3]):
+        _, pin_clusters = get_clusters(elements[::3][:i + 1], pins)
+        assert clusters.add(path) == (len(set(pin_clusters.values())) == 1)
+    assert clusters.add_paths(elements)
+
+
+def test_get_clusters():
+    other = [((3, 3), (3, 2))]
+    path_clusters, pin_clusters = get_clusters(paths + other, [(0, 0), (2, 1), (3, 2), (0, 3)])
+    assert path_clusters[(0, 0)] == path_clusters[(2, 1)] != path_clusters[(3, 3)]
+    assert pin_clusters[(0, 0)] == pin_clusters[(2, 1)]
+    assert pin_clusters[(3, 2)] == path_clusters[(3, 3)]
+    # A pin that no path reaches is a cluster of its own
+    assert pin_clusters[(0, 3)] not in path_clusters.values()
+    assert len(set(pin_clusters.values())) == 3
+
+
+def test_get_clusters_of_board_state():
+    assert get_clusters(BoardState(3, paths), [(0, 0), (2, 1)])[1] == {(0, 0): 0, (2, 1): 0}
+
+
+def test_get_clusters_rejects_pins():
+    with pytest.raises(ValueError):
+        get_clusters([(0, 0), (1, 0)])
+
+
+def anytime_solver(pins, target, deadline=None, seed=None):
+    # Yields a detour first, then the shortest tree
+    anytime_solver.kwargs = {'deadline': deadline, 'seed': seed}
+    yield [((0, 0), (0, 1)), ((0, 1), (1, 1)), ((1, 1), (1, 0))], 1
+    yield [((0, 0), (1, 0))], 2
+
+
+def test_solve_anytime(tmp_path, monkeypatch):
+    monkeypatch.setattr(definitions, 'solutions_root', tmp_path)
+    case = Case(tmp_path / 'board_case.json', pins=[(0, 0), (1, 0)], kanten=1)
+    start = default_timer()
+    is_success, paths_used, flops, _, seed = case.solve(anytime_solver, time_budget=5., seed=3)
+    assert (is_success, paths_used, flops, seed) == (True, 1, 2, 3)
+    assert [length for _, length, _ in case.improvements] == [3, 1]
+    assert anytime_solver.kwargs['seed'] == 3
+    assert start + 5. <= anytime_solver.kwargs['deadline'] <= default_timer() + 5.
+    assert Case.from_json(tmp_path / __name__ / 'board_case.json').paths == [((0, 0), (1, 0))]
+
+
+def table_solver(pins, target, table_size=0):
+    table_solver.table_size = table_size
+    return [((0, 0), (1, 0))], 1
+
+
+def test_solve_table_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(definitions, 'solutions_root', tmp_path)
+    case = Case(tmp_path / 'board_case.json', pins=[(0, 0), (1, 0)], kanten=1)
+    case.solve(table_solver, table_size=1000)
+    assert table_solver.table_size == 1000
+    case.solve(table_solver)
+    assert table_solver.table_size == 0
+    # Solvers without a table are called as before
+    case.solve(anytime_solver, table_size=1000)
+
+
+def test_cases_filter():
+    cases = Cases(source=cases_dir)
+    assert len(cases) == 31
+    hard = cases.filter(schwierigkeit=['schwer', 'sehrschwer'])
+    assert len(hard) == 10
+    assert {case.schwierigkeit for case in hard} == {'schwer', 'sehrschwer'}
+    assert len(Cases(source=cases_dir, pins=range(12, 20))) == len(cases.filter(pins=[12, 15])) == 5
+    assert len(Cases(3, source=cases_dir)) == len(cases[:3]) == 3
+    with pytest.raises(TypeError):
+        Cases(source=cases_dir, kanten=29)
+
+
+def test_packed_cases(tmp_path):
+    cases = Cases(source=cases_dir)
+    packed = Cases(source=pack_cases(cases, tmp_path / 'cases.pack'))
+    assert packed.info() == cases.info()
+    for case, other in zip(cases, packed):
+        assert (other.pins, other.paths, other.kanten, other.name) == (case.pins, case.paths, case.kanten, case.name)
+    assert len(packed.filter(schwierigkeit='leicht')) == len(cases.filter(schwierigkeit='leicht'))
+    # Boards larger than 255 are packed as uint16
+    large = Case(tmp_path / 'large_case.json', pins=[(0, 0), (300, 299)], size=300, schwierigkeit='leicht')
+    assert Cases(source=pack_cases([large], tmp_path / 'large.pack'))[0].pins == large.pins
@@ -0,0 +1,30 @@
+from definitions import BoardState, Cases, get_clusters
+from exact_solution import find_paths
+from pathlib import Path
+from utils import validate_paths
+import pytest
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+
+
+@pytest.mark.parametrize('case', cases, ids=lambda case: case.name)
+def test_matches_kanten(case):
+    paths, _ = find_paths(case.pins)
+    validate_paths(paths, size=case.size, allow_duplicates=False)
+    _, pin_clusters = get_clusters(paths, case.pins)
+    assert len(set(pin_clusters.values())) == 1
+    assert len(paths) == case.kanten
+
+
+def test_trivial_boards():
+    assert find_paths([]) == ([], 1)
+    assert find_paths([(3, 4), (3, 4)]) == ([], 1)
+    paths, _ = find_paths([(0, 0), (2, 3)])
+    assert len(paths) == 5
+
+
+def test_steiner_point():
+    # Three pins on the corners of a cross are best joined in its center
+    paths, _ = find_paths([(0, 1), (2, 1), (1, 0)])
+    assert len(paths) == 3
+    assert (1, 1) in BoardState(2, paths)
@@ -0,0 +1,87 @@
+from definitions import BoardState, get_clusters
+from example_solution import CandidateIndex, RouteTable, connect_pins, connect_two_points, iter_search, route_table
+from instrumentation import Probe
+from transposition import TranspositionTable
+from utils import manhattan_distance
+from random import Random
+import pytest
+
+pins = [(0, 0), (7, 2), (3, 9), (10, 10), (5, 5), (1, 8)]
+
+
+def test_candidates_closest_first():
+    tree = BoardState(10)
+    index = CandidateIndex(pins, tree)
+    # Without a tree, the closest pin pairs are listed
+    first = index.candidates(rng=2)
+    assert len(first) == 3
+    assert [manhattan_distance(*pair) for pair in first] == sorted(manhattan_distance(p1, p2) for p1 in pins
+                                                                   for p2 in pins if p2 != p1)[:3]
+    tree.add(((5, 5), (5, 6)))
+    tree.add(((5, 6), (6, 6)))
+    index.update()
+    assert (5, 5) not in [pins[i] for i in index.open]
+    candidates = index.candidates(rng=3)
+    expected = sorted(manhattan_distance(pin, point) for pin in pins if pin not in tree
+                      for point in tree.to_points())
+    assert [manhattan_distance(*pair) for pair in candidates] == expected[:4]
+    assert all(pin not in tree and point in tree for pin, point in candidates)
+
+
+def test_route_table():
+    routes = route_table(10)
+    generator = Random(0)
+    for _ in range(50):
+        point1, point2 = [(generator.randint(0, 10), generator.randint(0, 10)) for _ in range(2)]
+        for (edges, points), route in zip(routes[point1, point2],
+                                          (connect_two_points(point1, point2), connect_two_points(point2, point1))):
+            expected = BoardState(10, route)
+            expected.points |= 1 << expected.point_index(point1)
+            assert (edges, points) == (expected.edges, expected.points)
+    # The horizontal first route comes first
+    horizontal_first = BoardState(10)
+    horizontal_first.edges = routes[(0, 0), (2, 2)][0][0]
+    assert ((0, 0), (1, 0)) in horizontal_first and ((0, 0), (0, 1)) not in horizontal_first
+    assert route_table(10) is routes
+
+
+def test_route_table_capacity():
+    # Every route of the boards of the cases fits, on large boards the oldest routes are dropped
+    assert RouteTable(10).capacity >= 11 ** 4
+    routes = RouteTable(256)
+    assert routes.capacity < 1000
+    routes.capacity = 3
+    pairs = [((0, 0), (i, 5)) for i in range(5)]
+    masks = [routes[pair] for pair in pairs]
+    assert list(routes) == pairs[2:]
+    assert routes[pairs[0]] == masks[0]
+    assert len(routes) == 3
+
+
+@pytest.mark.parametrize('rng', [0, 1, 3])
+def test_connect_pins_connects_all_pins(rng):
+    generator = Random(rng)
+    for _ in range(20):
+        paths = connect_pins(pins, rng=rng, generator=generator)
+        _, pin_clusters = get_clusters(paths, pins)
+        assert len(set(pin_clusters.values())) == 1
+
+
+def test_connect_pins_limit():
+    # Trees are abandoned once they reach `limit` path elements before connecting all pins
+    assert connect_pins(pins, limit=1, generator=Random(0)) is None
+    assert connect_pins(pins, limit=100, generator=Random(0)) is not None
+
+
+@pytest.mark.parametrize('board', [[], [(3, 4)], [(3, 4), (3, 4)]])
+def test_connect_pins_without_two_pins(board):
+    assert connect_pins(board) == []
+    assert connect_pins(board, table=TranspositionTable(10)) == []
+
+
+def test_search_is_reproducible():
+    def trees(seed):
+        return list(iter_search(pins, max_evals=200, rng=3, seed=seed, probe=Probe()))
+
+    assert trees(5) == trees(5)
+    assert connect_pins(pins, rng=5, generator=Random(1)) != connect_pins(pins, rng=5, generator=Random(2))
@@ -0,0 +1,40 @@
+from run_log import RunLog
+from utils import SOLUTION_FILES
+import checkpoint
+import definitions
+import pytest
+import test
+
+
+@pytest.fixture
+def solutions(tmp_path, monkeypatch):
+    # Solutions and checkpoints of the runs go to a temporary directory
+    for module in (definitions, checkpoint, test):
+        monkeypatch.setattr(module, 'solutions_root', tmp_path)
+    return tmp_path
+
+
+def test_workers_give_the_same_results(solutions):
+    log = RunLog(solutions / 'runs.jsonl')
+    serial = test.gen_result('exact_solution', workers=1, seed=0, log=log)
+    parallel = test.gen_result('exact_solution', workers=2, seed=0, log=log)
+    assert len(serial) == len(definitions.Cases()) and serial.is_successful.all()
+    assert (serial.paths_used == serial.kanten).all()
+    columns = ['name', 'kanten', 'paths_used', 'seed']
+    assert parallel[columns].equals(serial[columns])
+    assert set(log.runs().index) == {serial.attrs['run_id'], parallel.attrs['run_id']}
+    assert len(list((solutions / 'exact_solution').glob(SOLUTION_FILES))) == len(serial)
+
+
+def test_checkpoints_are_removed(solutions):
+    # Searches cut off by the time budget leave checkpoints, which are removed with their directories
+    score = test.gen_result('batch_solution', time_budget=.02, seed=0, log=RunLog(solutions / 'runs.jsonl'))
+    assert score.is_successful.all()
+    assert not (solutions / 'batch_solution' / 'checkpoints').exists()
+
+
+def test_table_size_is_logged(solutions):
+    log = RunLog(solutions / 'runs.jsonl')
+    score = test.gen_result('example_solution', time_budget=.02, seed=0, log=log, table_size=1000)
+    assert score.is_successful.all()
+    assert log.run(score.attrs['run_id'])['table_size'] == 1000
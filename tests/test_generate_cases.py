@@ -0,0 +1,31 @@
+from definitions import Cases
+from generate_cases import generate_cases, make_case
+from utils import json_in
+import pytest
+
+
+@pytest.mark.parametrize('kind', ['random', 'clustered'])
+def test_make_case(kind):
+    case = make_case(0, 64, 100, kind, seed=1)
+    assert len(case['pins']) == len(set(case['pins'])) == 100
+    assert all(0 <= value <= 64 for pin in case['pins'] for value in pin)
+    assert case == make_case(0, 64, 100, kind, seed=1)
+    assert case['pins'] != make_case(0, 64, 100, kind, seed=2)['pins']
+
+
+def test_no_room():
+    with pytest.raises(ValueError):
+        make_case(0, 2, 10)
+
+
+def test_generate_cases(tmp_path):
+    files = generate_cases([4, 32], [20, 50], kinds=['random'], seed=0, target=tmp_path)
+    # A board of size 4 has room for 25 pins only
+    assert len(files) == 3
+    assert [json_in(file) for file in files] == [json_in(file) for file in
+                                                 generate_cases([4, 32], [20, 50], kinds=['random'], seed=0,
+                                                                target=tmp_path / 'again')]
+    # The cases are found and filtered by their file names
+    cases = Cases(source=tmp_path)
+    assert sorted(case['pins'] for case in cases.info()) == [20, 20, 50]
+    assert len(cases.filter(size=32)) == 2
@@ -0,0 +1,33 @@
+from instrumentation import JsonlSink, Probe
+from pathlib import Path
+import subprocess
+import json
+import sys
+
+
+def test_probe_samples_and_reports(tmp_path):
+    records = []
+    probe = Probe([records.append, JsonlSink(tmp_path / 'trace.jsonl')], interval=3600, sample_rate=4)
+    samples = [probe.sample() for _ in range(8)]
+    # Only one in `sample_rate` restarts is timed
+    assert [sample is not None for sample in samples] == [False, False, False, True] * 2
+    samples[3]['closest_points'] += 1.
+    probe.tick(8)
+    probe.improvement(30)
+    probe.improvement(28)
+    assert records == []  # Not reported within the interval
+    probe.close()
+    record = records[-1]
+    assert record['restarts'] == 8 and record['best_length'] == 28 and record['improvements'] == 2
+    # Sampled times are scaled up to all restarts
+    assert record['time'] == {'closest_points': 4.}
+    assert [json.loads(line) for line in open(tmp_path / 'trace.jsonl')] == records
+
+
+def test_report_of_a_table():
+    # With a transposition table, the report tells how many restarts built a new tree
+    result = subprocess.run([sys.executable, 'instrumentation.py', '--case', '0', '--rng', '1', '--evals', '300',
+                             '--table-size', '100000'], cwd=Path(__file__).parents[1], capture_output=True, text=True,
+                            check=True)
+    assert 'distinct trees' in result.stdout
+    assert 'transposition' in result.stdout
@@ -0,0 +1,37 @@
+from definitions import Cases, get_clusters
+from example_solution import connect_pins
+from local_search import improve
+from pathlib import Path
+from random import Random
+from utils import validate_paths
+import pytest
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+
+
+def is_tree(paths, pins):
+    _, pin_clusters = get_clusters(paths, pins)
+    return len(set(pin_clusters.values())) == 1
+
+
+def test_prunes_dead_ends():
+    pins = [(0, 0), (2, 0)]
+    paths = [((0, 0), (1, 0)), ((1, 0), (2, 0)), ((1, 0), (1, 1)), ((1, 1), (1, 2))]
+    assert sorted(improve(paths, pins)) == [((0, 0), (1, 0)), ((1, 0), (2, 0))]
+
+
+def test_removes_detours():
+    pins = [(0, 0), (2, 0)]
+    detour = [((0, 0), (0, 1)), ((0, 1), (1, 1)), ((1, 1), (2, 1)), ((2, 1), (2, 0))]
+    assert len(improve(detour, pins)) == 2
+
+
+@pytest.mark.parametrize('case', cases[::5], ids=lambda case: case.name)
+def test_improves_greedy_trees(case):
+    generator = Random(0)
+    for _ in range(5):
+        paths = connect_pins(case.pins, rng=2, generator=generator)
+        improved = improve(paths, case.pins)
+        validate_paths(improved, size=case.size, allow_duplicates=False)
+        assert is_tree(improved, case.pins)
+        assert case.kanten <= len(improved) <= len(paths)
@@ -0,0 +1,32 @@
+from definitions import Cases, get_clusters
+from mst_solution import embed, find_paths, steiner_points
+from pathlib import Path
+from utils import rectilinear_mst, manhattan_distance, validate_paths
+import pytest
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+
+
+@pytest.mark.parametrize('case', cases, ids=lambda case: case.name)
+def test_find_paths(case):
+    paths, _ = find_paths(case.pins)
+    validate_paths(paths, size=case.size, allow_duplicates=False)
+    _, pin_clusters = get_clusters(paths, case.pins)
+    assert len(set(pin_clusters.values())) == 1
+    mst = sum(manhattan_distance(*edge) for edge in rectilinear_mst(case.pins))
+    assert case.kanten <= len(paths) <= mst
+    # The heuristic is deterministic
+    assert sorted(find_paths(case.pins)[0]) == sorted(paths)
+
+
+def test_steiner_point_of_a_cross():
+    pins = [(0, 2), (4, 2), (2, 0), (2, 4)]
+    added, edges, _ = steiner_points(pins)
+    assert added == [(2, 2)]
+    assert len(edges) == 4 and len(embed(edges)) == 8
+
+
+def test_embed_shares_routes():
+    # The route to (2, 2) overlaps the edge to (2, 0) when it goes horizontal first
+    paths = embed([((0, 0), (2, 0)), ((0, 0), (2, 2))])
+    assert len(paths) == 4
@@ -0,0 +1,44 @@
+from definitions import Cases, get_clusters
+from pathlib import Path
+from timeit import default_timer
+import multiprocessing as mp
+import mst_solution
+import portfolio_solution
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+
+
+def is_tree(paths, pins):
+    _, pin_clusters = get_clusters(paths, pins)
+    return len(set(pin_clusters.values())) == 1
+
+
+def test_publish_lowers_the_incumbent():
+    best, cancel = mp.Value('i', 30), mp.Event()
+    portfolio_solution.init_worker(best, cancel)
+    portfolio_solution.publish(35, target=20)
+    assert best.value == 30 and not portfolio_solution.should_stop(None)
+    portfolio_solution.publish(25, target=20)
+    assert best.value == 25 and not portfolio_solution.should_stop(None)
+    assert portfolio_solution.should_stop(default_timer() - 1)
+    portfolio_solution.publish(20, target=20)
+    assert best.value == 20 and portfolio_solution.should_stop(None)
+
+
+def test_find_paths():
+    case = cases.filter(schwierigkeit='extremschwer')[0]
+    start = default_timer()
+    paths, flops = portfolio_solution.find_paths(case.pins, case.kanten, start + 2, workers=2, seed=0)
+    assert default_timer() - start < 10
+    assert is_tree(paths, case.pins)
+    assert case.kanten <= len(paths) <= len(mst_solution.find_paths(case.pins)[0])
+    assert flops > 0
+
+
+def test_find_paths_reached_target():
+    # Without a deadline, the run ends as soon as a worker reaches the target the MST tree misses
+    case = next(case for case in cases.filter(schwierigkeit='leicht')
+                if len(mst_solution.find_paths(case.pins)[0]) > case.kanten)
+    paths, _ = portfolio_solution.find_paths(case.pins, case.kanten, workers=2, seed=0)
+    assert is_tree(paths, case.pins)
+    assert len(paths) == case.kanten
@@ -0,0 +1,35 @@
+from run_log import RunLog
+import pytest
+
+
+def case(case_id, paths_used):
+    return {'ID': case_id, 'name': f'case {case_id}', 'kanten': 20, 'paths_used': paths_used,
+            'improvements': [[.1, paths_used + 2, 5], [.5, paths_used, 50]]}
+
+
+def test_runs_and_results(tmp_path):
+    log = RunLog(tmp_path / 'runs.jsonl')
+    run_id = log.start_run('example_solution', seed=3, time_budget=1.)
+    other = log.start_run('batch_solution', seed=4)
+    assert run_id != other
+    log.add_case(run_id, case(2, 24))
+    log.add_case(run_id, case(1, 22))
+    log.add_case(run_id, case(2, 23))
+    assert log.run(run_id)['seed'] == 3 and log.run(run_id)['time_budget'] == 1.
+    assert log.completed(run_id) == {1, 2} and log.completed(other) == set()
+    assert log.runs().cases.to_dict() == {run_id: 2, other: 0}
+    # One row per case, the last one logged wins
+    assert log.results(run_id).paths_used.to_dict() == {1: 22, 2: 23}
+    assert len(log.convergence(run_id)) == 6
+    with pytest.raises(KeyError):
+        log.run('unknown')
+
+
+def test_survives_a_cut_off_record(tmp_path):
+    log = RunLog(tmp_path / 'runs.jsonl')
+    run_id = log.start_run('example_solution', seed=0)
+    log.add_case(run_id, case(1, 22))
+    with open(log.path, 'a') as file:
+        file.write('{"type": "case", "run_id": "')
+    log.add_case(run_id, case(2, 24))
+    assert log.completed(run_id) == {1, 2}
@@ -0,0 +1,77 @@
+from solution_cache import SYMMETRIES, SolutionCache, canonical_form, from_canonical, to_canonical, transform
+from definitions import Cases
+from exact_solution import find_paths
+from pathlib import Path
+import pytest
+
+cases = Cases(source=Path(__file__).parents[1] / 'cases')
+case = cases.filter(schwierigkeit='mittel')[0]
+tree, _ = find_paths(case.pins)
+
+
+def symmetric_board(pins, paths, symmetry, shift=(0, 0)):
+    # The board mirrored or rotated by `symmetry` and moved by `shift`, kept at non-negative coordinates
+    points = [transform(pin, symmetry) for pin in pins]
+    dx, dy = shift[0] - min(x for x, _ in points), shift[1] - min(y for _, y in points)
+    move = lambda point: (point[0] + dx, point[1] + dy)
+    return [move(point) for point in points], [tuple(move(transform(p, symmetry)) for p in path) for path in paths]
+
+
+@pytest.mark.parametrize('symmetry', range(len(SYMMETRIES)))
+def test_canonical_round_trip(symmetry):
+    pins, paths = symmetric_board(case.pins, tree, symmetry, shift=(1, 2))
+    key, frame = canonical_form(pins)
+    # All symmetric boards share the key of the original one
+    assert key == canonical_form(case.pins)[0]
+    canonical = to_canonical(paths, frame)
+    assert min(value for path in canonical for point in path for value in point) >= 0
+    assert from_canonical(canonical, frame) == paths
+
+
+@pytest.mark.parametrize('symmetry', range(len(SYMMETRIES)))
+def test_get_symmetric_board(tmp_path, symmetry):
+    cache = SolutionCache(tmp_path)
+    assert cache.put(case.pins, tree)
+    pins, expected = symmetric_board(case.pins, tree, symmetry)
+    # Read back from disk, not from memory
+    cached = SolutionCache(tmp_path).get(pins, size=case.size)
+    assert sorted(map(sorted, cached)) == sorted(map(sorted, expected))
+
+
+def test_put_keeps_the_shortest_tree(tmp_path):
+    cache = SolutionCache(tmp_path)
+    detour = tree + [((0, 0), (0, 1))] if ((0, 0), (0, 1)) not in tree else tree + [((1, 0), (1, 1))]
+    assert cache.get(case.pins) is None
+    assert cache.put(case.pins, detour)
+    assert cache.put(case.pins, tree)
+    assert not cache.put(case.pins, detour)
+    assert len(cache.get(case.pins)) == len(tree)
+
+
+def test_put_rejects_invalid_trees(tmp_path):
+    cache = SolutionCache(tmp_path)
+    assert not cache.put(case.pins, None)
+    assert not cache.put(case.pins, [])
+    assert not cache.put(case.pins, tree[1:])  # Not connected
+    assert not cache.put(case.pins, tree[:-1] + [((0, 0), (2, 0))])  # Not a path element
+    assert not cache.put([(0, 0)], [((0, 0), (0, 1))])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_disabled(tmp_path):
+    cache = SolutionCache(tmp_path)
+    cache.enabled = False
+    assert not cache.put(case.pins, tree)
+    assert cache.get(case.pins) is None
+
+
+def test_translated_tree_must_fit(tmp_path):
+    cache = SolutionCache(tmp_path)
+    pins = [(0, 0), (0, 2)]
+    assert cache.put(pins, [((0, 0), (1, 0)), ((1, 0), (1, 1)), ((1, 1), (1, 2)), ((1, 2), (0, 2))])
+    # The same board moved to the right edge, where the cached detour would leave the board
+    assert cache.get([(5, 0), (5, 2)], size=5) is None
+    assert len(cache.get([(4, 0), (4, 2)], size=5)) == 4
+    # Without a size, the tree must fit on the smallest board that holds the pins
+    assert cache.get([(2, 0), (2, 2)]) is None
+    assert len(cache.get(pins)) == len(cache.get([(2, 0), (2, 2)], size=3)) == 4
@@ -0,0 +1,46 @@
+from definitions import BoardState
+from example_solution import connect_pins, iter_search
+from instrumentation import Probe
+from random import Random
+from transposition import EMPTY_TREE, TranspositionTable, zobrist_keys, zobrist_update
+
+pins = [(0, 0), (3, 1), (1, 4), (4, 3)]
+
+
+def test_zobrist_hash_ignores_order():
+    keys = zobrist_keys(5)
+    assert len(keys) == len(set(keys)) == 2 * 5 * 6
+    state = BoardState(5)
+    first, second = 1 << state.edge_index(((0, 0), (1, 0))), 1 << state.edge_index(((1, 0), (1, 1)))
+    one_by_one = zobrist_update(zobrist_update(EMPTY_TREE, first, keys), second, keys)
+    assert one_by_one == zobrist_update(zobrist_update(EMPTY_TREE, second, keys), first, keys)
+    assert one_by_one == zobrist_update(EMPTY_TREE, first | second, keys) != EMPTY_TREE
+
+
+def test_table_evicts_least_recently_used():
+    table = TranspositionTable(3, explored=[1, 2, 3])
+    assert 1 in table  # Now the most recently used
+    table.add(4)
+    assert list(table) == [3, 1, 4]
+    assert 2 not in table
+    # A table built from another one keeps its order
+    assert list(TranspositionTable(3, explored=table)) == [3, 1, 4]
+
+
+def test_every_tree_is_built_once():
+    table, trees = TranspositionTable(), []
+    generator = Random(0)
+    while EMPTY_TREE not in table:
+        paths = connect_pins(pins, rng=1, generator=generator, table=table)
+        if paths is not None:
+            trees.append(frozenset(paths))
+    assert len(trees) == len(set(trees)) > 1
+    # Restarts without a table repeat these trees only
+    assert all(frozenset(connect_pins(pins, rng=1, generator=generator)) in trees for _ in range(200))
+
+
+def test_search_stops_when_all_trees_are_built():
+    probe = Probe()
+    *_, (best, evals) = iter_search(pins, max_evals=100_000, rng=1, seed=0, probe=probe, table_size=100_000)
+    assert evals < 100_000
+    assert probe.counters['distinct_trees'] <= evals
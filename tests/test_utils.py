@@ -0,0 +1,93 @@
+from utils import (contact_sheet, json_in, json_out, plot_convergence, render_solutions, spawn_seeds, validate_paths,
+                   validate_paths_batch)
+from definitions import Cases, board_elements
+from exact_solution import find_paths
+from pathlib import Path
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+import pytest
+
+long = list(board_elements(10))[:100]
+
+
+def test_spawn_seeds():
+    seeds = spawn_seeds(0, 4)
+    assert len(seeds) == len(set(seeds)) == 4
+    assert spawn_seeds(0, 4) == seeds
+    assert spawn_seeds(1, 4) != seeds
+    assert all(0 <= seed < 2 ** 32 for seed in seeds)
+
+
+def test_plot_convergence(tmp_path):
+    # Case 1 improves from 3 to 1 above kanten, case 2 starts at 2 and reaches it
+    trace = pd.DataFrame({'ID': [1, 1, 2, 2], 'kanten': [20, 20, 30, 30], 'paths_used': [23, 21, 32, 30],
+                          'elapsed': [.1, 1., .5, 2.], 'flops': [10, 100, 50, 200]})
+    trace.to_csv(tmp_path / 'run convergence.csv', index=False)
+    ax = plot_convergence({'csv': tmp_path / 'run convergence.csv', 'frame': trace}, ax=Figure().subplots())
+    # A thin line per case and a median line per run, and the target
+    assert len(ax.get_lines()) == 2 * 3 + 1
+    median = ax.get_lines()[2]
+    assert median.get_label() == 'csv'
+    assert np.array_equal(median.get_xdata(), [.1, .5, 1., 2.])
+    assert np.array_equal(median.get_ydata(), [3, 2.5, 1.5, .5])
+    assert ax.get_xlabel() == 'seconds'
+
+
+def is_valid(paths, size=10, allow_duplicates=True):
+    try:
+        validate_paths(paths, size, allow_duplicates)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+# Short and long (checked as one array) lists, each valid and with a single problem
+batch = [long, long[:5], [], long + [long[3][::-1]], long[:5] + [long[3][::-1]], long + [((0, 0), (0, 2))],
+         long + [((10, 10), (11, 10))], long + [((0, 0), (0, -1))], long[:5] + [((0., 0.), (1., 0.))],
+         long + [((0, .5), (1, .5))], long + [[(0, 0), (1, 0)]], long + [((0, 0),)], long + [((0, 0), (1, 0, 0))],
+         long + [((0, 0), ('1', 0))], tuple(long), None, long[:5] + [((0, 0), (1, True))]]
+
+
+@pytest.mark.parametrize('allow_duplicates', [True, False])
+def test_validate_paths_batch(allow_duplicates):
+    expected = [is_valid(paths, allow_duplicates=allow_duplicates) for paths in batch]
+    assert validate_paths_batch(batch, allow_duplicates=allow_duplicates).tolist() == expected
+    assert expected[:3] == [True] * 3 and expected[5:8] == [False] * 3
+    assert expected[3] == allow_duplicates
+
+
+def test_validate_paths_batch_valid_only():
+    assert validate_paths_batch([long, long[:5], []]).all()
+    assert validate_paths_batch([]).tolist() == []
+
+
+@pytest.mark.parametrize('paths, error', [
+    ([((0, 0), (0, 2))], ValueError), ([((0, 0), (1, 0)), ((0, 0), (0, 11))], ValueError),
+    ([[(0, 0), (1, 0)]], TypeError), ([((0, 0), ('1', 0))], TypeError), (((0, 0), (1, 0)), TypeError),
+])
+def test_validate_paths_long_and_short(paths, error):
+    # Long lists report the same errors as short ones
+    for prefix in ([], long):
+        with pytest.raises(error):
+            validate_paths(prefix + paths if isinstance(paths, list) else paths)
+
+
+def test_validate_paths_duplicates():
+    validate_paths(long + [long[0]])
+    for prefix in ([], long[1:]):
+        with pytest.raises(ValueError, match='duplicate'):
+            validate_paths(prefix + [long[0], long[0][::-1]], allow_duplicates=False)
+
+
+def test_render_solutions(tmp_path):
+    case = Cases(source=Path(__file__).parents[1] / 'cases')[0]
+    solution = {**json_in(case.file), 'paths': find_paths(case.pins)[0]}
+    json_out(solution, tmp_path / case.file.name)
+    # Other JSON files next to the solutions, such as benchmarks, are skipped
+    json_out({'solution': 'exact_solution', 'cases': []}, tmp_path / 'bench.json')
+    rendered = render_solutions(tmp_path, tmp_path / 'png', workers=1)
+    assert rendered == [tmp_path / 'png' / f'{case.file.stem}.png']
+    assert rendered[0].stat().st_size > 0
+    sheet = contact_sheet([tmp_path / case.file.name] * 3, tmp_path / 'sheet.png', columns=2)
+    assert sheet.stat().st_size > 0
@@ -0,0 +1,74 @@
+"""
+Transposition table of the partial trees explored by greedy restarts.
+
+A partial tree is identified by the Zobrist hash of its path elements: the
+XOR of a random 64 bit key per path element. Adding path elements to a tree
+updates its hash with one XOR per new element, and trees with the same path
+elements hash the same, whatever order they were built in.
+
+A tree is explored once every tree a restart can grow from it is explored,
+or when it can not beat the best tree anymore (see `limit`). Restarts only step into
+unexplored trees, and stop when none are left (see
+`example_solution.connect_pins`), so every complete tree is built at most
+once. Once the empty tree is explored, restarts have built every tree they
+can.
+"""
+from definitions import iter_bits
+from collections import OrderedDict
+from functools import lru_cache
+from random import Random
+from typing import List
+
+EMPTY_TREE = 0  # The hash of a tree without path elements
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(size: int) -> List[int]:
+    """A random 64 bit key per path element of a board, in the indexing of a BoardState."""
+    generator = Random(size)  # Fixed, so hashes are the same in every process
+    return [generator.getrandbits(64) for _ in range(2 * size * (size + 1))]
+
+
+def zobrist_update(tree_hash: int, new_edges: int, keys: List[int]) -> int:
+    """The hash of a tree after adding the path elements in the bitmask `new_edges`, which it does not contain."""
+    for i in iter_bits(new_edges):
+        tree_hash ^= keys[i]
+    return tree_hash
+
+
+class TranspositionTable:
+    """
+    Hashes of explored trees, of which the `capacity` most recently used are
+    kept. An evicted tree is explored again when a restart reaches it.
+    Iterating gives the hashes from least to most recently used, so a table
+    built from them evicts in the same order.
+
+    Parameters:
+    - capacity (int): Number of trees kept.
+    - explored (iterable): Hashes to start with, least recently used first.
+    - limit (int): Trees with this many path elements or more are explored, as
+      they can not beat the best tree. None for no limit.
+    """
+
+    def __init__(self, capacity: int = 100_000, explored=(), limit: int = None):
+        self.capacity = capacity
+        self.explored = OrderedDict.fromkeys(explored)
+        self.limit = limit
+
+    def __contains__(self, tree_hash: int) -> bool:
+        if tree_hash in self.explored:
+            self.explored.move_to_end(tree_hash)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self.explored)
+
+    def __iter__(self):
+        return iter(self.explored)
+
+    def add(self, tree_hash: int) -> None:
+        self.explored[tree_hash] = None
+        self.explored.move_to_end(tree_hash)
+        while len(self.explored) > self.capacity:
+            self.explored.popitem(last=False)
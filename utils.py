@@ -2,13 +2,21 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from typing import List, Tuple, Dict
-from definitions import Point, Points, Paths, colors, sorted_difficulties
+from definitions import Point, Points, Paths, DisjointSet, colors, sorted_difficulties, get_clusters
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PatchCollection
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import Callable
 from pathlib import Path
 import matplotlib.cm as cm
 import json
+import csv
 import argparse
 import re
+import bisect
+from itertools import chain
 
 
 def flatten(nested_list: List[List]) -> list:
@@ -123,6 +131,100 @@ def manhattan_distance(point1: Point, point2: Point) -> int:
     return int(abs(x2 - x1) + abs(y2 - y1))
 
 
+def rectilinear_mst(points: Points) -> List[Tuple[Point, Point]]:
+    """
+  Computes a minimum spanning tree over points, using Manhattan distances.
+
+  Only the nearest neighbour of every point in each of the eight octants
+  around it can be an MST edge (Guibas and Stolfi), so a sweep finds O(n)
+  candidate edges in O(n log n), and Kruskal's algorithm picks the tree.
+
+  Parameters:
+  - points (Points): List of points, where each point is a tuple (x, y).
+
+  Returns:
+  - List[Tuple[Point, Point]]: The edges of the spanning tree.
+
+  Example:
+  > rectilinear_mst([(0, 0), (0, 2), (3, 0)])  # Returns [((0, 0), (0, 2)), ((0, 0), (3, 0))]
+  """
+    points = list(dict.fromkeys(points))
+    coords = [list(point) for point in points]
+    candidates = []
+    # Each pass finds the neighbours in one octant, then the points are mirrored to the next
+    for k in range(4):
+        order = sorted(range(len(points)), key=lambda i: coords[i][0] + coords[i][1])
+        keys, active = [], []  # Points still looking for a neighbour, sorted by -y
+        for i in order:
+            x, y = coords[i]
+            index = bisect.bisect_left(keys, -y)
+            while index < len(keys):
+                j = active[index]
+                dx, dy = x - coords[j][0], y - coords[j][1]
+                if dy > dx:
+                    break
+                candidates.append((dx + dy, j, i))
+                del keys[index], active[index]
+            keys.insert(index, -y)
+            active.insert(index, i)
+        for coord in coords:
+            if k % 2:
+                coord[0] = -coord[0]
+            else:
+                coord.reverse()
+    candidates.sort()
+    clusters, edges = DisjointSet(), []
+    for _, i, j in candidates:
+        if clusters.find(i) != clusters.find(j):
+            clusters.union(i, j)
+            edges.append((points[i], points[j]))
+    return edges
+
+
+def lower_bound(pins: Points) -> int:
+    """
+  Proven lower bound on the number of path elements needed to connect all pins.
+
+  The tree spans the bounding box of the pins, so it is at least its half
+  perimeter. By Hwang's theorem, a rectilinear Steiner tree is at least 2/3
+  of the rectilinear minimum spanning tree.
+
+  Parameters:
+  - pins (Points): List of pins, where each pin is a point (Point).
+
+  Returns:
+  - int: The lower bound.
+
+  Example:
+  > lower_bound([(0, 0), (2, 2), (0, 2), (2, 0)])  # Returns 4
+  """
+    if len(set(pins)) < 2:
+        return 0
+    xs, ys = [x for x, _ in pins], [y for _, y in pins]
+    half_perimeter = max(xs) - min(xs) + max(ys) - min(ys)
+    mst_length = sum(manhattan_distance(*edge) for edge in rectilinear_mst(pins))
+    return max(half_perimeter, -(-2 * mst_length // 3))
+
+
+def spawn_seeds(seed: int = None, n: int = 1) -> List[int]:
+    """
+  Derives `n` independent seeds from one seed, for example one per worker,
+  case or batch. Runs with the same seed get the same child seeds, while the
+  child streams do not overlap (numpy's SeedSequence).
+
+  Parameters:
+  - seed (int): The parent seed. Default is None, which draws fresh entropy.
+  - n (int): Number of child seeds.
+
+  Returns:
+  - List[int]: The child seeds, usable for random.Random and numpy.random.default_rng.
+
+  Example:
+  > spawn_seeds(0, 2)  # Returns [3757552657, 673228719]
+  """
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n)]
+
+
 def get_unique_filename(path: Path) -> Path:
     """
     Generate a unique filename by appending a number in parentheses.
@@ -166,7 +268,7 @@ def scalar_to_color(scalar_list: list) -> list:
     return cm.viridis([x / max(scalar_list) for x in scalar_list])
 
 
-def validate_paths(paths: Paths, size=10) -> None:
+def validate_paths(paths: Paths, size=10, allow_duplicates=True) -> None:
     """
   Raises an error if the list of paths contains anything improperly formatted.
 
@@ -175,21 +277,126 @@ def validate_paths(paths: Paths, size=10) -> None:
     (PathElement).
   - size (int): Size of the board (number of tiles in each row/column).
     Default is 10.
+  - allow_duplicates (bool): Whether a path element may occur more than once,
+    in either direction. Default is True.
 
   Raises:
   - TypeError: If paths is not of type list or if a path element is not a
     tuple.
   - ValueError: If a path element does not consist of a start and end point,
     if a point is not an x-y pair, if a value is not an integer, if a value is
-    not an integer, if a value is less than 0 or greater than the specified
-    size, or if a path element is not of length 1.
+    less than 0 or greater than the specified size, if a path element is not
+    of length 1, or if a path element is duplicated while not allowed.
+
+  Notes:
+  Long lists of paths are checked as one (N, 2, 2) array. Only when that finds
+  a problem are the offending path elements checked one by one, for a
+  detailed error message.
 
   Examples:
   > validate_paths([((0, 0), (0, 2))])  # Raises ValueError
   """
     if not isinstance(paths, list):
         raise TypeError(f'Paths should be of type list, but is of type {type(paths).__name__} {paths}.')
-    for i, path in enumerate(paths):
+    # For a few path elements, the overhead of numpy outweighs its gain
+    array = _path_array(paths) if len(paths) >= 64 else None
+    if array is None:
+        _validate_path_elements(paths, size)
+    else:
+        _validate_path_elements(paths, size, np.flatnonzero(_invalid_elements(array, size)))
+    if not allow_duplicates:
+        if array is None:
+            array = np.array(paths, dtype=float).reshape(-1, 2, 2)
+        duplicates = _duplicate_elements(array, size)
+        if duplicates.any():
+            i = int(np.argmax(duplicates))
+            raise ValueError(f'Path element {i} is a duplicate of an earlier path element {paths[i]}.')
+
+
+def validate_paths_batch(batch: List[Paths], size=10, allow_duplicates=True) -> np.ndarray:
+    """
+  Checks many solutions at once, for example all trees of a benchmark.
+
+  Parameters:
+  - batch (List[Paths]): The solutions to check.
+  - size (int): Size of the board. Default is 10.
+  - allow_duplicates (bool): Whether a path element may occur more than once
+    in a solution. Default is True.
+
+  Returns:
+  - np.ndarray: Whether each solution passes `validate_paths`. To find out
+    what is wrong with a solution, call `validate_paths` on it.
+  """
+    valid = np.ones(len(batch), dtype=bool)
+    lists = [i for i, paths in enumerate(batch) if isinstance(paths, list)]
+    indices = np.asarray(lists, dtype=np.intp)  # Also integers when there are no lists
+    valid[np.setdiff1d(np.arange(len(batch)), indices)] = False
+    array = _path_array([path for i in lists for path in batch[i]])
+    if array is None:
+        # Somewhere is a malformed element, check the solutions one by one
+        for i in lists:
+            try:
+                validate_paths(batch[i], size, allow_duplicates)
+            except (TypeError, ValueError):
+                valid[i] = False
+        return valid
+    solution = np.repeat(indices, [len(batch[i]) for i in lists])
+    invalid = _invalid_elements(array, size)
+    if not allow_duplicates:
+        elements = np.flatnonzero(~invalid)
+        invalid[elements[_duplicate_elements(array[elements], size, solution[elements])]] = True
+    valid[solution[invalid]] = False
+    return valid
+
+
+def _path_array(paths: Paths) -> np.ndarray:
+    # The paths as an (N, 2, 2) array of numbers, or None if they are not tuples of x-y pairs of ints and floats.
+    # Every check is a map over the whole list, which is much faster than looking at each value in Python.
+    try:
+        points = list(chain.from_iterable(paths))
+        values = list(chain.from_iterable(points))
+    except TypeError:
+        return None  # A path element or point that is not a sequence
+    if (set(map(type, paths)) | set(map(type, points))) - {tuple}:
+        return None
+    if (set(map(len, paths)) | set(map(len, points))) - {2}:
+        return None
+    types = set(map(type, values))
+    if not types <= {int, float}:
+        return None
+    try:
+        array = np.fromiter(values, np.float64 if float in types else np.int64, len(values))
+    except OverflowError:
+        return None
+    return array.reshape(-1, 2, 2)
+
+
+def _invalid_elements(array: np.ndarray, size: int) -> np.ndarray:
+    # Whether each element is off the board, has a non integer value or is not of length 1
+    invalid = ((array < 0) | (array > size)).any(axis=(1, 2))
+    if array.dtype.kind == 'f':
+        invalid |= (array % 1 != 0).any(axis=(1, 2))
+    invalid |= np.abs(array[:, 0] - array[:, 1]).sum(axis=1) != 1
+    return invalid
+
+
+def _duplicate_elements(array: np.ndarray, size: int, groups: np.ndarray = None) -> np.ndarray:
+    # Whether each element occurs earlier (in either direction) in the same group
+    width = size + 1
+    points = array.astype(np.int64) @ np.array([width, 1])
+    keys = points.min(axis=1) * width ** 2 + points.max(axis=1)
+    if groups is not None:
+        keys = keys + groups.astype(np.int64) * width ** 4
+    order = np.argsort(keys, kind='stable')
+    duplicates = np.zeros(len(keys), dtype=bool)
+    duplicates[order[1:]] = keys[order[1:]] == keys[order[:-1]]
+    return duplicates
+
+
+def _validate_path_elements(paths: Paths, size: int, indices=None) -> None:
+    # Detailed checks of the path elements at `indices`, all by default
+    for i in range(len(paths)) if indices is None else indices:
+        path = paths[i]
         if not isinstance(path, tuple):
             raise TypeError(f'Path element {i} should be a tuple, but is a {type(path).__name__} {path}.')
         if not len(path) == 2:
@@ -223,8 +430,36 @@ def validate_paths(paths: Paths, size=10) -> None:
 
 
 
-# TODO: give display_board info dict support
-def display_board(
+BOARD_EDGE = 1  # Board edge width
+
+
+@lru_cache(maxsize=None)
+def board_background(size: int) -> np.ndarray:
+    """
+  The tiles and pin holes of an empty board, rendered once per board size as
+  an RGBA image spanning the board including its edge.
+  """
+    extent = size + BOARD_EDGE
+    pixels_per_tile = max(4, min(40, 1200 // extent))
+    fig = Figure(figsize=(extent * pixels_per_tile / 100,) * 2, dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.set_axis_off()
+    ax.set_xlim(-BOARD_EDGE / 2, size + BOARD_EDGE / 2)
+    ax.set_ylim(-BOARD_EDGE / 2, size + BOARD_EDGE / 2)
+    fig.patch.set_facecolor(colors.tile_dark)
+    tiles = [patches.Rectangle((i, j), 1, 1) for i in range(size) for j in range(size)]
+    # Tile edges scale with the tiles, as 2 points at the 40 pixels per tile of a 10 by 10 board
+    ax.add_collection(PatchCollection(tiles, lw=2 * pixels_per_tile / 40, edgecolor=colors.tile_light,
+                                      facecolor=colors.tile_dark))
+    g = size + 1  # grid size
+    ax.plot(flatten([range(g)] * g), flatten([[i] * g for i in range(g)]), '.k', ms=.5 * pixels_per_tile / 40)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
+def draw_board(
+        ax,
         paths: Paths = [],
         pins: Points = [],
         size=10,
@@ -232,41 +467,15 @@ def display_board(
         path_colors=colors.path_blue,
         pin_colors=colors.pin_red,
         target: int = None,
-        **kwargs,
+        labels: bool = True,
 ) -> None:
     """
-  Display a board with paths and pins.
-  All parameters are optional.
-
-  Parameters:
-  - paths (Paths): List of paths, where each path is a list of points (PathElement).
-  - pins (Points): List of pins, where each pin is a point (Point).
-  - size (int): Size of the board (number of tiles in each row/column).
-  - suptitle (str): Subtitle for the plot.
-  - path_colors: Colors for paths, can be a string or a list of colors.
-  - pin_colors: Colors for pins, can be a string or a list of colors.
-  - target (int): Target number for successful connections.
-
-  Returns:
-  None
+  Draws a board with paths and pins on the axes `ax`, see `display_board`.
+  With `labels` False, the rows and columns are not labelled.
   """
-    if 'paths' in kwargs:
-        paths = kwargs['paths']
-    if 'pins' in kwargs:
-        pins = kwargs['pins']
-    if 'kanten' in kwargs:
-        target = kwargs['kanten']
-    if 'size' in kwargs:
-        size = kwargs['size']
-
-    fig, ax = plt.subplots(figsize=(5, 4))
-    # Drawing tiles
-    be = 1  # Board edge width
-    ax.add_patch(patches.Rectangle((-be / 2, -be / 2), size + be, size + be, fc=colors.tile_dark))
-    for i in range(size):
-        for j in range(size):
-            rect = patches.Rectangle((i, j), 1, 1, lw=2, edgecolor=colors.tile_light, fc=colors.tile_dark)
-            ax.add_patch(rect)
+    # Drawing tiles and pin holes
+    extent = (-BOARD_EDGE / 2, size + BOARD_EDGE / 2)
+    ax.imshow(board_background(size), extent=extent * 2, interpolation='antialiased', zorder=0)
 
     # Drawing paths
     if any(paths):
@@ -282,19 +491,12 @@ def display_board(
         elif not isinstance(path_colors[0], str):
             path_colors = scalar_to_color(path_colors)
 
-        # Drawing paths
-        for color, path in zip(path_colors, paths):
-            (x1, y1), (x2, y2) = path
-            if x1 == x2:  # Vertical path
-                ax.plot([x1, x2], [min(y1, y2) + .15, max(y1, y2) - .15], c=color, lw=3)
-            elif y1 == y2:  # Horizontal path
-                ax.plot([min(x1, x2) + .15, max(x1, x2) - .15], [y1, y2], c=color, lw=3)
-            else:
-                print(f"Invalid path: {path}")
-
-    # Drawing pin holes
-    g = size + 1  # grid size
-    ax.plot(flatten([range(g)] * g), flatten([[i] * g for i in range(g)]), '.k', ms=.5)
+        # Drawing paths, shortened at both ends, as one collection
+        segments = np.sort(np.array(paths, dtype=float), axis=1)
+        along = (segments[:, 1] - segments[:, 0]) * .15
+        segments[:, 0] += along
+        segments[:, 1] -= along
+        ax.add_collection(LineCollection(segments, colors=path_colors, lw=3))
 
     # Drawing pins
     if any(pins):
@@ -304,7 +506,7 @@ def display_board(
             pin_colors = scalar_to_color(pin_colors)
 
         pin_coords = np.array(pins).T
-        ax.scatter(pin_coords[0], pin_coords[1], color=pin_colors, s=100, zorder=5)
+        ax.scatter(pin_coords[0], pin_coords[1], color=pin_colors, s=100 * min(1, 10 / size), zorder=5)
 
     # Check if connections are successful
     msg = 'un'
@@ -314,32 +516,146 @@ def display_board(
         if n_clusters == 1:
             msg = ''
 
-    # Set x-axis labels as letters
-    ax.set_xticks(np.arange(size) + .5)
-    ax.set_xticklabels([chr(65 + i) for i in range(size)], fontsize=12)
+    if labels:
+        # Set x-axis labels as letters
+        ax.set_xticks(np.arange(size) + .5)
+        ax.set_xticklabels([chr(65 + i) for i in range(size)], fontsize=12)
 
-    # Set y-axis labels as numerals
-    ax.set_yticks(np.arange(size) + .5)
-    ax.set_yticklabels(np.arange(1, size + 1), fontsize=12)
+        # Set y-axis labels as numerals
+        ax.set_yticks(np.arange(size) + .5)
+        ax.set_yticklabels(np.arange(1, size + 1), fontsize=12)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
 
     # Turn off grids, set limits and make square
     ax.grid(False)
     ax.spines[:].set_visible(False)
     ax.set_aspect('equal')
-    ax.set_xlim(-be / 2, size + be / 2)
-    ax.set_ylim(-be / 2, size + be / 2)
+    ax.set_xlim(*extent)
+    ax.set_ylim(*extent)
     ax.tick_params(axis='both', which='both', length=0)
 
     # Set the figure title
     tgt = '' if target is None else f'/{target}'
     ttl = f'{msg}succesful with {len(paths)}{tgt} path elements'.capitalize()
     ttl = ttl if suptitle is None else f'{suptitle}\n{ttl}'
-    ax.set_title(ttl)
+    ax.set_title(ttl, fontsize=None if labels else 8)
+
+
+def _board_kwargs(kwargs: dict) -> dict:
+    # The arguments of `draw_board` in a solution or case dict
+    board = {key: kwargs[key] for key in ('paths', 'pins', 'size', 'suptitle', 'path_colors', 'pin_colors', 'target')
+             if key in kwargs}
+    if 'kanten' in kwargs:
+        board['target'] = kwargs['kanten']
+    return board
+
+
+# TODO: give display_board info dict support
+def display_board(
+        paths: Paths = [],
+        pins: Points = [],
+        size=10,
+        suptitle=None,
+        path_colors=colors.path_blue,
+        pin_colors=colors.pin_red,
+        target: int = None,
+        **kwargs,
+) -> None:
+    """
+  Display a board with paths and pins.
+  All parameters are optional.
+
+  Parameters:
+  - paths (Paths): List of paths, where each path is a list of points (PathElement).
+  - pins (Points): List of pins, where each pin is a point (Point).
+  - size (int): Size of the board (number of tiles in each row/column).
+  - suptitle (str): Subtitle for the plot.
+  - path_colors: Colors for paths, can be a string or a list of colors.
+  - pin_colors: Colors for pins, can be a string or a list of colors.
+  - target (int): Target number for successful connections.
+
+  Returns:
+  None
+  """
+    board = dict(paths=paths, pins=pins, size=size, suptitle=suptitle, path_colors=path_colors,
+                 pin_colors=pin_colors, target=target)
+    board.update(_board_kwargs(kwargs))
+
+    fig, ax = plt.subplots(figsize=(5, 4))
+    draw_board(ax, **board)
 
     # Display image
     plt.show()
 
 
+def render_board(file: Path, /, **kwargs) -> Path:
+    """
+  Draws a board like `display_board`, but writes it to `file` (PNG, SVG or
+  any other format matplotlib knows) instead of showing it. Does not use
+  pyplot, so it works without a display and in parallel processes.
+
+  > render_board('board.png', **load_file('solutions/example_solution/some_case.json'))
+  """
+    fig = Figure(figsize=(5, 4))
+    FigureCanvasAgg(fig)
+    draw_board(fig.add_subplot(), **_board_kwargs(kwargs))
+    fig.savefig(file)
+    return Path(file)
+
+
+def _case_title(board: dict) -> str:
+    return ' '.join(str(board[key]) for key in ('id', 'name', 'schwierigkeit') if key in board)
+
+
+def _render_file(source: Path, target: Path) -> Path:
+    board = load_file(source)
+    board.setdefault('suptitle', _case_title(board))
+    return render_board(target, **board)
+
+
+# Solutions are saved under the file name of their case, other JSON files next to them (benchmarks) are not boards
+SOLUTION_FILES = '*_case.json'
+
+
+def render_solutions(source: Path, target: Path = None, file_format: str = 'png', workers: int = None) -> List[Path]:
+    """
+  Renders every solution JSON file (`SOLUTION_FILES`) in the directory
+  `source` to a file per solution in `target` (default `source`), in parallel
+  processes.
+
+  Returns:
+  - List[Path]: The rendered files.
+  """
+    sources = sorted(Path(source).glob(SOLUTION_FILES))
+    target = Path(source) if target is None else Path(target)
+    target.mkdir(parents=True, exist_ok=True)
+    targets = [target / f'{file.stem}.{file_format}' for file in sources]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render_file, sources, targets, chunksize=max(1, len(sources) // 64)))
+
+
+def contact_sheet(sources: List[Path], target: Path, columns: int = 6) -> Path:
+    """
+  Draws the solutions in the JSON files `sources` side by side in a single
+  image, for an overview of a whole run.
+  """
+    rows = max(1, -(-len(sources) // columns))
+    fig = Figure(figsize=(3 * columns, 3.3 * rows))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(rows, columns, squeeze=False).flatten()
+    for ax, source in zip(axes, sources):
+        board = load_file(source)
+        board.setdefault('suptitle', _case_title(board))
+        draw_board(ax, labels=False, **_board_kwargs(board))
+    for ax in axes[len(sources):]:
+        ax.set_axis_off()
+    fig.tight_layout()
+    fig.savefig(target)
+    return Path(target)
+
+
 def unzip_name(name: str, **kwargs) -> dict:
     info = {k: v for k, v in [v.split('-') for v in name.split('_')]}
     fallbacks = {'name': 'unnamed',
@@ -389,6 +705,64 @@ def score_solution(pins: Points, target: int, path_finder: Callable) -> Tuple[bo
     return is_success, len(paths), paths
 
 
+def plot_convergence(sources, x: str = 'elapsed', ax=None):
+    """
+  Plots how far above the target the best tree of each case is during a run,
+  from `RunLog.convergence` or the files written by `test.py --trace`. Flat
+  curves show where more time or evaluations stop paying off.
+
+  Parameters:
+  - sources: A convergence CSV file, a list of them, or a dict of label to
+    file or data frame to compare runs, for example of different solver versions.
+  - x (str): 'elapsed' to plot against seconds, 'flops' against evaluations.
+  - ax: The axes to draw on. Default is a new figure.
+
+  Returns:
+  The axes. Every case is a thin line, the median over the cases a thick one.
+
+  Example:
+  > plot_convergence({'old': 'solutions/a/test convergence.csv', 'new': run_log.convergence(run_id)})
+  """
+    if isinstance(sources, (str, Path)):
+        sources = [sources]
+    if not isinstance(sources, dict):
+        sources = {Path(source).parent.name + '/' + Path(source).stem: source for source in sources}
+    if ax is None:
+        _, ax = plt.subplots(figsize=(7, 4))
+    # Evaluations can be 0 for trees from the solution cache, which a log axis can not show
+    x_min = 1e-3 if x == 'elapsed' else 1
+
+    for color, (label, source) in zip(plt.rcParams['axes.prop_cycle'].by_key()['color'], sources.items()):
+        if isinstance(source, (str, Path)):
+            with open(source, newline='') as file:
+                rows = list(csv.DictReader(file))
+        else:
+            rows = source.to_dict('records')
+        traces = {}
+        for row in rows:
+            traces.setdefault(row['ID'], []).append((max(float(row[x]), x_min),
+                                                     int(row['paths_used']) - int(row['kanten'])))
+        # The gap of every case at every time any case improved, to take the median over
+        steps = np.unique([step for trace in traces.values() for step, _ in trace])
+        # Hold the final gap of every case until the end of the run
+        for trace in traces.values():
+            trace.append((steps[-1], trace[-1][1]))
+        gaps = np.full((len(traces), len(steps)), np.nan)
+        for i, trace in enumerate(traces.values()):
+            trace_x, trace_gap = np.array(trace).T
+            ax.step(trace_x, trace_gap, where='post', color=color, alpha=.2, lw=.8)
+            known = steps >= trace_x[0]
+            gaps[i, known] = trace_gap[np.searchsorted(trace_x, steps[known], side='right') - 1]
+        ax.step(steps, np.nanmedian(gaps, axis=0), where='post', color=color, lw=2.5, label=label)
+
+    ax.axhline(0, color='k', lw=.8, ls=':')
+    ax.set_xscale('log')
+    ax.set_xlabel('seconds' if x == 'elapsed' else 'evaluations')
+    ax.set_ylabel('paths used - kanten')
+    ax.legend()
+    return ax
+
+
 def json_in(source: str):
     with open(source, 'r') as file:
         return json.load(file)
@@ -411,6 +785,23 @@ def load_file(source: str):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Run the path finding solution.")
     parser.add_argument("filepath", nargs="?", default="None",
-                        help="Module name where find_paths function is located. Default is 'your_solution'.")
+                        help="Solution JSON file to display, convergence CSV file to plot, "
+                             "or directory of solution JSON files to render.")
+    parser.add_argument("--format", default="png", help="File format of rendered boards. Default is png.")
+    parser.add_argument("--workers", type=int, default=None, help="Processes to render with. Default is all CPUs.")
+    parser.add_argument("--sheet", default=None, help="Also draw all boards of the directory in this one file.")
+    parser.add_argument("--out", default=None,
+                        help="Directory to render to (default the solutions directory), or file to render one board to.")
     args = parser.parse_args()
-    display_board(**load_file(args.filepath))
+    if Path(args.filepath).is_dir():
+        rendered = render_solutions(args.filepath, args.out, args.format, args.workers)
+        print(f'{len(rendered)} boards rendered to {rendered[0].parent if rendered else args.filepath}')
+        if args.sheet is not None:
+            print(f'Contact sheet: {contact_sheet(sorted(Path(args.filepath).glob(SOLUTION_FILES)), args.sheet)}')
+    elif args.filepath.endswith('.csv'):
+        plot_convergence(args.filepath)
+        plt.show()
+    elif args.out is not None:
+        print(f'Rendered to {_render_file(args.filepath, args.out)}')
+    else:
+        display_board(**load_file(args.filepath))